@@ -0,0 +1,226 @@
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+from database import DB_POOL_MAX_SIZE
+from http_cache import serialize_json
+from metrics import ADMISSION_WAIT, ADMISSION_REJECTED, ADMISSION_QUEUED, ADMISSION_ACTIVE
+
+
+# Requests allowed to use the database at the same time, per worker (default: one per pool connection)
+ADMISSION_CONCURRENCY = int(os.getenv("ADMISSION_CONCURRENCY", str(DB_POOL_MAX_SIZE)))
+# Requests allowed to wait for a slot; beyond this the lowest priority request is turned away
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "100"))
+
+# Priority classes, served in this order, with the longest time (seconds) each may wait for a slot
+WRITE = "write"
+READ = "read"
+BULK = "bulk"
+PRIORITIES = {WRITE: 0, READ: 1, BULK: 2}
+MAX_WAIT_SECONDS = {
+    WRITE: float(os.getenv("ADMISSION_WRITE_MAX_WAIT", "10")),
+    READ: float(os.getenv("ADMISSION_READ_MAX_WAIT", "2")),
+    BULK: float(os.getenv("ADMISSION_BULK_MAX_WAIT", "1"))
+}
+
+# Requests that store user work
+WRITE_ENDPOINTS = {("POST", "/assessment/section/submit")}
+# Long-running reads that hold a connection for a while
+BULK_PREFIXES = ("/export/", "/analytics/")
+# Never queued: served from memory, or needed to operate the service under load
+EXEMPT_PATHS = {"/metrics", "/server/start-time", "/assessment/draft"}
+EXEMPT_PREFIXES = ("/admin/", "/docs", "/openapi.json")
+
+
+def request_class(method: str, path: str):
+    """Priority class of a request, or None if it bypasses admission control."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS or path.startswith(EXEMPT_PREFIXES):
+        return None
+    if (method, path) in WRITE_ENDPOINTS:
+        return WRITE
+    if path.startswith(BULK_PREFIXES):
+        return BULK
+    return READ
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        self.reason = reason
+
+
+# States of a queued request; a waiter leaves WAITING exactly once
+WAITING = "waiting"
+GRANTED = "granted"        # handed a slot by release()
+DISPLACED = "displaced"    # turned away to make room for a higher priority request
+EXPIRED = "expired"        # waited longer than its class's MAX_WAIT_SECONDS
+CANCELLED = "cancelled"    # the client went away
+
+
+class Waiter:
+    __slots__ = ("priority", "sequence", "klass", "future", "state")
+
+    def __init__(self, priority: int, sequence: int, klass: str, future):
+        self.priority = priority
+        self.sequence = sequence
+        self.klass = klass
+        self.future = future
+        self.state = WAITING
+
+    def __lt__(self, other) -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class AdmissionController:
+    """
+    Bounded priority queue in front of the database layer of one worker.
+
+    At most `concurrency` requests run at once. Others wait in priority order (writes, then
+    reads, then bulk reads; first come first served within a class) for up to their class's
+    MAX_WAIT_SECONDS. When the queue is full, a newcomer displaces the lowest priority waiter
+    if it outranks it, and is turned away otherwise. Turned-away requests get a 503 with a
+    Retry-After estimated from the recent request duration.
+    Runs on the worker's event loop; no locking is needed. Each waiter's state decides which
+    of grant, displacement, deadline and cancellation happened to it, so it is counted out of
+    the queue once.
+    """
+
+    def __init__(self, concurrency: int = ADMISSION_CONCURRENCY, queue_size: int = ADMISSION_QUEUE_SIZE):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters = []            # heap of Waiter; left ones are skipped when popped
+        self._queued = 0              # waiters still in the WAITING state
+        self._sequence = itertools.count()
+        # Moving average of how long an admitted request holds its slot (seconds)
+        self.average_seconds = 0.05
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained, at least 1."""
+        backlog = self._queued + self.active
+        return max(1, math.ceil(self.average_seconds * backlog / max(self.concurrency, 1)))
+
+    def _leave(self, waiter: Waiter, state: str) -> bool:
+        """Move a waiting waiter to `state` and count it out of the queue; False if it already left."""
+        if waiter.state != WAITING:
+            return False
+        waiter.state = state
+        self._queued -= 1
+        ADMISSION_QUEUED.inc((waiter.klass,), -1)
+        if not waiter.future.done():
+            waiter.future.set_result(state)
+        return True
+
+    def _lowest_waiter(self):
+        live = [waiter for waiter in self._waiters if waiter.state == WAITING]
+        return max(live, key=lambda waiter: (waiter.priority, waiter.sequence)) if live else None
+
+    async def acquire(self, klass: str) -> float:
+        """
+        Wait for a slot. Returns the seconds waited; raises Rejected when turned away.
+        """
+        if self.active < self.concurrency and self._queued == 0:
+            self.active += 1
+            return 0.0
+
+        priority = PRIORITIES[klass]
+        if self._queued >= self.queue_size:
+            lowest = self._lowest_waiter()
+            if lowest is None or lowest.priority <= priority:
+                raise Rejected("queue_full")
+            # Make room by turning away the lowest priority, most recent waiter
+            self._leave(lowest, DISPLACED)
+
+        waiter = Waiter(priority, next(self._sequence), klass, asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiters, waiter)
+        self._queued += 1
+        ADMISSION_QUEUED.inc((klass,), 1)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), MAX_WAIT_SECONDS[klass])
+        except asyncio.TimeoutError:
+            # Expire unless the slot was handed over or we were displaced just as the deadline passed
+            self._leave(waiter, EXPIRED)
+        except asyncio.CancelledError:
+            # Client went away while waiting; pass on a slot that was handed to us
+            if waiter.state == GRANTED:
+                self._hand_over()
+            else:
+                self._leave(waiter, CANCELLED)
+            raise
+
+        if waiter.state != GRANTED:
+            raise Rejected("deadline" if waiter.state == EXPIRED else waiter.state)
+        return time.perf_counter() - started
+
+    def release(self, held_seconds: float) -> None:
+        """Give the slot to the next waiter, or free it."""
+        self.average_seconds += (held_seconds - self.average_seconds) * 0.1
+        self._hand_over()
+
+    def _hand_over(self) -> None:
+        while self._waiters:
+            waiter = heapq.heappop(self._waiters)
+            # The slot passes straight to the waiter; active stays the same
+            if self._leave(waiter, GRANTED):
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queued": self._queued,
+            "queue_size": self.queue_size,
+            "average_ms": round(self.average_seconds * 1000, 2),
+            "max_wait_seconds": MAX_WAIT_SECONDS
+        }
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that runs every non-exempt request through the admission controller."""
+
+    def __init__(self, app, controller: AdmissionController = admission_controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        klass = request_class(scope["method"], scope["path"])
+        if klass is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            waited = await self.controller.acquire(klass)
+        except Rejected as e:
+            ADMISSION_REJECTED.inc((klass, e.reason))
+            retry_after = self.controller.retry_after()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"retry-after", str(retry_after).encode("latin-1"))
+                ]
+            })
+            await send({
+                "type": "http.response.body",
+                "body": serialize_json({"detail": f"Server busy, retry in {retry_after}s ({e.reason})"})
+            })
+            return
+
+        ADMISSION_WAIT.observe((klass,), waited)
+        ADMISSION_ACTIVE.inc((klass,), 1)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_ACTIVE.inc((klass,), -1)
+            self.controller.release(time.perf_counter() - started)
@@ -0,0 +1,303 @@
+import json
+import math
+
+
+# Organisation dimensions HR reports on -> column of sails_employee_data (band comes from the result)
+DIMENSIONS = {
+    "department": "Department",
+    "reporting_manager": "Reporting_Manager",
+    "current_account": "Current_Account",
+    "band": None
+}
+
+# Category of the rows that aggregate the overall total_score
+TOTAL_SCORE = ""
+
+# Scores are percentages; the distribution has 10 buckets of 10 points (100 falls in 90-100)
+BUCKET_WIDTH = 10
+BUCKET_COUNT = 10
+BUCKET_LABELS = [
+    f"{i * BUCKET_WIDTH}-{(i + 1) * BUCKET_WIDTH}" for i in range(BUCKET_COUNT)
+]
+
+
+def score_bucket(score: float) -> int:
+    """Distribution bucket of a percentage score (same rule as the SQL in rebuild_analytics)."""
+    return min(max(math.floor(score / BUCKET_WIDTH), 0), BUCKET_COUNT - 1)
+
+
+def _contributions(fact: dict) -> list:
+    """
+    Aggregate keys an assessment counts towards:
+    [(dimension, dimension_value, band, category, bucket, score)]
+    """
+    scores = [(TOTAL_SCORE, fact["total_score"])]
+    scores.extend(fact["category_scores"].items())
+
+    rows = []
+    for dimension in DIMENSIONS:
+        value = fact["band"] if dimension == "band" else fact[dimension]
+        for category, score in scores:
+            if score is None:
+                continue
+            rows.append((dimension, value, fact["band"], category, score_bucket(score), score))
+    return rows
+
+
+def record_completed_assessment(employee_id: str, band: str, total_score: float,
+                                category_scores: list, cur) -> None:
+    """
+    Apply a completed assessment to the analytics aggregates in the finalization job's
+    transaction (finalization.finalize_assessment), the one that writes assessment_results.
+    A re-completed assessment first takes back what its previous result added,
+    using the organisation data stored with that result.
+    Call lock_assessment() for the employee and band first in that same transaction.
+
+    Args:
+        employee_id: Employee ID
+        band: Band name
+        total_score: Overall percentage score
+        category_scores: [{"category", "score"}] as stored in assessment_results
+        cur: Database cursor (RealDictCursor)
+    """
+    # Taken before reading the previous row: a rebuild (SHARE ROW EXCLUSIVE) that commits in
+    # between would otherwise have its aggregates adjusted with a stale row
+    cur.execute("LOCK TABLE analytics_assessment_facts IN ROW EXCLUSIVE MODE;")
+    cur.execute("""
+        SELECT band, department, reporting_manager, current_account, total_score, category_scores
+        FROM analytics_assessment_facts
+        WHERE employee_number=%s AND band=%s;
+    """, (employee_id, band))
+    previous = cur.fetchone()
+
+    # Organisation data as of completion; an employee missing from the master data counts as ''
+    cur.execute("""
+        SELECT "Department", "Reporting_Manager", "Current_Account"
+        FROM sails_employee_data
+        WHERE "Employee_Number"=%s
+        LIMIT 1;
+    """, (employee_id,))
+    employee = cur.fetchone() or {}
+
+    fact = {
+        "band": band,
+        "total_score": total_score,
+        "category_scores": {entry["category"]: entry["score"] for entry in category_scores}
+    }
+    for dimension, column in DIMENSIONS.items():
+        if column is not None:
+            fact[dimension] = employee.get(column) or ""
+
+    cur.execute("""
+        INSERT INTO analytics_assessment_facts
+        (employee_number, band, department, reporting_manager, current_account, total_score, category_scores)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (employee_number, band)
+        DO UPDATE SET
+            department = EXCLUDED.department,
+            reporting_manager = EXCLUDED.reporting_manager,
+            current_account = EXCLUDED.current_account,
+            total_score = EXCLUDED.total_score,
+            category_scores = EXCLUDED.category_scores,
+            updated_at = NOW();
+    """, (
+        employee_id,
+        band,
+        fact["department"],
+        fact["reporting_manager"],
+        fact["current_account"],
+        total_score,
+        json.dumps(fact["category_scores"])
+    ))
+
+    # (count, score) changes per aggregate row
+    deltas = {}
+    if previous:
+        for *key, score in _contributions(previous):
+            count_delta, score_delta = deltas.get(tuple(key), (0, 0.0))
+            deltas[tuple(key)] = (count_delta - 1, score_delta - score)
+    for *key, score in _contributions(fact):
+        count_delta, score_delta = deltas.get(tuple(key), (0, 0.0))
+        deltas[tuple(key)] = (count_delta + 1, score_delta + score)
+
+    apply_analytics_deltas(deltas, cur)
+
+
+def apply_analytics_deltas(deltas: dict, cur) -> None:
+    """
+    Add count/score changes to analytics_score_distribution.
+    Rows are written in key order so concurrent completions lock them in the same order.
+
+    Args:
+        deltas: {(dimension, dimension_value, band, category, bucket): (count_delta, score_delta)}
+    """
+    deltas = {
+        key: (count_delta, score_delta)
+        for key, (count_delta, score_delta) in sorted(deltas.items())
+        if count_delta or abs(score_delta) > 1e-9
+    }
+    if not deltas:
+        return
+
+    keys = list(deltas.keys())
+    cur.execute("""
+        INSERT INTO analytics_score_distribution
+        (dimension, dimension_value, band, category, bucket, assessments, score_sum)
+        SELECT t.dimension, t.dimension_value, t.band, t.category, t.bucket, t.count_delta, t.score_delta
+        FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::int[], %s::int[], %s::float8[])
+            WITH ORDINALITY AS t(dimension, dimension_value, band, category, bucket, count_delta, score_delta, n)
+        ORDER BY t.n
+        ON CONFLICT (dimension, dimension_value, band, category, bucket)
+        DO UPDATE SET
+            assessments = analytics_score_distribution.assessments + EXCLUDED.assessments,
+            score_sum = analytics_score_distribution.score_sum + EXCLUDED.score_sum;
+    """, (
+        [key[0] for key in keys],
+        [key[1] for key in keys],
+        [key[2] for key in keys],
+        [key[3] for key in keys],
+        [key[4] for key in keys],
+        [count_delta for count_delta, _ in deltas.values()],
+        [score_delta for _, score_delta in deltas.values()]
+    ))
+
+
+def rebuild_analytics(cur) -> int:
+    """
+    Recompute the analytics tables from the latest result per employee and band,
+    with the current organisation data from sails_employee_data (e.g. after an HR refresh).
+    Readers keep seeing the old aggregates until the transaction commits.
+
+    Returns:
+        int: Number of assessments aggregated
+    """
+    # Completions wait for the rebuild instead of interleaving with it
+    cur.execute("LOCK TABLE analytics_assessment_facts IN SHARE ROW EXCLUSIVE MODE;")
+    cur.execute("DELETE FROM analytics_assessment_facts;")
+    cur.execute("""
+        INSERT INTO analytics_assessment_facts
+        (employee_number, band, department, reporting_manager, current_account, total_score, category_scores)
+        SELECT
+            r.employee_number,
+            r.agreed_band,
+            COALESCE(e."Department", ''),
+            COALESCE(e."Reporting_Manager", ''),
+            COALESCE(e."Current_Account", ''),
+            r.total_score,
+            COALESCE((
+                SELECT jsonb_object_agg(s->>'category', (s->>'score')::float8)
+                FROM jsonb_array_elements(r.category_scores) AS s
+                WHERE s->>'category' IS NOT NULL
+            ), '{}'::jsonb)
+        FROM (
+            SELECT DISTINCT ON (employee_number, agreed_band)
+                employee_number,
+                agreed_band,
+                total_score,
+                CASE WHEN jsonb_typeof(category_scores) = 'string' AND category_scores #>> '{}' <> ''
+                     THEN (category_scores #>> '{}')::jsonb
+                     ELSE category_scores END AS category_scores
+            FROM assessment_results
+            ORDER BY employee_number, agreed_band, completed_at DESC
+        ) r
+        LEFT JOIN LATERAL (
+            SELECT "Department", "Reporting_Manager", "Current_Account"
+            FROM sails_employee_data
+            WHERE "Employee_Number" = r.employee_number
+            LIMIT 1
+        ) e ON TRUE
+        WHERE jsonb_typeof(r.category_scores) = 'array';
+    """)
+    assessments = cur.rowcount
+
+    rebuild_score_distribution(cur)
+    return assessments
+
+
+def rebuild_score_distribution(cur) -> None:
+    """
+    Recompute analytics_score_distribution from analytics_assessment_facts.
+    Call with analytics_assessment_facts locked as in rebuild_analytics().
+    """
+    cur.execute("DELETE FROM analytics_score_distribution;")
+    cur.execute("""
+        INSERT INTO analytics_score_distribution
+        (dimension, dimension_value, band, category, bucket, assessments, score_sum)
+        SELECT
+            d.dimension,
+            d.dimension_value,
+            f.band,
+            s.category,
+            LEAST(GREATEST(FLOOR(s.score / %(width)s), 0), %(last_bucket)s)::int,
+            COUNT(*),
+            SUM(s.score)
+        FROM analytics_assessment_facts f
+        CROSS JOIN LATERAL (VALUES
+            ('department', f.department),
+            ('reporting_manager', f.reporting_manager),
+            ('current_account', f.current_account),
+            ('band', f.band)
+        ) AS d(dimension, dimension_value)
+        CROSS JOIN LATERAL (
+            SELECT %(total)s AS category, f.total_score AS score
+            UNION ALL
+            SELECT key, value::float8 FROM jsonb_each_text(f.category_scores)
+        ) AS s
+        WHERE s.score IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5;
+    """, {"width": BUCKET_WIDTH, "last_bucket": BUCKET_COUNT - 1, "total": TOTAL_SCORE})
+
+
+def _summary(counts: list, score_sum: float) -> dict:
+    assessments = sum(counts)
+    return {
+        "assessments": assessments,
+        "average": round(score_sum / assessments, 2) if assessments else None,
+        "distribution": counts
+    }
+
+
+def read_score_analytics(dimension: str, cur, band: str = None, value: str = None) -> list:
+    """
+    Average and distribution of total_score and each category score per value of a dimension.
+
+    Args:
+        dimension: One of DIMENSIONS
+        cur: Database cursor (RealDictCursor)
+        band: Only count assessments of this band
+        value: Only return this dimension value (e.g. one department)
+
+    Returns:
+        list: [{"value", "assessments", "total_score", "categories"}] ordered by value;
+              summaries are {"assessments", "average", "distribution"} with one count per BUCKET_LABELS entry
+    """
+    cur.execute("""
+        SELECT dimension_value, category, bucket, SUM(assessments) AS assessments, SUM(score_sum) AS score_sum
+        FROM analytics_score_distribution
+        WHERE dimension = %(dimension)s
+          AND (%(band)s::text IS NULL OR band = %(band)s)
+          AND (%(value)s::text IS NULL OR dimension_value = %(value)s)
+        GROUP BY dimension_value, category, bucket
+        HAVING SUM(assessments) > 0
+        ORDER BY dimension_value, category, bucket;
+    """, {"dimension": dimension, "band": band, "value": value})
+
+    # value -> category -> [bucket counts, score sum]
+    grouped = {}
+    for row in cur.fetchall():
+        categories = grouped.setdefault(row["dimension_value"], {})
+        counts, score_sum = categories.get(row["category"], ([0] * BUCKET_COUNT, 0.0))
+        counts[row["bucket"]] = int(row["assessments"])
+        categories[row["category"]] = (counts, score_sum + row["score_sum"])
+
+    groups = []
+    for group_value, categories in grouped.items():
+        total = _summary(*categories.pop(TOTAL_SCORE, ([0] * BUCKET_COUNT, 0.0)))
+        groups.append({
+            # Employees without this organisation data are grouped under null
+            "value": group_value or None,
+            "assessments": total["assessments"],
+            "total_score": total,
+            "categories": {category: _summary(*entry) for category, entry in categories.items()}
+        })
+    return groups
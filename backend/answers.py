@@ -0,0 +1,284 @@
+# Max score per question is 5
+MAX_SCORE_PER_QUESTION = 5
+
+
+def answer_points(answer_value) -> int:
+    """Numeric value of an answer; non-numeric answers count as 0."""
+    return int(answer_value) if answer_value and answer_value.isdigit() else 0
+
+
+def score_percentage(score_sum: float, answer_count: int) -> float:
+    """Percentage of the maximum score, rounded to 2 decimals."""
+    max_score = answer_count * MAX_SCORE_PER_QUESTION
+    return round(score_sum / max_score * 100, 2) if max_score > 0 else 0
+
+
+def _assessment_lock_key(employee_id: str, band: str) -> str:
+    return f"assessment:{employee_id}:{band}"
+
+
+def lock_assessment(employee_id: str, band: str, cur) -> None:
+    """
+    Serialize writers of one employee's assessment for the rest of the transaction,
+    so the running totals in assessment_category_scores never drift.
+    """
+    cur.execute(
+        "SELECT pg_advisory_xact_lock(hashtextextended(%s, 0));",
+        (_assessment_lock_key(employee_id, band),)
+    )
+
+
+def try_lock_assessment(employee_id: str, band: str, cur) -> bool:
+    """lock_assessment() without waiting: False if another transaction holds the lock."""
+    cur.execute(
+        "SELECT pg_try_advisory_xact_lock(hashtextextended(%s, 0)) AS locked;",
+        (_assessment_lock_key(employee_id, band),)
+    )
+    return cur.fetchone()["locked"]
+
+
+def lock_assessments(assessments, cur) -> None:
+    """
+    lock_assessment() for several (employee_id, band) pairs in one statement.
+    Locks are taken in key order, so concurrent batches cannot deadlock.
+    """
+    keys = sorted({_assessment_lock_key(employee_id, band) for employee_id, band in assessments})
+    if not keys:
+        return
+    cur.execute("""
+        SELECT pg_advisory_xact_lock(hashtextextended(k.key, 0))
+        FROM unnest(%s::text[]) WITH ORDINALITY AS k(key, n)
+        ORDER BY k.n;
+    """, (keys,))
+
+
+def upsert_section_answers(employee_id: str, band: str, category: str, answers, cur) -> tuple:
+    """
+    Write all answers of a section in a single INSERT ... ON CONFLICT statement
+    and apply the score changes to assessment_category_scores.
+    Relies on the unique key on assessment_answers(employee_id, band, question_id).
+    Call lock_assessment() first in the same transaction.
+
+    Args:
+        employee_id: Employee ID
+        band: Band name
+        category: Category/Competency name
+        answers: List of (question_id, answer_value) pairs
+        cur: Database cursor (RealDictCursor)
+
+    Returns:
+        tuple: (inserted_count, updated_count)
+    """
+    # ON CONFLICT cannot touch the same row twice in one statement,
+    # so if a question appears more than once in the payload the last answer wins
+    latest_answers = {}
+    for question_id, answer_value in answers:
+        latest_answers[question_id] = answer_value
+
+    if not latest_answers:
+        return 0, 0
+
+    # xmax is 0 only for freshly inserted rows, which tells inserts from updates.
+    # "previous" reads the rows as they were before the upsert to compute score deltas.
+    cur.execute("""
+        WITH incoming AS (
+            SELECT t.question_id, t.answer_value
+            FROM unnest(%s::int[], %s::text[]) AS t(question_id, answer_value)
+        ),
+        previous AS (
+            SELECT a.question_id, a.answer_value
+            FROM assessment_answers a
+            JOIN incoming i ON i.question_id = a.question_id
+            WHERE a.employee_id=%s AND a.band=%s
+        ),
+        upserted AS (
+            INSERT INTO assessment_answers
+            (employee_id, band, category, question_id, answer_value)
+            SELECT %s, %s, %s, question_id, answer_value
+            FROM incoming
+            ON CONFLICT (employee_id, band, question_id)
+            DO UPDATE SET answer_value=EXCLUDED.answer_value, updated_at=NOW()
+            RETURNING question_id, category, answer_value, (xmax = 0) AS inserted
+        )
+        SELECT u.category, u.answer_value, u.inserted, p.answer_value AS previous_value
+        FROM upserted u
+        LEFT JOIN previous p ON p.question_id = u.question_id;
+    """, (
+        list(latest_answers.keys()),
+        list(latest_answers.values()),
+        employee_id,
+        band,
+        employee_id,
+        band,
+        category
+    ))
+
+    rows = cur.fetchall()
+
+    # Score and answer count changes per category
+    deltas = {}
+    for row in rows:
+        score_delta, count_delta = deltas.get(row["category"], (0, 0))
+        score_delta += answer_points(row["answer_value"])
+        if row["inserted"]:
+            count_delta += 1
+        else:
+            score_delta -= answer_points(row["previous_value"])
+        deltas[row["category"]] = (score_delta, count_delta)
+
+    apply_category_deltas(employee_id, band, deltas, cur)
+
+    inserted = sum(1 for row in rows if row["inserted"])
+    return inserted, len(rows) - inserted
+
+
+def apply_category_deltas(employee_id: str, band: str, deltas: dict, cur) -> None:
+    """
+    Add score/count changes to the running totals.
+
+    Args:
+        deltas: {category: (score_delta, count_delta)}
+    """
+    apply_category_deltas_batch(
+        {(employee_id, band, category): delta for category, delta in deltas.items()}, cur
+    )
+
+
+def apply_category_deltas_batch(deltas: dict, cur) -> None:
+    """
+    apply_category_deltas() for several assessments in one statement.
+
+    Args:
+        deltas: {(employee_id, band, category): (score_delta, count_delta)}
+    """
+    if not deltas:
+        return
+
+    keys = sorted(deltas)
+    cur.execute("""
+        INSERT INTO assessment_category_scores
+        (employee_id, band, category, score_sum, answer_count)
+        SELECT t.employee_id, t.band, t.category, t.score_delta, t.count_delta
+        FROM unnest(%s::text[], %s::text[], %s::text[], %s::int[], %s::int[])
+            AS t(employee_id, band, category, score_delta, count_delta)
+        ON CONFLICT (employee_id, band, category)
+        DO UPDATE SET
+            score_sum = assessment_category_scores.score_sum + EXCLUDED.score_sum,
+            answer_count = assessment_category_scores.answer_count + EXCLUDED.answer_count,
+            updated_at = NOW();
+    """, (
+        [employee_id for employee_id, _, _ in keys],
+        [band for _, band, _ in keys],
+        [category for _, _, category in keys],
+        [deltas[key][0] for key in keys],
+        [deltas[key][1] for key in keys]
+    ))
+
+
+def upsert_draft_answers(drafts: list, cur) -> int:
+    """
+    Write autosaved answers of any number of assessments in one INSERT ... ON CONFLICT
+    statement and apply the score changes to assessment_category_scores.
+    Call lock_assessments() for every (employee_id, band) first in the same transaction.
+
+    A draft is skipped when it is older than what is stored: when the assessment was completed
+    (or queued for finalization) after the click, or when the answer was written
+    (e.g. by a section submit) after it.
+    Ages are measured on the server and turned into database time with NOW(), so the
+    comparison does not depend on the application and database clocks agreeing.
+
+    Args:
+        drafts: List of (employee_id, band, category, question_id, answer_value, age_seconds)
+                with at most one draft per (employee_id, band, question_id)
+        cur: Database cursor (RealDictCursor)
+
+    Returns:
+        int: Number of answers written
+    """
+    if not drafts:
+        return 0
+
+    drafts = sorted(drafts)
+    cur.execute("""
+        WITH incoming AS (
+            SELECT
+                t.employee_id, t.band, t.category, t.question_id, t.answer_value,
+                NOW() - make_interval(secs => t.age) AS answered_at
+            FROM unnest(%s::text[], %s::text[], %s::text[], %s::int[], %s::text[], %s::float8[])
+                AS t(employee_id, band, category, question_id, answer_value, age)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM assessment_results r
+                WHERE r.employee_number = t.employee_id
+                  AND r.agreed_band = t.band
+                  AND r.completed_at >= NOW() - make_interval(secs => t.age)
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM assessment_finalization_jobs j
+                WHERE j.employee_id = t.employee_id
+                  AND j.band = t.band
+                  AND j.status = 'pending'
+                  AND j.requested_at >= NOW() - make_interval(secs => t.age)
+            )
+        ),
+        previous AS (
+            SELECT a.employee_id, a.band, a.question_id, a.answer_value
+            FROM assessment_answers a
+            JOIN incoming i
+              ON i.employee_id = a.employee_id AND i.band = a.band AND i.question_id = a.question_id
+        ),
+        upserted AS (
+            INSERT INTO assessment_answers
+            (employee_id, band, category, question_id, answer_value, updated_at)
+            SELECT employee_id, band, category, question_id, answer_value, answered_at
+            FROM incoming
+            ON CONFLICT (employee_id, band, question_id)
+            DO UPDATE SET answer_value=EXCLUDED.answer_value, updated_at=EXCLUDED.updated_at
+            WHERE assessment_answers.updated_at IS NULL
+               OR assessment_answers.updated_at <= EXCLUDED.updated_at
+            RETURNING employee_id, band, question_id, category, answer_value, (xmax = 0) AS inserted
+        )
+        SELECT u.employee_id, u.band, u.category, u.answer_value, u.inserted, p.answer_value AS previous_value
+        FROM upserted u
+        LEFT JOIN previous p
+          ON p.employee_id = u.employee_id AND p.band = u.band AND p.question_id = u.question_id;
+    """, tuple(list(column) for column in zip(*drafts)))
+
+    rows = cur.fetchall()
+
+    # Score and answer count changes per assessment and category
+    deltas = {}
+    for row in rows:
+        key = (row["employee_id"], row["band"], row["category"])
+        score_delta, count_delta = deltas.get(key, (0, 0))
+        score_delta += answer_points(row["answer_value"])
+        if row["inserted"]:
+            count_delta += 1
+        else:
+            score_delta -= answer_points(row["previous_value"])
+        deltas[key] = (score_delta, count_delta)
+
+    apply_category_deltas_batch(deltas, cur)
+    return len(rows)
+
+
+def read_category_totals(employee_id: str, band: str, cur) -> list:
+    """Running totals of an in-progress assessment, one row per category (ordered by category)."""
+    cur.execute("""
+        SELECT category, score_sum, answer_count
+        FROM assessment_category_scores
+        WHERE employee_id=%s AND band=%s
+        ORDER BY category;
+    """, (employee_id, band))
+    return cur.fetchall()
+
+
+def delete_assessment_answers(employee_id: str, band: str, cur) -> None:
+    """Remove an assessment's answers together with its running totals."""
+    cur.execute("""
+        DELETE FROM assessment_answers
+        WHERE employee_id=%s AND band=%s;
+    """, (employee_id, band))
+    cur.execute("""
+        DELETE FROM assessment_category_scores
+        WHERE employee_id=%s AND band=%s;
+    """, (employee_id, band))
@@ -1,44 +1,417 @@
 import os
+import time
+import threading
 import psycopg2
 from dotenv import load_dotenv
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 from fastapi import HTTPException, status
-from psycopg2.pool import SimpleConnectionPool
+from fastapi.concurrency import run_in_threadpool
+from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from metrics import record_query, record_pool_wait, record_connection_held
+from profiling import (
+    DB_PROFILE, record_statement, log_slow_query, explain_statement, is_slow, is_explainable
+)
 
 
 load_dotenv()
 
-def create_pool():
+# "sync"  - psycopg2 pool; async endpoints run their queries in the threadpool
+# "async" - psycopg 3 AsyncConnectionPool; async endpoints await their queries on the event loop
+DB_DRIVER = os.getenv("DB_DRIVER", "sync").lower()
+
+# Pool settings (shared by the sync and async pools)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))             # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))  # seconds before a connection is recycled
+DB_POOL_CHECK_IDLE = float(os.getenv("DB_POOL_CHECK_IDLE", "30"))        # ping connections idle longer than this
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+# libpq connection strings ("host=... dbname=..." or postgresql://...). The primary defaults to
+# the POSTGRES_* settings; without a replica every query goes to the primary.
+POSTGRES_DSN = os.getenv("POSTGRES_DSN", "").strip()
+POSTGRES_REPLICA_DSN = os.getenv("POSTGRES_REPLICA_DSN", "").strip()
+
+# Pool roles: writes (and reads that must see them) use the primary, other reads the replica
+PRIMARY = "primary"
+REPLICA = "replica"
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the pool timeout."""
+
+
+_timed_cursor_classes = {}
+
+
+def _query_text(query, conn) -> str:
+    if isinstance(query, bytes):
+        return query.decode()
+    if isinstance(query, str):
+        return query
+    return query.as_string(conn)   # psycopg2.sql / psycopg.sql composed query
+
+
+def _explain(cur) -> str:
+    """
+    Plan of the statement the cursor just ran (DB_PROFILE only). The statement is run
+    again inside a savepoint that is rolled back, so writes are not applied twice.
+    """
+    conn = cur.connection
+    query = cur.query.decode(psycopg2.extensions.encodings[conn.encoding])
+    if not is_explainable(query):
+        return "(statement cannot be explained)"
+    # Plain cursor: the EXPLAIN is not counted as one of the request's queries
+    plain = psycopg2.extensions.cursor(conn)
+    try:
+        plain.execute("SAVEPOINT db_profile_explain;")
+        try:
+            plain.execute(explain_statement(query))
+            return "\n".join(row[0] for row in plain.fetchall())
+        finally:
+            plain.execute("ROLLBACK TO SAVEPOINT db_profile_explain;")
+    except psycopg2.Error as e:
+        return f"(EXPLAIN failed: {str(e).strip()})"
+    finally:
+        plain.close()
+
+
+def _profile_query(cur, query, vars, seconds: float, explain: bool = True) -> None:
+    query = _query_text(query, cur.connection)
+    record_statement(query, seconds)
+    if is_slow(seconds):
+        log_slow_query(query, vars, seconds, _explain(cur) if explain else "(executemany: not explained)")
+
+
+def _timed_cursor(cursor_class):
+    """
+    Subclass of a psycopg2 cursor class that reports every query's duration to metrics
+    (and to the query profiler when DB_PROFILE is enabled).
+    """
+    timed = _timed_cursor_classes.get(cursor_class)
+    if timed is None:
+        def execute(self, query, vars=None):
+            started = time.perf_counter()
+            try:
+                result = cursor_class.execute(self, query, vars)
+            finally:
+                elapsed = time.perf_counter() - started
+                record_query(elapsed)
+            if DB_PROFILE:
+                _profile_query(self, query, vars, elapsed)
+            return result
+
+        def executemany(self, query, vars_list):
+            started = time.perf_counter()
+            try:
+                result = cursor_class.executemany(self, query, vars_list)
+            finally:
+                elapsed = time.perf_counter() - started
+                record_query(elapsed)
+            if DB_PROFILE:
+                _profile_query(self, query, vars_list, elapsed, explain=False)
+            return result
+
+        timed = type(f"Timed{cursor_class.__name__}", (cursor_class,), {
+            "execute": execute,
+            "executemany": executemany
+        })
+        _timed_cursor_classes[cursor_class] = timed
+    return timed
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors (of any cursor_factory) are timed per query."""
+
+    def cursor(self, *args, **kwargs):
+        cursor_factory = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _timed_cursor(cursor_factory)
+        return super().cursor(*args, **kwargs)
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool.
+
+    - Waits up to `timeout` seconds for a free connection instead of failing at once
+    - Pings connections that sat idle longer than `check_idle` before handing them out
+    - Replaces broken connections and recycles connections older than `max_lifetime`
+    """
+
+    def __init__(self, minconn: int, maxconn: int, timeout: float, max_lifetime: float,
+                 check_idle: float, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.check_idle = check_idle
+        self._connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, created_at, idle_since)]
+        self._created_at = {}    # id(conn) -> created_at, for connections handed out
+        self._size = 0
+        self._waiting = 0
+
+        # Counters for monitoring
+        self.checkouts = 0
+        self.timeouts = 0
+        self.discarded = 0
+        self.wait_time_total = 0.0
+
+        for _ in range(minconn):
+            conn = self._connect()
+            self._size += 1
+            self._idle.append((conn, time.monotonic(), time.monotonic()))
+
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+
+    def getconn(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            conn = None
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {self.timeout:.1f}s "
+                            f"(pool size {self.maxconn})"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, created_at, idle_since = self._idle.pop()
+                else:
+                    # Reserve a slot, then connect outside the lock
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    self._release_slot()
+                    raise
+                created_at = time.monotonic()
+            elif not self._is_usable(conn, created_at, idle_since):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._created_at[id(conn)] = created_at
+                self.checkouts += 1
+                self.wait_time_total += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, close: bool = False):
+        with self._cond:
+            created_at = self._created_at.pop(id(conn), time.monotonic())
+
+        if not close and not conn.closed:
+            tx_status = conn.info.transaction_status
+            if tx_status == TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif tx_status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+
+        if close or conn.closed or time.monotonic() - created_at > self.max_lifetime:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def _is_usable(self, conn, created_at: float, idle_since: float) -> bool:
+        if conn.closed or time.monotonic() - created_at > self.max_lifetime:
+            return False
+        if time.monotonic() - idle_since <= self.check_idle:
+            return True
+        try:
+            # Plain cursor: the ping is not a request query and is kept out of the query metrics
+            with psycopg2.extensions.connection.cursor(conn) as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self.discarded += 1
+        self._release_slot()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            conn.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "discarded": self.discarded,
+                "wait_time_total": round(self.wait_time_total, 6)
+            }
+
+
+def connection_kwargs(role: str = PRIMARY) -> dict:
+    dsn = POSTGRES_REPLICA_DSN if role == REPLICA else POSTGRES_DSN
+    if dsn:
+        kwargs = {"dsn": dsn}
+    else:
+        kwargs = {
+            "user": os.getenv("POSTGRES_USER"),
+            "password": os.getenv("POSTGRES_PASSWORD"),
+            "host": os.getenv("POSTGRES_SERVER"),
+            "port": os.getenv("POSTGRES_PORT"),
+            "dbname": os.getenv("POSTGRES_DB")
+        }
+    # Per-connection statement timeout so a runaway query cannot hold a connection forever
+    kwargs["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return kwargs
+
+
+def create_pool(role: str = PRIMARY):
     try:
-        return SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD"),
-            host=os.getenv("POSTGRES_SERVER"),
-            port=os.getenv("POSTGRES_PORT"),
-            database=os.getenv("POSTGRES_DB")
+        return ConnectionPool(
+            minconn=DB_POOL_MIN_SIZE,
+            maxconn=DB_POOL_MAX_SIZE,
+            timeout=DB_POOL_TIMEOUT,
+            max_lifetime=DB_POOL_MAX_LIFETIME,
+            check_idle=DB_POOL_CHECK_IDLE,
+            connection_factory=InstrumentedConnection,
+            **connection_kwargs(role)
         )
     except Exception as e:
-        print(f"Error creating connection pool: {e}")
+        print(f"Error creating {role} connection pool: {e}")
         raise
 
 pool = create_pool()
+# Only when POSTGRES_REPLICA_DSN is set
+replica_pool = create_pool(REPLICA) if POSTGRES_REPLICA_DSN else None
+
+# Created by open_async_pool() on application startup when DB_DRIVER=async
+async_pool = None
+async_replica_pool = None
+
+
+def create_async_pool(role: str = PRIMARY):
+    # psycopg 3 is only needed in async mode
+    from psycopg_pool import AsyncConnectionPool
+
+    kwargs = connection_kwargs(role)
+    return AsyncConnectionPool(
+        conninfo=kwargs.pop("dsn", ""),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+        check=AsyncConnectionPool.check_connection,
+        kwargs=kwargs,
+        open=False
+    )
+
+
+async def open_async_pool():
+    """Open the async pool on application startup (no-op in sync mode)."""
+    global async_pool, async_replica_pool
+    if DB_DRIVER != "async":
+        return
+    try:
+        async_pool = create_async_pool()
+        await async_pool.open()
+        if POSTGRES_REPLICA_DSN:
+            async_replica_pool = create_async_pool(REPLICA)
+            await async_replica_pool.open()
+    except Exception as e:
+        print(f"Error creating async connection pool: {e}")
+        raise
+
+
+async def close_async_pool():
+    """Close the async pools on application shutdown."""
+    global async_pool, async_replica_pool
+    if async_replica_pool is not None:
+        await async_replica_pool.close()
+        async_replica_pool = None
+    if async_pool is not None:
+        await async_pool.close()
+        async_pool = None
+
+
+def _sync_pool(role: str) -> ConnectionPool:
+    return replica_pool if role == REPLICA and replica_pool is not None else pool
 
 
-@contextmanager
 def get_db_conn():
     """
-    Synchronous context manager for database connections.
+    Synchronous context manager for connections to the primary.
     Ensures proper connection handling.
+    Waits up to DB_POOL_TIMEOUT for a free connection and answers 503 if none frees up.
+    Pool wait and connection hold times are reported to metrics.
     """
+    return _pooled_conn(pool)
+
+
+def get_replica_conn():
+    """
+    Like get_db_conn, but connected to the replica (the primary when no replica is configured).
+    Only for reads that may be a moment behind the primary; see read_routing.py.
+    """
+    return _pooled_conn(_sync_pool(REPLICA))
+
+
+@contextmanager
+def _pooled_conn(source: ConnectionPool):
     conn = None
+    started = time.perf_counter()
     try:
-        conn = pool.getconn()
-        yield conn  
-        conn.commit()  
+        try:
+            conn = source.getconn()
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+        checked_out = time.perf_counter()
+        yield conn
+        conn.commit()
+    except PoolTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Database busy: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
     except psycopg2.Error as e:
-        if conn:
+        if conn and not conn.closed:
             conn.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -46,4 +419,117 @@ def get_db_conn():
         )
     finally:
         if conn:
-            pool.putconn(conn)  
+            source.putconn(conn)
+            record_connection_held(time.perf_counter() - checked_out)
+
+
+@asynccontextmanager
+async def get_async_db_conn(role: str = PRIMARY):
+    """
+    Asynchronous context manager for database connections (DB_DRIVER=async).
+    The connection is committed on success and rolled back on error.
+    """
+    import psycopg
+    from psycopg_pool import PoolTimeout as AsyncPoolTimeout
+
+    source = async_replica_pool if role == REPLICA and async_replica_pool is not None else async_pool
+    started = time.perf_counter()
+    checked_out = None
+    try:
+        async with source.connection() as conn:
+            checked_out = time.perf_counter()
+            record_pool_wait(checked_out - started)
+            yield conn
+    except AsyncPoolTimeout as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Database busy: {str(e)}",
+            headers={"Retry-After": "1"}
+        )
+    except psycopg.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Database error: {str(e)}"
+        )
+    finally:
+        if checked_out is not None:
+            record_connection_held(time.perf_counter() - checked_out)
+
+
+def _fetch(query: str, params, fetch_all: bool, role: str):
+    with _pooled_conn(_sync_pool(role)) as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(query, params)
+        return cur.fetchall() if fetch_all else cur.fetchone()
+
+
+async def _fetch_async(query: str, params, fetch_all: bool, role: str):
+    from psycopg.rows import dict_row
+
+    async with get_async_db_conn(role) as conn:
+        cur = conn.cursor(row_factory=dict_row)
+        started = time.perf_counter()
+        try:
+            await cur.execute(query, params)
+        finally:
+            elapsed = time.perf_counter() - started
+            record_query(elapsed)
+        rows = await cur.fetchall() if fetch_all else await cur.fetchone()
+        if DB_PROFILE:
+            await _profile_async_query(conn, query, params, elapsed)
+        return rows
+
+
+async def _explain_async(conn, query: str, params) -> str:
+    """Async counterpart of _explain() for psycopg 3 connections."""
+    import psycopg
+
+    if not is_explainable(query):
+        return "(statement cannot be explained)"
+    async with conn.cursor() as cur:
+        try:
+            await cur.execute("SAVEPOINT db_profile_explain;")
+            try:
+                await cur.execute(explain_statement(query), params)
+                return "\n".join(row[0] for row in await cur.fetchall())
+            finally:
+                await cur.execute("ROLLBACK TO SAVEPOINT db_profile_explain;")
+        except psycopg.Error as e:
+            return f"(EXPLAIN failed: {str(e).strip()})"
+
+
+async def _profile_async_query(conn, query, params, seconds: float) -> None:
+    query = _query_text(query, conn)
+    record_statement(query, seconds)
+    if is_slow(seconds):
+        log_slow_query(query, params, seconds, await _explain_async(conn, query, params))
+
+
+async def fetch_one(query: str, params=None, role: str = PRIMARY):
+    """
+    Run a read query from an async endpoint without blocking the event loop.
+    Uses the async pool when DB_DRIVER=async, otherwise the psycopg2 pool in the threadpool.
+    Rows are returned as dicts in both modes. role=REPLICA reads from the replica, if any.
+    """
+    if DB_DRIVER == "async":
+        return await _fetch_async(query, params, False, role)
+    return await run_in_threadpool(_fetch, query, params, False, role)
+
+
+async def fetch_all(query: str, params=None, role: str = PRIMARY):
+    """Like fetch_one, but returns every row."""
+    if DB_DRIVER == "async":
+        return await _fetch_async(query, params, True, role)
+    return await run_in_threadpool(_fetch, query, params, True, role)
+
+
+def pool_stats() -> dict:
+    """Connection pool utilisation for monitoring."""
+    stats = {"driver": DB_DRIVER, "sync": pool.stats()}
+    if replica_pool is not None:
+        stats["replica"] = replica_pool.stats()
+    if async_pool is not None:
+        stats["async"] = async_pool.get_stats()
+    if async_replica_pool is not None:
+        stats["async_replica"] = async_replica_pool.get_stats()
+    return stats
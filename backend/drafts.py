@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+import psycopg2
+from fastapi import HTTPException
+from psycopg2.extras import RealDictCursor
+from database import get_db_conn
+from answers import lock_assessments, upsert_draft_answers
+from read_routing import record_writes
+
+
+# Pending drafts are written at least this often...
+DRAFT_FLUSH_INTERVAL_MS = int(os.getenv("DRAFT_FLUSH_INTERVAL_MS", "500"))
+# ...and as soon as this many distinct answers are pending
+DRAFT_FLUSH_BATCH_SIZE = int(os.getenv("DRAFT_FLUSH_BATCH_SIZE", "500"))
+# Autosaves are refused (503) while this many answers are waiting, e.g. when Postgres is down
+DRAFT_MAX_PENDING = int(os.getenv("DRAFT_MAX_PENDING", "20000"))
+# A draft is dropped after this many flushes failed to write it (e.g. a long database outage)
+DRAFT_MAX_ATTEMPTS = int(os.getenv("DRAFT_MAX_ATTEMPTS", "20"))
+
+
+class DraftBufferFull(Exception):
+    """Raised when DRAFT_MAX_PENDING answers are already waiting to be written."""
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a flush failed because of the database (busy, unreachable, deadlock) rather than its drafts."""
+    # get_db_conn turns pool timeouts into 503s and psycopg2 errors into 500s
+    if isinstance(error, HTTPException):
+        if error.status_code == 503:
+            return True
+        error = error.__context__
+    return isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError))
+
+
+class DraftBuffer:
+    """
+    In-process write-behind buffer for autosaved answers.
+
+    Drafts are coalesced per (employee_id, band, question_id): a question clicked ten times
+    between two flushes is written once, with the last value. A background thread writes
+    all pending drafts every DRAFT_FLUSH_INTERVAL_MS, or earlier once DRAFT_FLUSH_BATCH_SIZE
+    are pending, in one transaction with a single upsert (see answers.upsert_draft_answers).
+
+    Drafts are best effort: the ones still pending when a worker is killed are lost,
+    and the section submit remains the authoritative write. When a flush fails because of
+    its drafts rather than the database, the batch is written again in halves, so a draft
+    that cannot be written is isolated and dropped instead of blocking the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (employee_id, band, question_id) -> (category, answer_value, received_at monotonic, failed attempts)
+        self._pending = {}
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.received = 0
+        self.coalesced = 0
+        self.written = 0
+        self.skipped = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_flush_ms = None
+
+    def put(self, employee_id: str, band: str, category: str, question_id: int, answer_value: str) -> int:
+        """
+        Queue an answer, replacing a pending one for the same question.
+
+        Returns:
+            int: Number of answers pending after this one
+        """
+        key = (employee_id, band, question_id)
+        with self._lock:
+            if key not in self._pending and len(self._pending) >= DRAFT_MAX_PENDING:
+                raise DraftBufferFull(f"{len(self._pending)} autosaved answers are waiting to be written")
+            self.received += 1
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = (category, answer_value, time.monotonic(), 0)
+            pending = len(self._pending)
+        if pending >= DRAFT_FLUSH_BATCH_SIZE:
+            self._wake.set()
+        return pending
+
+    def pending_answers(self, employee_id: str, band: str, category: str) -> dict:
+        """Pending drafts of one section as {question_id: answer_value}, to show them before they are written."""
+        with self._lock:
+            return {
+                question_id: answer_value
+                for (draft_employee, draft_band, question_id), (draft_category, answer_value, _, _) in self._pending.items()
+                if draft_employee == employee_id and draft_band == band and draft_category == category
+            }
+
+    def flush(self) -> int:
+        """
+        Write every pending draft in one transaction.
+        If the database is unavailable the drafts are put back, unless a newer value for the
+        same question arrived in the meantime, and dropped after DRAFT_MAX_ATTEMPTS flushes.
+        Any other failure is retried in halves; a draft that fails on its own is dropped.
+
+        Returns:
+            int: Number of answers written
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        written = self._write_batch(list(batch.items()))
+
+        with self._lock:
+            self.flushes += 1
+            self.last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+        return written
+
+    def _write_batch(self, items: list) -> int:
+        """Write [(key, pending value)] in one transaction, splitting it on a failure caused by its drafts."""
+        now = time.monotonic()
+        drafts = [
+            (employee_id, band, category, question_id, answer_value, max(now - received_at, 0.0))
+            for (employee_id, band, question_id), (category, answer_value, received_at, _) in items
+        ]
+
+        try:
+            with get_db_conn() as conn:
+                cur = conn.cursor(cursor_factory=RealDictCursor)
+                lock_assessments({(draft[0], draft[1]) for draft in drafts}, cur)
+                written = upsert_draft_answers(drafts, cur)
+                record_writes({draft[0] for draft in drafts}, cur)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            if _is_transient(e):
+                self._retry_later(items, e)
+                return 0
+            if len(items) == 1:
+                with self._lock:
+                    self.dropped += 1
+                print(f"Dropping autosaved answer {items[0][0]} that cannot be written: {e}")
+                return 0
+            middle = len(items) // 2
+            return self._write_batch(items[:middle]) + self._write_batch(items[middle:])
+
+        with self._lock:
+            self.written += written
+            self.skipped += len(drafts) - written
+        return written
+
+    def _retry_later(self, items: list, error: Exception) -> None:
+        dropped = 0
+        with self._lock:
+            for key, (category, answer_value, received_at, attempts) in items:
+                if attempts + 1 >= DRAFT_MAX_ATTEMPTS:
+                    dropped += 1
+                    continue
+                self._pending.setdefault(key, (category, answer_value, received_at, attempts + 1))
+            self.dropped += dropped
+        print(f"Error writing {len(items)} autosaved answers ({dropped} dropped after "
+              f"{DRAFT_MAX_ATTEMPTS} attempts): {error}")
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(DRAFT_FLUSH_INTERVAL_MS / 1000)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher (application startup)."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="draft-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the flusher and write what is still pending (application shutdown)."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "received": self.received,
+                "coalesced": self.coalesced,
+                "written": self.written,
+                "skipped_stale": self.skipped,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "dropped": self.dropped,
+                "last_flush_ms": self.last_flush_ms,
+                "flush_interval_ms": DRAFT_FLUSH_INTERVAL_MS,
+                "flush_batch_size": DRAFT_FLUSH_BATCH_SIZE,
+                "max_pending": DRAFT_MAX_PENDING,
+                "max_attempts": DRAFT_MAX_ATTEMPTS
+            }
+
+
+# Process-wide buffer used by the API
+draft_buffer = DraftBuffer()
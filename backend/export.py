@@ -0,0 +1,153 @@
+import os
+import io
+import csv
+from database import get_replica_conn
+from http_cache import serialize_json
+from psycopg2.extras import RealDictCursor
+
+
+# Results fetched from the server-side cursor per round trip
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# Response chunks are sent once this many bytes of rows are buffered
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson"
+}
+
+EMPLOYEE_COLUMNS = [
+    "Employee_Name", "Agreed_Band", "Managers_Manager", "Reporting_Manager",
+    "Department", "Current_Account", "Current_Cost_Center", "Current_Designation"
+]
+RESULT_COLUMNS = ["result_id", "employee_number", "band", "total_score", "completed_at"]
+SCORE_COLUMNS = ["category", "category_score"]
+ANSWER_COLUMNS = ["question", "answer_value"]
+
+
+def export_columns(include_answers: bool) -> list:
+    columns = RESULT_COLUMNS + EMPLOYEE_COLUMNS + SCORE_COLUMNS
+    return columns + ANSWER_COLUMNS if include_answers else columns
+
+
+def _export_query(include_answers: bool) -> str:
+    # questions_answers is only read when it is exported; it is most of the row's size
+    answers = """
+                CASE WHEN jsonb_typeof(r.questions_answers) = 'string' AND r.questions_answers #>> '{}' <> ''
+                     THEN (r.questions_answers #>> '{}')::jsonb
+                     ELSE r.questions_answers END""" if include_answers else "NULL::jsonb"
+    return f"""
+        SELECT
+            r.id AS result_id,
+            r.employee_number,
+            r.agreed_band AS band,
+            r.total_score,
+            r.completed_at,
+            CASE WHEN jsonb_typeof(r.category_scores) = 'string' AND r.category_scores #>> '{{}}' <> ''
+                 THEN (r.category_scores #>> '{{}}')::jsonb
+                 ELSE r.category_scores END AS category_scores,
+            {answers.strip()} AS questions_answers,
+            {", ".join(f'e."{column}"' for column in EMPLOYEE_COLUMNS)}
+        FROM assessment_results r
+        LEFT JOIN LATERAL (
+            SELECT *
+            FROM sails_employee_data
+            WHERE "Employee_Number" = r.employee_number
+            LIMIT 1
+        ) e ON TRUE
+        WHERE (%(band)s::text IS NULL OR r.agreed_band = %(band)s)
+          AND (%(completed_after)s::timestamp IS NULL OR r.completed_at > %(completed_after)s)
+        ORDER BY r.id;
+    """
+
+
+def _json_list(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def flatten_result(row: dict, include_answers: bool):
+    """
+    Flat export rows of one assessment result: one per category score,
+    or one per answered question when include_answers is set.
+    """
+    base = {column: row[column] for column in RESULT_COLUMNS + EMPLOYEE_COLUMNS}
+    if base["completed_at"] is not None:
+        base["completed_at"] = base["completed_at"].isoformat()
+
+    answers_by_category = {}
+    if include_answers:
+        for section in _json_list(row["questions_answers"]):
+            if isinstance(section, dict):
+                answers_by_category[section.get("category")] = _json_list(section.get("questions"))
+
+    for entry in _json_list(row["category_scores"]):
+        if not isinstance(entry, dict):
+            continue
+        scored = {**base, "category": entry.get("category"), "category_score": entry.get("score")}
+        if not include_answers:
+            yield scored
+            continue
+        for answer in answers_by_category.get(entry.get("category"), []):
+            yield {**scored, "question": answer.get("question"), "answer_value": answer.get("answer_value")}
+
+
+def _take(buffer: io.StringIO) -> bytes:
+    chunk = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def stream_assessment_results(export_format: str, include_answers: bool = False,
+                              band: str = None, completed_after=None):
+    """
+    Generator of response chunks with every matching assessment result, flattened into rows.
+    Results are read through a server-side cursor in batches of EXPORT_BATCH_SIZE
+    (a tenth of that with answers),
+    so memory stays flat however many results are exported.
+    The first chunk is produced only after the first batch has been fetched; the pool
+    connection is held until the client has received the last chunk.
+
+    Args:
+        export_format: "csv" or "ndjson"
+        include_answers: One row per answered question instead of one per category score
+        band: Only export results of this band
+        completed_after: Only export results completed after this time
+    """
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=export_columns(include_answers), lineterminator="\n")
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            buffer.write(serialize_json(row).decode("utf-8"))
+            buffer.write("\n")
+
+    # A result with its questions_answers is ~100x the size of one without
+    batch_size = max(EXPORT_BATCH_SIZE // 10, 1) if include_answers else EXPORT_BATCH_SIZE
+
+    # A bulk read: served by the replica when there is one
+    with get_replica_conn() as conn:
+        # Named cursor: rows stay on the server until fetched
+        cur = conn.cursor(name="assessment_results_export", cursor_factory=RealDictCursor)
+        cur.itersize = batch_size
+        cur.execute(_export_query(include_answers), {"band": band, "completed_after": completed_after})
+        try:
+            # The first batch is fetched before anything is yielded (see the export endpoint)
+            results = cur.fetchmany(batch_size)
+            if export_format == "csv":
+                writer.writeheader()
+
+            while True:
+                # Rows are flattened one at a time: with answers a batch expands ~125x
+                for result in results:
+                    for row in flatten_result(result, include_answers):
+                        write_row(row)
+                    if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                        yield _take(buffer)
+                if len(results) < batch_size:
+                    break
+                results = cur.fetchmany(batch_size)
+            yield _take(buffer)
+        finally:
+            cur.close()
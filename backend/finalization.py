@@ -0,0 +1,328 @@
+"""
+Background finalization of completed assessments.
+
+When the last section of an assessment is submitted, /assessment/section/submit only queues
+a row in assessment_finalization_jobs (in the submit transaction, so a saved completion always
+has its job). This worker then moves the assessment to assessment_results: it builds the
+questions_answers document, upserts the result, updates the analytics aggregates and deletes
+the answers, all in one transaction per job.
+
+Jobs are idempotent: finalizing an assessment whose answers were already moved only records the
+existing result. A failed job is retried with exponential backoff (FINALIZATION_RETRY_SECONDS,
+doubled per attempt) until FINALIZATION_MAX_ATTEMPTS, then left as failed with its last error.
+Workers wake up on NOTIFY and also poll every FINALIZATION_POLL_SECONDS; several can run at once.
+Unless FINALIZATION_WORKER=false, every API process runs one in a background thread, so this
+script is only needed for separate workers or for --once.
+Clients poll GET /assessment/finalization/{employee_id}/{band} for the result.
+
+Usage (from backend/):
+    python finalization.py              # run a worker until interrupted
+    python finalization.py --once       # finalize every due job and exit
+"""
+import os
+import json
+import time
+import select
+import argparse
+import threading
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from database import get_db_conn, connection_kwargs
+from question_bank import question_bank
+from read_routing import record_writes
+from answers import (
+    lock_assessment, try_lock_assessment, read_category_totals, delete_assessment_answers, score_percentage
+)
+from analytics import record_completed_assessment
+
+
+FINALIZATION_MAX_ATTEMPTS = int(os.getenv("FINALIZATION_MAX_ATTEMPTS", "5"))
+FINALIZATION_RETRY_SECONDS = float(os.getenv("FINALIZATION_RETRY_SECONDS", "5"))   # first retry delay
+FINALIZATION_POLL_SECONDS = float(os.getenv("FINALIZATION_POLL_SECONDS", "5"))     # fallback when NOTIFY is missed
+# Run a worker thread in every API process (main.py lifespan)
+FINALIZATION_WORKER = os.getenv("FINALIZATION_WORKER", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# NOTIFY channel queued jobs are announced on
+FINALIZATION_CHANNEL = "assessment_finalization"
+
+
+class FinalizationError(Exception):
+    """Raised when an assessment cannot be finalized (e.g. it is no longer complete)."""
+
+
+def enqueue_finalization(employee_id: str, band: str, cur) -> None:
+    """
+    Queue the finalization of a completed assessment in the caller's transaction.
+    A job that already exists for the employee and band is queued again from scratch.
+    """
+    cur.execute("""
+        INSERT INTO assessment_finalization_jobs (employee_id, band)
+        VALUES (%s, %s)
+        ON CONFLICT (employee_id, band)
+        DO UPDATE SET
+            status = 'pending',
+            attempts = 0,
+            requested_at = NOW(),
+            run_after = NOW(),
+            finished_at = NULL,
+            last_error = NULL;
+    """, (employee_id, band))
+    # Delivered to listening workers when the transaction commits
+    cur.execute("SELECT pg_notify(%s, %s);", (FINALIZATION_CHANNEL, f"{employee_id}:{band}"))
+
+
+def finalize_assessment(employee_id: str, band: str, cur) -> int:
+    """
+    Move a completed assessment from assessment_answers to assessment_results.
+
+    Args:
+        employee_id: Employee ID
+        band: Band name
+        cur: Database cursor (RealDictCursor)
+
+    Returns:
+        int: assessment_results.id of the result
+    """
+    lock_assessment(employee_id, band, cur)
+
+    category_totals = read_category_totals(employee_id, band, cur)
+    answered_count = sum(row["answer_count"] for row in category_totals)
+
+    cur.execute("""
+        SELECT id FROM assessment_results
+        WHERE employee_number=%s AND agreed_band=%s
+        ORDER BY completed_at DESC LIMIT 1;
+    """, (employee_id, band))
+    existing_result = cur.fetchone()
+
+    if answered_count == 0 and existing_result:
+        # Already finalized by an earlier attempt that committed
+        return existing_result["id"]
+
+    band_questions = question_bank.get(band, cur)
+    if band_questions is None:
+        raise FinalizationError(f"Band {band} has no questions")
+    expected_questions = band_questions.expected_questions
+    if answered_count < expected_questions:
+        raise FinalizationError(
+            f"Assessment of {employee_id} in band {band} has {answered_count} of {expected_questions} answers"
+        )
+
+    # Calculate percentage scores per category
+    category_scores_list = []
+    total_score_sum = 0
+    total_answer_count = 0
+    for row in category_totals:
+        category_scores_list.append({
+            "category": row["category"],
+            "score": score_percentage(row["score_sum"], row["answer_count"])
+        })
+        total_score_sum += row["score_sum"]
+        total_answer_count += row["answer_count"]
+    total_score = round(score_percentage(total_score_sum, total_answer_count), 2)
+
+    # Store all questions and answers as JSON for history viewing
+    cur.execute("""
+        SELECT a.category, q.question, a.answer_value
+        FROM assessment_answers a
+        JOIN question_bank q ON q.question_id = a.question_id
+        WHERE a.employee_id=%s AND a.band=%s
+        ORDER BY a.category, a.id;
+    """, (employee_id, band))
+
+    # Group answers by category for storage
+    answers_by_category = {}
+    for answer in cur.fetchall():
+        answers_by_category.setdefault(answer["category"], []).append({
+            "question": answer["question"],
+            "answer_value": answer["answer_value"]
+        })
+    answers_list = [
+        {"category": category, "questions": questions}
+        for category, questions in answers_by_category.items()
+    ]
+
+    category_scores_json = json.dumps(category_scores_list)
+    answers_json = json.dumps(answers_list)
+
+    if existing_result:
+        cur.execute("""
+            UPDATE assessment_results
+            SET total_score=%s, category_scores=%s, questions_answers=%s, completed_at=NOW()
+            WHERE id=%s;
+        """, (total_score, category_scores_json, answers_json, existing_result["id"]))
+        result_id = existing_result["id"]
+    else:
+        cur.execute("""
+            INSERT INTO assessment_results
+            (employee_number, agreed_band, total_score, category_scores, questions_answers, completed_at)
+            VALUES (%s, %s, %s, %s, %s, NOW())
+            RETURNING id;
+        """, (employee_id, band, total_score, category_scores_json, answers_json))
+        result_id = cur.fetchone()["id"]
+
+    # Add the result to the organisation-wide analytics aggregates
+    record_completed_assessment(employee_id, band, total_score, category_scores_list, cur)
+
+    # The answers now live in assessment_results
+    delete_assessment_answers(employee_id, band, cur)
+    # The employee's dashboard reads the new result from the primary until the replica has it
+    record_writes([employee_id], cur)
+    return result_id
+
+
+def run_next_job():
+    """
+    Claim and run the oldest due job, if any.
+
+    Returns:
+        dict: {"employee_id", "band", "status", ...} of the job, or None when no job is due
+    """
+    with get_db_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        # The row lock keeps other workers off this job until the transaction ends
+        cur.execute("""
+            SELECT employee_id, band, attempts
+            FROM assessment_finalization_jobs
+            WHERE status = 'pending' AND run_after <= NOW()
+            ORDER BY run_after
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED;
+        """)
+        job = cur.fetchone()
+        if job is None:
+            return None
+        employee_id, band = job["employee_id"], job["band"]
+
+        # A submit of this assessment holds its lock and is about to queue the job again:
+        # waiting here would deadlock with it (it waits for this row), so try again shortly
+        if not try_lock_assessment(employee_id, band, cur):
+            cur.execute("""
+                UPDATE assessment_finalization_jobs
+                SET run_after = NOW() + INTERVAL '1 second'
+                WHERE employee_id=%s AND band=%s;
+            """, (employee_id, band))
+            return {"employee_id": employee_id, "band": band, "status": "deferred"}
+
+        attempts = job["attempts"] + 1
+        cur.execute("SAVEPOINT finalization;")
+        try:
+            result_id = finalize_assessment(employee_id, band, cur)
+        except Exception as e:
+            cur.execute("ROLLBACK TO SAVEPOINT finalization;")
+            status = "failed" if attempts >= FINALIZATION_MAX_ATTEMPTS else "pending"
+            retry_seconds = FINALIZATION_RETRY_SECONDS * 2 ** (attempts - 1)
+            cur.execute("""
+                UPDATE assessment_finalization_jobs
+                SET status=%s, attempts=%s, last_error=%s,
+                    run_after = NOW() + make_interval(secs => %s),
+                    finished_at = CASE WHEN %s = 'failed' THEN NOW() END
+                WHERE employee_id=%s AND band=%s;
+            """, (status, attempts, str(e), retry_seconds, status, employee_id, band))
+            print(f"Error finalizing assessment of {employee_id} in band {band} (attempt {attempts}): {e}")
+            return {"employee_id": employee_id, "band": band, "status": status, "error": str(e)}
+
+        cur.execute("""
+            UPDATE assessment_finalization_jobs
+            SET status='done', attempts=%s, result_id=%s, finished_at=NOW(), last_error=NULL
+            WHERE employee_id=%s AND band=%s;
+        """, (attempts, result_id, employee_id, band))
+        return {"employee_id": employee_id, "band": band, "status": "done", "result_id": result_id}
+
+
+def run_due_jobs() -> int:
+    """Run jobs until none is due. Returns the number of jobs run."""
+    count = 0
+    while run_next_job() is not None:
+        count += 1
+    return count
+
+
+class FinalizationWorker:
+    """Runs due jobs whenever a job is queued (LISTEN) and every FINALIZATION_POLL_SECONDS."""
+
+    def __init__(self, poll_seconds: float = FINALIZATION_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._stopping = threading.Event()
+        self._listener = None
+        self._thread = None
+
+    def _listen(self):
+        conn = psycopg2.connect(**connection_kwargs())
+        conn.autocommit = True
+        conn.cursor().execute(f"LISTEN {FINALIZATION_CHANNEL};")
+        return conn
+
+    def _wait(self) -> None:
+        """Sleep until a job is announced, the poll interval passes or the worker is stopped."""
+        deadline = time.monotonic() + self.poll_seconds
+        try:
+            # At most a second at a time, so stop() at application shutdown does not wait a whole interval
+            while not self._stopping.is_set() and time.monotonic() < deadline:
+                timeout = min(1.0, max(deadline - time.monotonic(), 0.0))
+                if select.select([self._listener], [], [], timeout) != ([], [], []):
+                    self._listener.poll()
+                    self._listener.notifies.clear()
+                    return
+        except (psycopg2.Error, OSError) as e:
+            print(f"Finalization worker lost its LISTEN connection: {e}")
+            self._listener = None
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                # Listen before looking for jobs, so none queued in between is missed
+                if self._listener is None or self._listener.closed:
+                    self._listener = self._listen()
+                run_due_jobs()
+            except Exception as e:
+                # e.g. the database is unreachable; the jobs stay queued
+                print(f"Error running finalization jobs: {e}")
+                self._stopping.wait(self.poll_seconds)
+                continue
+            self._wait()
+        if self._listener is not None:
+            self._listener.close()
+
+    def start(self) -> None:
+        """Run in a background thread (application startup)."""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name="finalization-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop after the current batch; waits for the background thread if start() was used."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+finalization_worker = FinalizationWorker()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Finalize completed assessments queued by the API.")
+    parser.add_argument("--once", action="store_true", help="Run every due job and exit")
+    parser.add_argument("--poll-seconds", type=float, default=FINALIZATION_POLL_SECONDS,
+                        help="Seconds between checks for jobs when no NOTIFY arrives")
+    args = parser.parse_args()
+
+    if args.once:
+        started = time.perf_counter()
+        count = run_due_jobs()
+        print(f"Ran {count} finalization jobs in {time.perf_counter() - started:.2f}s")
+        return
+
+    print("Finalization worker started")
+    try:
+        FinalizationWorker(args.poll_seconds).run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+
+try:
+    # Fast serializer; orjson.Fragment embeds already-serialized JSON without decoding it
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Browser/proxy cache lifetime (seconds) for reference data shared by all employees
+REFERENCE_CACHE_MAX_AGE = int(os.getenv("REFERENCE_CACHE_MAX_AGE", "300"))
+REFERENCE_CACHE_CONTROL = f"public, max-age={REFERENCE_CACHE_MAX_AGE}"
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag from the content hash of a response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header already names this ETag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    # Weak comparison: W/"x" matches "x"
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class RawJSON:
+    """JSON text (e.g. a jsonb column selected as ::text) to embed in a response as-is."""
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+def raw_json(text: str):
+    """
+    Wrap JSON text coming from Postgres so serialize_json() copies it into the body
+    instead of decoding and re-encoding it.
+    """
+    if orjson is not None:
+        return orjson.Fragment(text)
+    return RawJSON(text)
+
+
+def _default(value):
+    if isinstance(value, RawJSON):
+        # Without orjson the stdlib encoder can only embed decoded values
+        return json.loads(value.text)
+    return str(value)
+
+
+def serialize_json(payload) -> bytes:
+    """Serialize like FastAPI's default JSONResponse (orjson when installed)."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=str)
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default
+    ).encode("utf-8")
+
+
+def conditional_response(request: Request, body: bytes, etag: str = None,
+                         cache_control: str = None) -> Response:
+    """
+    Return the body with an ETag, or an empty 304 if the client already has it.
+
+    Args:
+        request: Incoming request (reads If-None-Match)
+        body: Serialized JSON body
+        etag: Precomputed ETag; derived from the body if omitted
+        cache_control: Optional Cache-Control header value
+    """
+    etag = etag or etag_for(body)
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    """
+    Bounded in-process cache of serialized response bodies and their ETags.
+    Keys should include the version of the data they were built from,
+    so a reload of that data naturally misses and rebuilds.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build) -> tuple:
+        """
+        Return (body, etag) for key, calling build() for the payload on a miss.
+
+        Args:
+            key: Hashable cache key (include the data version)
+            build: Zero-argument callable returning the JSON payload
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+
+        body = serialize_json(build())
+        entry = (body, etag_for(body))
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,187 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import HTTPException, Response
+from http_cache import serialize_json
+
+
+# How long a stored response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+# Stored responses kept in memory per worker (the table serves the rest)
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Expired keys are deleted in batches of this size, once every this many new keys
+IDEMPOTENCY_PURGE_BATCH = 1000
+
+# Response header marking a replayed response
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def request_fingerprint(payload) -> str:
+    """Hash of a request body, to tell a retry from a different request reusing the key."""
+    return hashlib.sha256(serialize_json(payload)).hexdigest()
+
+
+def replay_response(key: str, status_code: int, body: bytes) -> Response:
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers={"Idempotency-Key": key, REPLAYED_HEADER: "true"}
+    )
+
+
+class IdempotencyStore:
+    """
+    Responses of requests sent with an Idempotency-Key header, so retries get the first
+    response instead of being processed again.
+
+    The key is claimed in the request's own transaction (idempotency_keys table) and the
+    response is stored before that transaction commits, so a response is stored exactly when
+    the request's writes are. A retry arriving while the first attempt is still running waits
+    on the claimed row and then replays its response; if the first attempt fails, the retry
+    takes over the key. Recent responses are also kept in a bounded in-process LRU cache,
+    so most retries are answered without touching Postgres.
+    """
+
+    def __init__(self, max_entries: int = IDEMPOTENCY_CACHE_SIZE, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (endpoint, key) -> (fingerprint, status_code, body, expires_at)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._claims = 0
+        self.hits = 0
+        self.replays = 0
+        self.stored = 0
+
+    @staticmethod
+    def validate_key(key: str) -> None:
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+            )
+
+    def _replay(self, key: str, fingerprint: str, stored_fingerprint: str,
+                status_code: int, body: bytes) -> Response:
+        if stored_fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        return replay_response(key, status_code, body)
+
+    def cached(self, endpoint: str, key: str, fingerprint: str):
+        """Stored response from the in-process cache, or None."""
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                del self._entries[(endpoint, key)]
+                return None
+            self._entries.move_to_end((endpoint, key))
+            self.hits += 1
+        return self._replay(key, fingerprint, entry[0], entry[1], entry[2])
+
+    def claim(self, endpoint: str, key: str, fingerprint: str, cur):
+        """
+        Claim the key in the caller's transaction.
+
+        Returns:
+            Response: The stored response when the key was already used (replay), or
+            None when the key is now claimed and the request should be processed
+        """
+        cur.execute("""
+            INSERT INTO idempotency_keys (endpoint, idempotency_key, request_hash, expires_at)
+            VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+            ON CONFLICT (endpoint, idempotency_key)
+            DO UPDATE SET
+                request_hash = EXCLUDED.request_hash,
+                status_code = NULL,
+                response = NULL,
+                created_at = NOW(),
+                expires_at = EXCLUDED.expires_at
+            WHERE idempotency_keys.expires_at <= NOW()
+            RETURNING idempotency_key;
+        """, (endpoint, key, fingerprint, self.ttl_seconds))
+        if cur.fetchone() is not None:
+            self._purge_expired(cur)
+            return None
+
+        # Used by a committed request that has not expired
+        cur.execute("""
+            SELECT request_hash, status_code, response,
+                   EXTRACT(EPOCH FROM expires_at - NOW()) AS expires_in
+            FROM idempotency_keys
+            WHERE endpoint=%s AND idempotency_key=%s;
+        """, (endpoint, key))
+        row = cur.fetchone()
+        body = row["response"].encode("utf-8")
+        self._remember(endpoint, key, row["request_hash"], row["status_code"], body,
+                       time.time() + float(row["expires_in"]))
+        with self._lock:
+            self.replays += 1
+        return self._replay(key, fingerprint, row["request_hash"], row["status_code"], body)
+
+    def store(self, endpoint: str, key: str, status_code: int, payload, cur) -> bytes:
+        """
+        Save the response of a claimed key in the caller's transaction.
+        Call remember() once the transaction has committed.
+
+        Returns:
+            bytes: The serialized response body
+        """
+        body = serialize_json(payload)
+        cur.execute("""
+            UPDATE idempotency_keys
+            SET status_code=%s, response=%s
+            WHERE endpoint=%s AND idempotency_key=%s;
+        """, (status_code, body.decode("utf-8"), endpoint, key))
+        return body
+
+    def remember(self, endpoint: str, key: str, fingerprint: str, status_code: int, body: bytes) -> None:
+        """Cache a stored response in this worker after its transaction committed."""
+        self._remember(endpoint, key, fingerprint, status_code, body, time.time() + self.ttl_seconds)
+        with self._lock:
+            self.stored += 1
+
+    def _remember(self, endpoint: str, key: str, fingerprint: str, status_code: int,
+                  body: bytes, expires_at: float) -> None:
+        with self._lock:
+            self._entries[(endpoint, key)] = (fingerprint, status_code, body, expires_at)
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _purge_expired(self, cur) -> None:
+        with self._lock:
+            self._claims += 1
+            due = self._claims % IDEMPOTENCY_PURGE_BATCH == 0
+        if due:
+            cur.execute("""
+                DELETE FROM idempotency_keys
+                WHERE ctid IN (
+                    SELECT ctid FROM idempotency_keys
+                    WHERE expires_at <= NOW()
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                );
+            """, (IDEMPOTENCY_PURGE_BATCH,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "cache_hits": self.hits,
+                "table_replays": self.replays,
+                "stored": self.stored
+            }
+
+
+idempotency_store = IdempotencyStore()
@@ -0,0 +1,423 @@
+"""
+Load test for the assessment workflow.
+
+Seeds N synthetic employees (copies of the sails_employee_data shape), then runs the
+frontend's flow for each of them concurrently:
+
+    employeeData -> random-questions -> 5x section/submit -> finalization (polled)
+        -> history -> score-evaluation
+
+and reports throughput, p50/p95/p99 latency per endpoint and database queries per request.
+Results are written as JSON so runs can be compared between commits.
+
+By default the app is served in-process (httpx ASGI transport) against the database in .env;
+with --base-url the requests go to a running server instead, whose finalization worker thread
+(or a separate python finalization.py with FINALIZATION_WORKER=false) finishes the completions.
+Queries per request are read from the Server-Timing header the backend's metrics middleware
+adds to every response.
+
+Usage (from backend/):
+    python load_test.py --employees 200 --concurrency 20
+    python load_test.py --base-url http://localhost:8000 --employees 500 --concurrency 50
+    python load_test.py --compare results/before.json results/after.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+import platform
+import re
+import subprocess
+from datetime import datetime, timezone
+import httpx
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+from dotenv import load_dotenv
+from analytics import rebuild_analytics
+from finalization import FinalizationWorker, FINALIZATION_WORKER
+
+
+load_dotenv()
+
+DEFAULT_PREFIX = "LOADTEST-"
+EMPLOYEE_COLUMNS = [
+    "Employee_Number", "Employee_Name", "Agreed_Band", "Managers_Manager", "Reporting_Manager",
+    "Department", "Current_Account", "Current_Cost_Center", "Current_Designation"
+]
+
+# Seconds between finalization status polls, as the frontend does
+FINALIZATION_POLL_INTERVAL = 0.2
+
+# Server-Timing: db;dur=1.20;desc="3 queries", ...
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def connect():
+    return psycopg2.connect(
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        host=os.getenv("POSTGRES_SERVER"),
+        port=os.getenv("POSTGRES_PORT"),
+        dbname=os.getenv("POSTGRES_DB")
+    )
+
+
+def cleanup(prefix: str) -> None:
+    """Remove synthetic employees and everything they submitted."""
+    pattern = prefix + "%"
+    with connect() as conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM assessment_answers WHERE employee_id LIKE %s;", (pattern,))
+        cur.execute("DELETE FROM assessment_category_scores WHERE employee_id LIKE %s;", (pattern,))
+        cur.execute("DELETE FROM assessment_results WHERE employee_number LIKE %s;", (pattern,))
+        cur.execute("DELETE FROM assessment_finalization_jobs WHERE employee_id LIKE %s;", (pattern,))
+        cur.execute('DELETE FROM sails_employee_data WHERE "Employee_Number" LIKE %s;', (pattern,))
+        # Take the synthetic results back out of the analytics aggregates
+        cur.execute("SELECT 1 FROM analytics_assessment_facts WHERE employee_number LIKE %s LIMIT 1;", (pattern,))
+        if cur.fetchone():
+            rebuild_analytics(cur)
+    conn.close()
+
+
+def seed_employees(count: int, prefix: str, seed: int) -> list:
+    """
+    Insert `count` synthetic employees modelled on the real rows.
+    Bands are spread over the bands that have both questions and interpretation rules.
+
+    Returns:
+        list: Synthetic employee numbers
+    """
+    rng = random.Random(seed)
+    with connect() as conn, conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("""
+            SELECT DISTINCT q.band
+            FROM question_bank q
+            JOIN interpretations_and_focus_area i ON i."Band" = q.band
+            WHERE q.active
+            ORDER BY q.band;
+        """)
+        bands = [row["band"] for row in cur.fetchall()]
+        if not bands:
+            raise RuntimeError("No band has both questions and interpretation rules; load the seeds first")
+
+        cur.execute(
+            'SELECT * FROM sails_employee_data WHERE "Employee_Number" NOT LIKE %s;',
+            (prefix + "%",)
+        )
+        templates = cur.fetchall() or [{column: None for column in EMPLOYEE_COLUMNS}]
+
+        employee_ids = [f"{prefix}{i:06d}" for i in range(1, count + 1)]
+        rows = []
+        for i, employee_id in enumerate(employee_ids):
+            template = rng.choice(templates)
+            rows.append((
+                employee_id,
+                f"Load Test Employee {i + 1}",
+                bands[i % len(bands)],
+                template["Managers_Manager"],
+                template["Reporting_Manager"],
+                template["Department"],
+                template["Current_Account"],
+                template["Current_Cost_Center"],
+                template["Current_Designation"]
+            ))
+
+        execute_values(
+            cur,
+            "INSERT INTO sails_employee_data ({}) VALUES %s;".format(
+                ", ".join(f'"{column}"' for column in EMPLOYEE_COLUMNS)
+            ),
+            rows
+        )
+    conn.close()
+    return employee_ids
+
+
+# ---------------------------------------------------------------------------
+# Workflow
+# ---------------------------------------------------------------------------
+
+class Recorder:
+    """Latency, status and query samples per endpoint."""
+
+    def __init__(self):
+        self.samples = {}
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        elapsed = time.perf_counter() - started
+
+        sample = self.samples.setdefault(endpoint, {"latencies": [], "errors": 0, "queries": []})
+        sample["latencies"].append(elapsed)
+        if status == 0 or status >= 400:
+            sample["errors"] += 1
+        if response is not None:
+            match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+            if match:
+                sample["queries"].append(int(match.group(1)))
+
+        if response is None or status >= 400:
+            raise WorkflowError(f"{method} {url} -> {status}")
+        return response
+
+
+class WorkflowError(Exception):
+    pass
+
+
+async def run_employee(client: httpx.AsyncClient, recorder: Recorder, employee_id: str, rng: random.Random):
+    """One employee's full assessment, as the frontend runs it."""
+    response = await recorder.request(client, "GET /employeeData/{employee_id}", "GET", f"/employeeData/{employee_id}")
+    band = response.json()["Agreed_Band"]
+
+    response = await recorder.request(
+        client, "GET /bands/{band}/random-questions", "GET", f"/bands/band{band}/random-questions"
+    )
+    questions_by_competency = {}
+    for question in response.json()["questions"]:
+        questions_by_competency.setdefault(question["Competency"], []).append(question)
+
+    for competency, questions in questions_by_competency.items():
+        await recorder.request(
+            client, "POST /assessment/section/submit", "POST", "/assessment/section/submit",
+            json={
+                "employee_id": employee_id,
+                "band": band,
+                "category": competency,
+                "answers": [
+                    {"question_id": q["question_id"], "answer_value": str(rng.randint(1, 5))}
+                    for q in questions
+                ]
+            }
+        )
+
+    # The result is written by the finalization worker; wait for it like the frontend does
+    deadline = time.perf_counter() + client.timeout.read
+    while True:
+        response = await recorder.request(
+            client, "GET /assessment/finalization/{employee_id}/{band}", "GET",
+            f"/assessment/finalization/{employee_id}/{band}"
+        )
+        status = response.json()["status"]
+        if status == "done":
+            break
+        if status == "failed" or time.perf_counter() > deadline:
+            raise WorkflowError(f"Finalization of {employee_id} is {status}: {response.json()['last_error']}")
+        await asyncio.sleep(FINALIZATION_POLL_INTERVAL)
+
+    await recorder.request(
+        client, "GET /assessment/history/{employee_id}", "GET", f"/assessment/history/{employee_id}"
+    )
+
+    await recorder.request(
+        client, "POST /assessment/score-evaluation/batch", "POST", "/assessment/score-evaluation/batch",
+        json={"band": band, "employee_id": employee_id, "categories": list(questions_by_competency)}
+    )
+
+
+async def drive(client: httpx.AsyncClient, recorder: Recorder, employee_ids: list,
+                concurrency: int, seed: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = []
+
+    async def worker(index: int, employee_id: str):
+        async with semaphore:
+            try:
+                await run_employee(client, recorder, employee_id, random.Random(seed + index))
+            except WorkflowError as e:
+                failures.append(str(e))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i, employee_id) for i, employee_id in enumerate(employee_ids)))
+    return {"seconds": time.perf_counter() - started, "failures": failures}
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(recorder: Recorder, seconds: float) -> dict:
+    endpoints = {}
+    for endpoint, sample in recorder.samples.items():
+        latencies = sorted(sample["latencies"])
+        queries = sample["queries"]
+        endpoints[endpoint] = {
+            "requests": len(latencies),
+            "errors": sample["errors"],
+            "throughput_rps": round(len(latencies) / seconds, 2) if seconds else None,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 2),
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2)
+            },
+            "db_queries_per_request": round(sum(queries) / len(queries), 2) if queries else None
+        }
+
+    total_requests = sum(e["requests"] for e in endpoints.values())
+    all_queries = [q for sample in recorder.samples.values() for q in sample["queries"]]
+    return {
+        "total": {
+            "requests": total_requests,
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "seconds": round(seconds, 3),
+            "throughput_rps": round(total_requests / seconds, 2) if seconds else None,
+            "db_queries_per_request": round(sum(all_queries) / len(all_queries), 2) if all_queries else None
+        },
+        "endpoints": endpoints
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(results: dict) -> None:
+    total = results["total"]
+    print(f"\n{total['requests']} requests in {total['seconds']}s "
+          f"({total['throughput_rps']} req/s, {total['errors']} errors)")
+    print(f"{'endpoint':50} {'reqs':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    for endpoint, stats in results["endpoints"].items():
+        latency = stats["latency_ms"]
+        queries = stats["db_queries_per_request"]
+        print(f"{endpoint:50} {stats['requests']:>6} {latency['p50']:>9} {latency['p95']:>9} "
+              f"{latency['p99']:>9} {'-' if queries is None else queries:>8}")
+
+
+def compare(before_path: str, after_path: str) -> None:
+    """Print the p50/p95/p99 and query changes between two result files."""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    print(f"throughput: {before['total']['throughput_rps']} -> {after['total']['throughput_rps']} req/s")
+    for endpoint, stats in after["endpoints"].items():
+        old = before["endpoints"].get(endpoint)
+        if old is None:
+            continue
+        changes = []
+        for key in ("p50", "p95", "p99"):
+            a, b = old["latency_ms"][key], stats["latency_ms"][key]
+            change = f"{(b - a) / a * 100:+.0f}%" if a else "n/a"
+            changes.append(f"{key} {a} -> {b} ms ({change})")
+        changes.append(f"queries {old['db_queries_per_request']} -> {stats['db_queries_per_request']}")
+        print(f"{endpoint}\n    " + ", ".join(changes))
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+async def run(args) -> dict:
+    cleanup(args.prefix)
+    employee_ids = seed_employees(args.employees, args.prefix, args.seed)
+    print(f"Seeded {len(employee_ids)} synthetic employees")
+
+    try:
+        recorder = Recorder()
+        if args.base_url:
+            transport = None
+            base_url = args.base_url
+        else:
+            from main import app
+            transport = httpx.ASGITransport(app=app)
+            base_url = "http://load-test"
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(transport=transport, base_url=base_url,
+                                     timeout=args.timeout, limits=limits) as client:
+            if transport is not None:
+                # Run the app's lifespan (async pool, finalization worker) for the in-process server;
+                # with FINALIZATION_WORKER=false a worker is started here instead
+                worker = FinalizationWorker(poll_seconds=1)
+                if not FINALIZATION_WORKER:
+                    worker.start()
+                try:
+                    async with app.router.lifespan_context(app):
+                        outcome = await drive(client, recorder, employee_ids, args.concurrency, args.seed)
+                finally:
+                    worker.stop()
+            else:
+                outcome = await drive(client, recorder, employee_ids, args.concurrency, args.seed)
+    finally:
+        if not args.keep:
+            cleanup(args.prefix)
+
+    results = summarize(recorder, outcome["seconds"])
+    results["failures"] = outcome["failures"][:20]
+    results["meta"] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "employees": args.employees,
+        "concurrency": args.concurrency,
+        "target": args.base_url or "in-process",
+        "db_driver": os.getenv("DB_DRIVER", "sync"),
+        "db_pool_max_size": os.getenv("DB_POOL_MAX_SIZE", "10"),
+        "python": platform.python_version()
+    }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the assessment workflow.")
+    parser.add_argument("--employees", type=int, default=100, help="Synthetic employees to seed and run")
+    parser.add_argument("--concurrency", type=int, default=10, help="Employees running at the same time")
+    parser.add_argument("--base-url", help="Test a running server instead of serving the app in-process")
+    parser.add_argument("--output", help="Result file (default: load-test-<commit>-<time>.json)")
+    parser.add_argument("--prefix", default=DEFAULT_PREFIX, help="Employee_Number prefix of synthetic employees")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for answers and employee data")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic employees and their results")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = asyncio.run(run(args))
+    print_report(results)
+
+    output = args.output or "load-test-{}-{}.json".format(
+        results["meta"]["commit"] or "local", datetime.now().strftime("%Y%m%d-%H%M%S")
+    )
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if results["failures"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,94 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from psycopg2.extras import RealDictCursor
-from database import get_db_conn
-from pydantic import BaseModel
-from typing import List
+from contextlib import asynccontextmanager
+from database import (
+    REPLICA, get_db_conn, get_replica_conn, fetch_one, fetch_all, open_async_pool, close_async_pool, pool_stats
+)
+from question_bank import question_bank, band_code, QUESTIONS_PER_COMPETENCY
+from answers import (
+    lock_assessment, upsert_section_answers, read_category_totals, answer_points, score_percentage
+)
+from http_cache import (
+    serialize_json, raw_json, conditional_response, response_cache, REFERENCE_CACHE_CONTROL
+)
+from score_rules import score_rules, ScoreRuleIndex, ScoreRuleError
+from analytics import DIMENSIONS, BUCKET_LABELS, rebuild_analytics, read_score_analytics
+from export import EXPORT_FORMATS, EMPLOYEE_COLUMNS, stream_assessment_results
+from drafts import draft_buffer, DraftBufferFull
+from finalization import enqueue_finalization, finalization_worker, FINALIZATION_WORKER
+from idempotency import idempotency_store, request_fingerprint
+from read_routing import get_employee_read_conn, record_writes, recent_writers, employee_writes_listener
+from reference_data import (
+    REFERENCE_SNAPSHOT, REFERENCE_DATA_CHANNEL, RELOADERS, employee_directory, reference_data_listener,
+    preload_reference_data, reload_reference_data, reference_data_stats
+)
+from admission import AdmissionMiddleware, admission_controller
+from metrics import MetricsMiddleware, render_metrics
+from profiling import DB_PROFILE, ProfilingMiddleware, recent_profiles
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
+from datetime import datetime
+import itertools
 import psycopg2
-import json
 import time
-import re
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The async pool is only created when DB_DRIVER=async
+    await open_async_pool()
+    # Under serve.py the reference data was already loaded before the workers were forked
+    if REFERENCE_SNAPSHOT and not employee_directory.loaded:
+        preload_reference_data()
+    if employee_directory.loaded:
+        reference_data_listener.start()
+    # Only with a replica: follows other workers' writes for read-your-writes routing
+    employee_writes_listener.start()
+    draft_buffer.start()
+    # Moves completed assessments to assessment_results; off when separate workers run finalization.py
+    if FINALIZATION_WORKER:
+        finalization_worker.start()
+    yield
+    finalization_worker.stop()
+    # Pending autosaves are written before the pools close
+    draft_buffer.stop()
+    employee_writes_listener.stop()
+    reference_data_listener.stop()
+    await close_async_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Store server start time
 SERVER_START_TIME = time.time()
 
+# Bounded, prioritised wait for the database: submits first, 503 + Retry-After under overload.
+# Added first so it runs inside CORS and the metrics, which then see the 503s
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the browser's network panel show the per-request DB timings
+    expose_headers=["Server-Timing", "Idempotent-Replayed", "Retry-After"],
 )
 
+# Latency, query count, DB time and pool wait per endpoint (see /metrics)
+app.add_middleware(MetricsMiddleware)
+
+# Slow-query log with EXPLAIN and repeated-statement (N+1) warnings; opt-in via DB_PROFILE
+if DB_PROFILE:
+    app.add_middleware(ProfilingMiddleware)
+
 class SectionAnswer(BaseModel):
-    question: str
+    # Identify the question by question_id (from random-questions) or by its text
+    question: Optional[str] = None
+    question_id: Optional[int] = None
     answer_value: str
 
 class SectionSubmitPayload(BaseModel):
@@ -32,17 +97,49 @@ class SectionSubmitPayload(BaseModel):
     category: str
     answers: List[SectionAnswer]
 
+class DraftAnswerPayload(BaseModel):
+    employee_id: str
+    band: str
+    category: str
+    question: Optional[str] = None
+    question_id: Optional[int] = None
+    answer_value: str
+
+    # Drafts are written later, in a batch with other employees' drafts: text Postgres cannot
+    # store is refused (422) here instead of failing that batch (see also save_draft_answer)
+    @field_validator("employee_id", "band", "category", "question", "answer_value")
+    @classmethod
+    def no_nul_characters(cls, value):
+        if value is not None and "\x00" in value:
+            raise ValueError("must not contain NUL characters")
+        return value
+
+    def has_unencodable_text(self) -> bool:
+        """Lone surrogates (e.g. "\\ud800" in the JSON) cannot be encoded as UTF-8 for Postgres."""
+        try:
+            for value in (self.employee_id, self.band, self.category, self.question, self.answer_value):
+                if value is not None:
+                    value.encode("utf-8")
+        except UnicodeEncodeError:
+            return True
+        return False
+
 class ScoreEvaluationRequest(BaseModel):
     band: str
     category: str
     employee_id: str  # Add employee_id to calculate score from database
 
+class ScoreEvaluationBatchRequest(BaseModel):
+    band: str
+    employee_id: str
+    categories: Optional[List[str]] = None  # All categories of the band if omitted
+
 
 def calculate_category_score(employee_id: str, band: str, category: str, cur) -> float:
     """
     Calculate the percentage score for a specific category.
-    Reusable function that calculates score from assessment_answers table.
-    Uses the same logic as the section/submit endpoint.
+    Reusable function that reads the running category totals kept in
+    assessment_category_scores by the section/submit endpoint.
     
     Args:
         employee_id: Employee ID
@@ -53,32 +150,19 @@ def calculate_category_score(employee_id: str, band: str, category: str, cur) ->
     Returns:
         float: Percentage score (0-100)
     """
-    # Get all answers for this category
     cur.execute("""
-        SELECT answer_value
-        FROM assessment_answers
+        SELECT score_sum, answer_count
+        FROM assessment_category_scores
         WHERE employee_id=%s AND band=%s AND category=%s;
     """, (employee_id, band, category))
     
-    answers = cur.fetchall()
+    totals = cur.fetchone()
     
-    if not answers:
+    if not totals:
         return 0.0
     
-    # Calculate score using the same logic as section/submit
-    total_score = 0
-    total_questions = 0
-    
-    for answer in answers:
-        answer_value = int(answer["answer_value"]) if answer["answer_value"].isdigit() else 0
-        total_score += answer_value
-        total_questions += 1
-    
     # Calculate percentage (max score per question is 5)
-    max_score = total_questions * 5
-    percentage = (total_score / max_score * 100) if max_score > 0 else 0
-    
-    return round(percentage, 2)
+    return score_percentage(totals["score_sum"], totals["answer_count"])
 
 
 @app.get("/server/start-time")
@@ -87,160 +171,279 @@ async def get_server_start_time():
     return {"start_time": SERVER_START_TIME}
 
 @app.get("/employeeData/{employee_id}")
-async def get_SailsEmployeeData(employee_id: str,db_conn=Depends(get_db_conn)):
-    try:
-        with db_conn as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            cur.execute("""SELECT * FROM sails_employee_data WHERE "Employee_Number" = %s;""",(employee_id,))
-            SailsEmployeeData = cur.fetchone()
-        return SailsEmployeeData
-    except psycopg2.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+async def get_SailsEmployeeData(employee_id: str):
+    if employee_directory.loaded:
+        return employee_directory.get(employee_id)
+
+    # fetch_one awaits the async pool (DB_DRIVER=async) or runs in the threadpool,
+    # so this query never blocks the event loop
+    SailsEmployeeData = await fetch_one(
+        """SELECT * FROM sails_employee_data WHERE "Employee_Number" = %s;""", (employee_id,), role=REPLICA
+    )
+    return SailsEmployeeData
+
+
+# Most Employee_Numbers one /employees request may ask for
+EMPLOYEE_LOOKUP_MAX_IDS = 500
+
+
+@app.get("/employees")
+async def get_employees(ids: List[str] = Query(...)):
+    """
+    Look up several employees in one query.
+
+    Args:
+        ids: Employee_Numbers, repeated (?ids=SS001&ids=SS003) or comma-separated (?ids=SS001,SS003)
+
+    Returns:
+        dict: {"employees": rows in the requested order, "missing": ids not in sails_employee_data}
+    """
+    employee_ids = list(dict.fromkeys(
+        employee_id.strip() for value in ids for employee_id in value.split(",") if employee_id.strip()
+    ))
+    if len(employee_ids) > EMPLOYEE_LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {EMPLOYEE_LOOKUP_MAX_IDS} employee ids per request"
+        )
+
+    if employee_directory.loaded:
+        rows = [employee_directory.get(employee_id) for employee_id in employee_ids]
+    else:
+        rows = await fetch_all(
+            """SELECT * FROM sails_employee_data WHERE "Employee_Number" = ANY(%s);""", (employee_ids,),
+            role=REPLICA
+        )
+    by_id = {row["Employee_Number"]: row for row in rows if row is not None}
+    return {
+        "employees": [by_id[employee_id] for employee_id in employee_ids if employee_id in by_id],
+        "missing": [employee_id for employee_id in employee_ids if employee_id not in by_id]
+    }
+
+
+@app.get("/managers/{manager_id}/team")
+async def get_manager_team(manager_id: str):
+    """
+    Direct reports of a manager with the status and scores of their assessment
+    (in their Agreed_Band), read in a single query.
+
+    Args:
+        manager_id: The manager's Employee_Number; a manager who is not in sails_employee_data
+                    can be given by name as it appears in Reporting_Manager
+
+    Returns:
+        dict: {"manager", "team"}; each report has an "assessment" with status
+              completed / in_progress / not_started
+    """
+    # Reporting_Manager holds the manager's name, so the number is resolved to a name first.
+    # One row per report (or a single row with no report), with the latest result and the
+    # running totals of an assessment in progress.
+    rows = await fetch_all("""
+        WITH manager AS (
+            SELECT "Employee_Number", "Employee_Name"
+            FROM sails_employee_data
+            WHERE "Employee_Number" = %(manager_id)s
+        ),
+        target AS (
+            SELECT COALESCE((SELECT "Employee_Name" FROM manager), %(manager_id)s) AS manager_name
+        )
+        SELECT
+            m."Employee_Number" AS manager_number,
+            t.manager_name,
+            e.*,
+            r.total_score,
+            r.completed_at,
+            r.category_scores,
+            p.answered_questions,
+            p.categories AS progress_categories,
+            q.expected_questions
+        FROM target t
+        LEFT JOIN manager m ON TRUE
+        LEFT JOIN sails_employee_data e ON e."Reporting_Manager" = t.manager_name
+        LEFT JOIN LATERAL (
+            SELECT
+                total_score,
+                completed_at,
+                CASE WHEN jsonb_typeof(category_scores) = 'string' AND category_scores #>> '{}' <> ''
+                     THEN (category_scores #>> '{}')::jsonb
+                     ELSE category_scores END AS category_scores
+            FROM assessment_results
+            WHERE employee_number = e."Employee_Number" AND agreed_band = e."Agreed_Band"
+            ORDER BY completed_at DESC
+            LIMIT 1
+        ) r ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT
+                SUM(answer_count)::int AS answered_questions,
+                json_agg(
+                    json_build_object('category', category, 'score_sum', score_sum, 'answer_count', answer_count)
+                    ORDER BY category
+                ) AS categories
+            FROM assessment_category_scores
+            WHERE employee_id = e."Employee_Number" AND band = e."Agreed_Band"
+        ) p ON TRUE
+        LEFT JOIN LATERAL (
+            SELECT COUNT(DISTINCT competency) * %(per_competency)s AS expected_questions
+            FROM question_bank
+            WHERE band = e."Agreed_Band" AND active
+        ) q ON TRUE
+        ORDER BY e."Employee_Name", e."Employee_Number";
+    """, {"manager_id": manager_id, "per_competency": QUESTIONS_PER_COMPETENCY}, role=REPLICA)
+
+    manager = rows[0]
+    reports = [row for row in rows if row["Employee_Number"] is not None]
+    if manager["manager_number"] is None and not reports:
+        raise HTTPException(status_code=404, detail="Manager not found")
+
+    team = []
+    for row in reports:
+        if row["completed_at"] is not None:
+            assessment = {
+                "status": "completed",
+                "total_score": row["total_score"],
+                "completed_at": row["completed_at"],
+                "category_scores": row["category_scores"]
+            }
+        elif row["answered_questions"]:
+            categories = row["progress_categories"]
+            total_score_sum = sum(category["score_sum"] for category in categories)
+            assessment = {
+                "status": "in_progress",
+                "answered_questions": row["answered_questions"],
+                "expected_questions": row["expected_questions"],
+                "overall_score": score_percentage(total_score_sum, row["answered_questions"]),
+                "category_scores": [
+                    {
+                        "category": category["category"],
+                        "score": score_percentage(category["score_sum"], category["answer_count"])
+                    }
+                    for category in categories
+                ]
+            }
+        else:
+            assessment = {"status": "not_started", "expected_questions": row["expected_questions"]}
+
+        employee = {"Employee_Number": row["Employee_Number"], **{column: row[column] for column in EMPLOYEE_COLUMNS}}
+        team.append({**employee, "assessment": {"band": row["Agreed_Band"], **assessment}})
+
+    return {
+        "manager": {"Employee_Number": manager["manager_number"], "Employee_Name": manager["manager_name"]},
+        "team": team
+    }
 
 
 @app.get("/bands/{band}/random-questions")
-async def get_random_questions(band: str, db_conn=Depends(get_db_conn)):
-    table_name = f'"{band}"'
-    try:
-        with db_conn as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cur.execute(f'SELECT DISTINCT "Sub_Section" FROM {table_name};')
-            categories = [row["Sub_Section"] for row in cur.fetchall()]
-            
-            cur.execute(f"""SELECT "Band","Competency","Sub_Section","Question" FROM {table_name};""")
-            bandData = cur.fetchall()
-            
-            for row in bandData:
-                if row.get("Question"):
-                    row["Question"] = row["Question"].strip().strip('"')
-        
-        return {
+async def get_random_questions(band: str, request: Request):
+    # Served from the in-process question bank cache; Postgres is only hit on a cache miss
+    band_questions = await question_bank.get_async(band)
+    if band_questions is None:
+        raise HTTPException(status_code=404, detail=f"No questions found for band {band}")
+
+    # The serialized body is cached per question bank version and revalidated by ETag
+    body, etag = response_cache.get_or_build(
+        ("random-questions", band, band_questions.version),
+        lambda: {
             "band": band,
-            "total_questions": len(bandData),
-            "categories": len(categories),
-            "questions": bandData
+            "total_questions": len(band_questions.questions),
+            "categories": len(band_questions.sub_sections),
+            "questions": band_questions.questions
         }
-    except psycopg2.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    )
+    return conditional_response(request, body, etag, cache_control=REFERENCE_CACHE_CONTROL)
+
+
+# Namespace of the section submit's Idempotency-Keys
+SECTION_SUBMIT_ENDPOINT = "/assessment/section/submit"
 
 
 @app.post("/assessment/section/submit")
-def submit_section_answers(data: SectionSubmitPayload, db_conn=Depends(get_db_conn)):
+def submit_section_answers(data: SectionSubmitPayload, db_conn=Depends(get_db_conn),
+                           idempotency_key: Optional[str] = Header(None)):
+    # A retry with the same Idempotency-Key gets the first response back; nothing is written again
+    fingerprint = None
+    if idempotency_key is not None:
+        idempotency_store.validate_key(idempotency_key)
+        fingerprint = request_fingerprint(data.model_dump())
+        replay = idempotency_store.cached(SECTION_SUBMIT_ENDPOINT, idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
 
     try:
         with db_conn as conn:
             cur = conn.cursor(cursor_factory=RealDictCursor)
 
-            # Save answers to assessment_answers table
+            # Answers are stored by question_id; map each answer to its question in the bank
+            band_questions = question_bank.get(data.band, cur)
+            if band_questions is None:
+                raise HTTPException(status_code=422, detail=f"Unknown band: {data.band}")
+            answer_pairs = []
+            unknown_questions = []
             for ans in data.answers:
-
-                # check if answer exists
-                cur.execute("""
-                    SELECT id FROM assessment_answers
-                    WHERE employee_id=%s AND band=%s AND question=%s;
-                """, (data.employee_id, data.band, ans.question))
-
-                existing = cur.fetchone()
-
-                if existing:
-                    # UPDATE existing record
-                    cur.execute("""
-                        UPDATE assessment_answers
-                        SET answer_value=%s, updated_at=NOW()
-                        WHERE id=%s;
-                    """, (ans.answer_value, existing["id"]))
+                question_id = band_questions.resolve(ans.question_id, ans.question)
+                if question_id is None:
+                    unknown_questions.append(ans.question_id if ans.question_id is not None else ans.question)
                 else:
-                    # INSERT new record
-                    cur.execute("""
-                        INSERT INTO assessment_answers
-                        (employee_id, band, category, question, answer_value)
-                        VALUES (%s, %s, %s, %s, %s);
-                    """, (
-                        data.employee_id,
-                        data.band,
-                        data.category,
-                        ans.question,
-                        ans.answer_value
-                    ))
+                    answer_pairs.append((question_id, ans.answer_value))
+
+            if unknown_questions:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Unknown questions for band {data.band}: {unknown_questions}"
+                )
+
+            # Claim the key before writing; another worker may have stored its response already
+            if idempotency_key is not None:
+                replay = idempotency_store.claim(SECTION_SUBMIT_ENDPOINT, idempotency_key, fingerprint, cur)
+                if replay is not None:
+                    return replay
+
+            # One writer per employee/band at a time keeps the running totals consistent
+            lock_assessment(data.employee_id, data.band, cur)
+
+            # Save all answers of the section to assessment_answers in one statement
+            # (also updates the per-category totals in assessment_category_scores)
+            questions_inserted, questions_updated = upsert_section_answers(
+                data.employee_id, data.band, data.category, answer_pairs, cur
+            )
 
             # Check if assessment is completed (all categories answered)
-            # Band format: if band is "2A", table is "band2A"; if band is "band2A", use as is
-            band_name = data.band if data.band.startswith('band') else f'band{data.band}'
-            table_name = f'"{band_name}"'
-            
-            # Get total expected questions
-            # Count distinct competencies (each competency has 25 questions)
-            # The frontend shows 5 competencies, each with 25 questions = 125 total questions
-            cur.execute(f'SELECT COUNT(DISTINCT "Competency") AS c FROM {table_name};')
-            competency_count = cur.fetchone()["c"]
-            expected_questions = competency_count * 25  # 25 questions per competency
+            # Expected questions come from the question bank cache
+            # (distinct competencies x 25 questions = 125 total questions)
+            expected_questions = band_questions.expected_questions
+
+            # Running totals per category: O(categories) rows instead of every answer
+            category_totals = read_category_totals(data.employee_id, data.band, cur)
 
             # Count total answered questions for this band
-            cur.execute("""
-                SELECT COUNT(*) AS count
-                FROM assessment_answers
-                WHERE employee_id=%s AND band=%s;
-            """, (data.employee_id, data.band))
-            answered_count = cur.fetchone()["count"]
+            answered_count = sum(row["answer_count"] for row in category_totals)
 
             is_completed = answered_count >= expected_questions
 
             # Calculate section-wise score for the current category
-            current_category_score = 0
-            current_category_total = 0
-            for ans in data.answers:
-                answer_value = int(ans.answer_value) if ans.answer_value.isdigit() else 0
-                current_category_score += answer_value
-                current_category_total += 1
-            
-            current_category_percentage = (current_category_score / (current_category_total * 5) * 100) if current_category_total > 0 else 0
-
-            # Calculate all category scores (for overall score calculation)
-            cur.execute("""
-                SELECT category, question, answer_value
-                FROM assessment_answers
-                WHERE employee_id=%s AND band=%s
-                ORDER BY category;
-            """, (data.employee_id, data.band))
-            all_answers = cur.fetchall()
-
-            # Calculate category scores
-            category_scores_dict = {}
-            category_totals = {}
-
-            for answer in all_answers:
-                cat = answer["category"]
-                answer_value = int(answer["answer_value"]) if answer["answer_value"].isdigit() else 0
-                
-                if cat not in category_scores_dict:
-                    category_scores_dict[cat] = 0
-                    category_totals[cat] = 0
-                
-                category_scores_dict[cat] += answer_value
-                category_totals[cat] += 1
+            current_category_score = sum(answer_points(ans.answer_value) for ans in data.answers)
+            current_category_percentage = score_percentage(current_category_score, len(data.answers))
 
             # Calculate percentage scores per category
             category_scores_list = []
             total_score_sum = 0
-            total_max_score = 0
+            total_answer_count = 0
 
-            for cat, score in category_scores_dict.items():
-                max_score = category_totals[cat] * 5  # Max score per question is 5
-                percentage = (score / max_score * 100) if max_score > 0 else 0
+            for row in category_totals:
                 category_scores_list.append({
-                    "category": cat,
-                    "score": round(percentage, 2)
+                    "category": row["category"],
+                    "score": score_percentage(row["score_sum"], row["answer_count"])
                 })
-                total_score_sum += score
-                total_max_score += max_score
+                total_score_sum += row["score_sum"]
+                total_answer_count += row["answer_count"]
 
             # Calculate overall total score percentage
-            overall_score = (total_score_sum / total_max_score * 100) if total_max_score > 0 else 0
+            overall_score = score_percentage(total_score_sum, total_answer_count)
 
             response_data = {
                 "message": "Section submitted successfully",
                 "questions_saved": len(data.answers),
+                "questions_inserted": questions_inserted,
+                "questions_updated": questions_updated,
                 "is_completed": is_completed,
                 "section_score": round(current_category_score, 2),
                 "section_percentage": round(current_category_percentage, 2),
@@ -248,379 +451,364 @@ def submit_section_answers(data: SectionSubmitPayload, db_conn=Depends(get_db_co
                 "overall_score": round(overall_score, 2)
             }
 
-            # If assessment is completed, move to assessment_results
+            # A completed assessment is moved to assessment_results by the finalization worker
+            # (finalization.py); the job is queued in this transaction, so it is never lost
             if is_completed:
+                enqueue_finalization(data.employee_id, data.band, cur)
 
-                # Convert category_scores to JSON string for database (use already calculated scores)
-                category_scores_json = json.dumps(category_scores_list)
-                total_score = overall_score
-                
-                # Store all questions and answers as JSON for history viewing
-                # Group answers by category for storage
-                answers_by_category = {}
-                for answer in all_answers:
-                    cat = answer["category"]
-                    if cat not in answers_by_category:
-                        answers_by_category[cat] = []
-                    answers_by_category[cat].append({
-                        "question": answer["question"],
-                        "answer_value": answer["answer_value"]
-                    })
-                
-                # Convert to list format for storage
-                answers_list = [
-                    {
-                        "category": cat,
-                        "questions": qlist
-                    }
-                    for cat, qlist in answers_by_category.items()
-                ]
-                answers_json = json.dumps(answers_list)
-
-                # Check if result already exists
-                cur.execute("""
-                    SELECT id FROM assessment_results
-                    WHERE employee_number=%s AND agreed_band=%s;
-                """, (data.employee_id, data.band))
-                existing_result = cur.fetchone()
-
-                if existing_result:
-                    # Update existing result with questions/answers
-                    cur.execute("""
-                        UPDATE assessment_results
-                        SET total_score=%s, category_scores=%s, questions_answers=%s, completed_at=NOW()
-                        WHERE id=%s;
-                    """, (round(total_score, 2), category_scores_json, answers_json, existing_result["id"]))
-                else:
-                    # Insert new result with questions/answers
-                    cur.execute("""
-                        INSERT INTO assessment_results
-                        (employee_number, agreed_band, total_score, category_scores, questions_answers, completed_at)
-                        VALUES (%s, %s, %s, %s, %s, NOW());
-                    """, (data.employee_id, data.band, round(total_score, 2), category_scores_json, answers_json))
-
-                # Delete all data from assessment_answers for this employee and band (move to assessment_results)
-                cur.execute("""
-                    DELETE FROM assessment_answers
-                    WHERE employee_id=%s AND band=%s;
-                """, (data.employee_id, data.band))
+                response_data["total_score"] = round(overall_score, 2)
+                response_data["finalization"] = {
+                    "status": "pending",
+                    "status_url": f"/assessment/finalization/{data.employee_id}/{data.band}"
+                }
 
-                # Update response with final scores (already included above)
-                response_data["total_score"] = round(total_score, 2)
-                
                 # Clear localStorage flag for completed assessment
                 response_data["clear_local_storage"] = True
 
+            # The employee's next reads go to the primary until the replica has caught up
+            record_writes([data.employee_id], cur)
+
+            # Stored in the same transaction as the answers
+            if idempotency_key is not None:
+                body = idempotency_store.store(SECTION_SUBMIT_ENDPOINT, idempotency_key, 200, response_data, cur)
+
+        if idempotency_key is not None:
+            idempotency_store.remember(SECTION_SUBMIT_ENDPOINT, idempotency_key, fingerprint, 200, body)
+            return Response(content=body, media_type="application/json",
+                            headers={"Idempotency-Key": idempotency_key})
         return response_data
 
     except psycopg2.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.get("/assessment/history/{employee_id}")
-def get_assessment_history(employee_id: str, db_conn=Depends(get_db_conn)):
+@app.get("/assessment/finalization/{employee_id}/{band}")
+async def get_finalization_status(employee_id: str, band: str):
+    """
+    Status of the background finalization of a completed assessment:
+    pending (queued or being retried), done (with the result) or failed (with the last error).
+    """
+    job = await fetch_one("""
+        SELECT
+            j.status, j.attempts, j.requested_at, j.finished_at, j.last_error,
+            r.id AS result_id, r.total_score, r.completed_at,
+            CASE WHEN jsonb_typeof(r.category_scores) = 'string' AND r.category_scores #>> '{}' <> ''
+                 THEN (r.category_scores #>> '{}')::jsonb
+                 ELSE r.category_scores END AS category_scores
+        FROM assessment_finalization_jobs j
+        LEFT JOIN assessment_results r ON r.id = j.result_id AND j.status = 'done'
+        WHERE j.employee_id = %s AND j.band = %s;
+    """, (employee_id, band))
+
+    if not job:
+        raise HTTPException(status_code=404, detail="No finalization queued for this assessment")
+
+    return {
+        "employee_id": employee_id,
+        "band": band,
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "requested_at": job["requested_at"],
+        "finished_at": job["finished_at"],
+        "last_error": job["last_error"],
+        "result": {
+            "result_id": job["result_id"],
+            "total_score": job["total_score"],
+            "category_scores": job["category_scores"],
+            "completed_at": job["completed_at"]
+        } if job["result_id"] is not None else None
+    }
+
+
+@app.post("/assessment/draft", status_code=202)
+async def save_draft_answer(data: DraftAnswerPayload):
+    """
+    Autosave one answer while the employee fills in a section.
+    The answer is queued in memory and written to assessment_answers with other pending
+    answers a moment later (see drafts.py); clicks on the same question in between are coalesced.
+    """
+    # Checked here rather than in the model: the validation error response would echo the text
+    if data.has_unencodable_text():
+        raise HTTPException(status_code=422, detail="Draft contains text that is not valid Unicode")
+    band_questions = await question_bank.get_async(data.band)
+    if band_questions is None:
+        raise HTTPException(status_code=422, detail=f"Unknown band: {data.band}")
+    question_id = band_questions.resolve(data.question_id, data.question)
+    if question_id is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown question for band {data.band}: "
+                   f"{data.question_id if data.question_id is not None else data.question}"
+        )
 
     try:
-        with db_conn as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-
-            history = []
+        pending = draft_buffer.put(data.employee_id, data.band, data.category, question_id, data.answer_value)
+    except DraftBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-            # 1️⃣ Get all bands from assessment_results (completed assessments)
-            cur.execute("""
-                SELECT DISTINCT agreed_band AS band
-                FROM assessment_results
-                WHERE employee_number=%s;
-            """, (employee_id,))
-            bands_from_results = [row["band"] for row in cur.fetchall()]
-
-            # 2️⃣ Get all bands from assessment_answers (ongoing assessments)
-            cur.execute("""
-                SELECT DISTINCT band 
-                FROM assessment_answers
-                WHERE employee_id=%s;
-            """, (employee_id,))
-            bands_from_answers = [row["band"] for row in cur.fetchall()]
+    return {"queued": True, "question_id": question_id, "pending": pending}
 
-            # Combine and get unique bands
-            all_bands = list(set(bands_from_answers + bands_from_results))
 
-            for band in all_bands:
+@app.get("/assessment/history/{employee_id}")
+def get_assessment_history(
+    employee_id: str,
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db_conn=Depends(get_employee_read_conn)
+):
+    """
+    Completed and in-progress assessments of an employee, one entry per band (ordered by band).
+    Built by a single SQL statement; Postgres assembles each entry as JSON text, which is
+    copied into the response body without being decoded (the stored JSONB never becomes Python objects).
 
-                # Band format: if band is "2A", table is "band2A"; if band is "band2A", use as is
-                band_name = band if band.startswith('band') else f'band{band}'
-                table_name = f'"{band_name}"'
+    Args:
+        limit: Max entries to return; all entries if omitted
+        cursor: next_cursor from the previous page
+    """
+    try:
+        with db_conn as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
 
-                # 3️⃣ Check if assessment is completed (exists in assessment_results)
-                cur.execute("""
-                    SELECT total_score, category_scores, completed_at, questions_answers
+            # completed:   latest assessment_results row per band
+            # answered:    in-progress answers grouped by band and category
+            # in_progress: sections of every in-progress band
+            # Completed results without stored questions_answers (legacy rows) fall back to
+            # the answers still in assessment_answers. JSON stored as a string is unwrapped.
+            cur.execute("""
+                WITH completed AS (
+                    SELECT DISTINCT ON (agreed_band)
+                        agreed_band AS band,
+                        total_score,
+                        completed_at,
+                        CASE WHEN jsonb_typeof(category_scores) = 'string' AND category_scores #>> '{}' <> ''
+                             THEN (category_scores #>> '{}')::jsonb
+                             ELSE category_scores END AS category_scores,
+                        CASE WHEN jsonb_typeof(questions_answers) = 'string' AND questions_answers #>> '{}' <> ''
+                             THEN (questions_answers #>> '{}')::jsonb
+                             ELSE questions_answers END AS questions_answers
                     FROM assessment_results
-                    WHERE employee_number=%s AND agreed_band=%s
-                    ORDER BY completed_at DESC LIMIT 1;
-                """, (employee_id, band))
-
-                result = cur.fetchone()
-
-                if result:
-                    # Assessment is completed - read from assessment_results
-                    category_scores = result["category_scores"]
-                    # If category_scores is a string (JSON), parse it
-                    if isinstance(category_scores, str):
-                        try:
-                            category_scores = json.loads(category_scores)
-                        except:
-                            category_scores = []
-
-                    # Get questions and answers from assessment_results
-                    questions_answers = result.get("questions_answers")
-                    section_list = []
-                    
-                    if questions_answers:
-                        # If questions_answers is a string (JSON), parse it
-                        if isinstance(questions_answers, str):
-                            try:
-                                section_list = json.loads(questions_answers)
-                            except:
-                                section_list = []
-                        elif isinstance(questions_answers, list):
-                            section_list = questions_answers
-                    else:
-                        # Fallback: if questions_answers column doesn't exist or is null, try to reconstruct from assessment_answers
-                        # (This handles legacy data or if column wasn't created yet)
-                        cur.execute("""
-                            SELECT category, question, answer_value
-                            FROM assessment_answers
-                            WHERE employee_id=%s AND band=%s
-                            ORDER BY category;
-                        """, (employee_id, band))
-                        answers = cur.fetchall()
-                        
-                        sections = {}
-                        for a in answers:
-                            cat = a["category"]
-                            if cat not in sections:
-                                sections[cat] = []
-                            sections[cat].append({
-                                "question": a["question"],
-                                "answer_value": a["answer_value"]
-                            })
-                        
-                        section_list = [
-                            {
-                                "category": cat,
-                                "questions": qlist
-                            }
-                            for cat, qlist in sections.items()
-                        ]
-
-                    history.append({
-                        "band": band,
-                        "status": "Completed",
-                        "completed_at": result["completed_at"].isoformat() if result["completed_at"] else None,
-                        "total_score": float(result["total_score"]) if result["total_score"] else 0,
-                        "category_scores": category_scores,
-                        "sections": section_list
-                    })
-                else:
-                    # Assessment is in progress - read from assessment_answers
-                    cur.execute("""
-                        SELECT category, question, answer_value
-                        FROM assessment_answers
-                        WHERE employee_id=%s AND band=%s
-                        ORDER BY category;
-                    """, (employee_id, band))
-                    answers = cur.fetchall()
-
-                    # Group answers by category
-                    sections = {}
-                    for a in answers:
-                        cat = a["category"]
-                        if cat not in sections:
-                            sections[cat] = []
-                        sections[cat].append({
-                            "question": a["question"],
-                            "answer_value": a["answer_value"]
-                        })
-
-                    section_list = [
-                        {
-                            "category": cat,
-                            "questions": qlist
-                        }
-                        for cat, qlist in sections.items()
-                    ]
-
-                    history.append({
-                        "band": band,
-                        "status": "In Progress",
-                        "sections": section_list
-                    })
-
-        return {
+                    WHERE employee_number = %(employee_id)s
+                    ORDER BY agreed_band, completed_at DESC
+                ),
+                answered AS (
+                    SELECT
+                        a.band,
+                        a.category,
+                        json_agg(
+                            json_build_object('question', q.question, 'answer_value', a.answer_value)
+                            ORDER BY a.id
+                        ) AS questions
+                    FROM assessment_answers a
+                    JOIN question_bank q ON q.question_id = a.question_id
+                    WHERE a.employee_id = %(employee_id)s
+                    GROUP BY a.band, a.category
+                ),
+                in_progress AS (
+                    SELECT
+                        band,
+                        json_agg(
+                            json_build_object('category', category, 'questions', questions)
+                            ORDER BY category
+                        ) AS sections
+                    FROM answered
+                    GROUP BY band
+                )
+                SELECT
+                    COALESCE(c.band, p.band) AS band,
+                    CASE
+                        WHEN c.band IS NOT NULL THEN json_build_object(
+                            'band', c.band,
+                            'status', 'Completed',
+                            'completed_at', c.completed_at,
+                            'total_score', COALESCE(c.total_score, 0),
+                            'category_scores', COALESCE(c.category_scores, '[]'::jsonb),
+                            'sections', COALESCE(c.questions_answers::json, p.sections, '[]'::json)
+                        )
+                        ELSE json_build_object(
+                            'band', p.band,
+                            'status', 'In Progress',
+                            'sections', p.sections
+                        )
+                    END::text AS entry
+                FROM completed c
+                FULL JOIN in_progress p ON p.band = c.band
+                WHERE %(cursor)s::text IS NULL OR COALESCE(c.band, p.band) > %(cursor)s
+                ORDER BY 1
+                LIMIT %(fetch_limit)s;
+            """, {
+                "employee_id": employee_id,
+                "cursor": cursor,
+                # One extra row tells whether there is a next page
+                "fetch_limit": limit + 1 if limit else None
+            })
+            rows = cur.fetchall()
+
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]["band"]
+
+        body = serialize_json({
             "employee_id": employee_id,
-            "history": history
-        }
+            "history": [raw_json(row["entry"]) for row in rows],
+            "next_cursor": next_cursor
+        })
+
+        # Unchanged histories are answered with 304 Not Modified
+        return conditional_response(request, body, cache_control="private, no-cache")
 
     except psycopg2.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
 @app.get("/assessment/score-ranges/{band}")
-def get_score_ranges(band: str, db_conn=Depends(get_db_conn)):
+def get_score_ranges(band: str, request: Request):
     """
     Get all score ranges, interpretations, and focus areas for a specific band.
     Returns all categories and their score ranges in a table format.
+    Served from the interpretation rules index; the serialized response is cached
+    per rules fingerprint and revalidated by ETag.
     
     Args:
         band: Band identifier (e.g., "2A", "band2A", "1", "band1")
     """
     try:
-        with db_conn as conn:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Normalize band format - check if it starts with 'band', if not add it
-            normalized_band = band if band.startswith('band') else f'band{band}'
-            
-            # Try with normalized band first
-            cur.execute("""
-                SELECT
-                    "Category",
-                    "Score Range",
-                    "Interpretations",
-                    "Focus Area"
-                FROM interpretations_and_focus_area
-                WHERE "Band"=%s
-                ORDER BY "Category", "Score Range";
-            """, (normalized_band,))
-
-            rules = cur.fetchall()
-            
-            # If no results with normalized format, try the original band format
-            if not rules:
-                cur.execute("""
-                    SELECT
-                        "Category",
-                        "Score Range",
-                        "Interpretations",
-                        "Focus Area"
-                    FROM interpretations_and_focus_area
-                    WHERE "Band"=%s
-                    ORDER BY "Category", "Score Range";
-                """, (band,))
-                rules = cur.fetchall()
-
-        if not rules:
+        rule_index = score_rules.get()
+
+        # Normalize band format - check if it starts with 'band', if not add it
+        normalized_band = band if band.startswith('band') else f'band{band}'
+
+        # Try with normalized band first, then the original band format
+        resolved_band = normalized_band if rule_index.ranges_for_band(normalized_band) else band
+        score_ranges = rule_index.ranges_for_band(resolved_band)
+
+        if not score_ranges:
             raise HTTPException(
                 status_code=404,
                 detail=f"No score ranges found for band {band}. Tried formats: {band}, {normalized_band}"
             )
 
-        # Format the response
-        return {
-            "band": band,
-            "score_ranges": [
-                {
-                    "category": rule["Category"],
-                    "score_range": rule["Score Range"],
-                    "interpretation": rule["Interpretations"].strip('"') if rule["Interpretations"] else "",
-                    "focus_area": rule["Focus Area"].strip('"') if rule["Focus Area"] else ""
-                }
-                for rule in rules
-            ]
-        }
+        body, etag = response_cache.get_or_build(
+            ("score-ranges", band, rule_index.fingerprint),
+            lambda: {
+                "band": band,
+                "score_ranges": score_ranges
+            }
+        )
+        return conditional_response(request, body, etag, cache_control=REFERENCE_CACHE_CONTROL)
 
     except HTTPException:
         raise
-    except psycopg2.Error as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/assessment/{category}/{employee_id}")
-def get_category_info(category: str, employee_id: str, db_conn=Depends(get_db_conn)):
+def get_category_info(category: str, employee_id: str, db_conn=Depends(get_employee_read_conn)):
     try:
         with db_conn as conn:
             cur = conn.cursor(cursor_factory=RealDictCursor)
 
             # Get employee's band to find the correct question table
-            cur.execute("""
-                SELECT "Agreed_Band" 
-                FROM sails_employee_data 
-                WHERE "Employee_Number" = %s;
-            """, (employee_id,))
-            employee_data = cur.fetchone()
+            if employee_directory.loaded:
+                employee_data = employee_directory.get(employee_id)
+            else:
+                cur.execute("""
+                    SELECT "Agreed_Band" 
+                    FROM sails_employee_data 
+                    WHERE "Employee_Number" = %s;
+                """, (employee_id,))
+                employee_data = cur.fetchone()
             
             if not employee_data:
                 raise HTTPException(status_code=404, detail="Employee not found")
             
             band = employee_data["Agreed_Band"]
-            band_name = band if band.startswith('band') else f'band{band}'
-            table_name = f'"{band_name}"'
 
-            # First, check if assessment is completed (exists in assessment_results)
+            # First, check if assessment is completed (exists in assessment_results).
+            # The category's section is picked out of the stored JSONB in SQL and returned
+            # as JSON text, so the full document is never decoded in Python.
             cur.execute("""
-                SELECT questions_answers
-                FROM assessment_results
-                WHERE employee_number=%s AND agreed_band=%s
-                ORDER BY completed_at DESC LIMIT 1;
-            """, (employee_id, band))
+                WITH latest AS (
+                    SELECT
+                        CASE WHEN jsonb_typeof(questions_answers) = 'string' AND questions_answers #>> '{}' <> ''
+                             THEN (questions_answers #>> '{}')::jsonb
+                             ELSE questions_answers END AS questions_answers
+                    FROM assessment_results
+                    WHERE employee_number=%s AND agreed_band=%s
+                    ORDER BY completed_at DESC LIMIT 1
+                ),
+                section AS (
+                    SELECT s.section
+                    FROM latest,
+                         jsonb_array_elements(latest.questions_answers) WITH ORDINALITY AS s(section, position)
+                    WHERE jsonb_typeof(latest.questions_answers) = 'array'
+                      AND s.section->>'category' = %s
+                    ORDER BY s.position
+                    LIMIT 1
+                ),
+                pairs AS (
+                    SELECT q.qa, q.position
+                    FROM section,
+                         jsonb_array_elements(section.section->'questions') WITH ORDINALITY AS q(qa, position)
+                    WHERE jsonb_typeof(section.section->'questions') = 'array'
+                )
+                SELECT
+                    (SELECT questions_answers NOT IN ('[]'::jsonb, 'null'::jsonb, '""'::jsonb)
+                     FROM latest) AS completed,
+                    COALESCE(
+                        json_agg(
+                            json_build_object(
+                                'question', COALESCE(qa->'question', '""'::jsonb),
+                                'answer', COALESCE(qa->'answer_value', '""'::jsonb)
+                            ) ORDER BY position
+                        ),
+                        '[]'::json
+                    )::text AS questions_answers,
+                    count(*) AS total_questions,
+                    count(*) FILTER (WHERE COALESCE(qa->>'answer_value', '') <> '') AS total_answers
+                FROM pairs;
+            """, (employee_id, band, category))
             
             result = cur.fetchone()
-            questions_answers_list = []
             
-            if result and result.get("questions_answers"):
-                # Assessment is completed - get from assessment_results
-                questions_answers = result["questions_answers"]
-                
-                # Parse JSON if it's a string
-                if isinstance(questions_answers, str):
-                    try:
-                        questions_answers = json.loads(questions_answers)
-                    except:
-                        questions_answers = []
-                
-                # Find the section for this category
-                for section in questions_answers:
-                    if section.get("category") == category:
-                        # Build question-answer pairs
-                        for qa in section.get("questions", []):
-                            questions_answers_list.append({
-                                "question": qa.get("question", ""),
-                                "answer": qa.get("answer_value", "")
-                            })
-                        break
-            else:
-                # Assessment is in progress - get from assessment_answers
-                cur.execute("""
-                    SELECT question, answer_value
-                    FROM assessment_answers
-                    WHERE category = %s
-                      AND employee_id = %s
-                    ORDER BY question;
-                """, (category, employee_id))
-                
-                answers_data = cur.fetchall()
-                
-                # Get all questions for this category from the band table
-                cur.execute(f"""
-                    SELECT "Question"
-                    FROM {table_name}
-                    WHERE "Sub_Section" = %s OR "Competency" = %s
-                    ORDER BY "Question";
-                """, (category, category))
-                
-                all_questions = [row["Question"].strip().strip('"') for row in cur.fetchall()]
-                
-                # Create a map of question -> answer from assessment_answers
-                answers_map = {row["question"]: row["answer_value"] for row in answers_data}
-                
-                # Build question-answer pairs
-                for question in all_questions:
-                    questions_answers_list.append({
-                        "question": question,
-                        "answer": answers_map.get(question, "")
-                    })
+            if result["completed"]:
+                # Assessment is completed - answers come from assessment_results
+                body = serialize_json({
+                    "employee_id": employee_id,
+                    "category": category,
+                    "band": band,
+                    "total_questions": result["total_questions"],
+                    "total_answers": result["total_answers"],
+                    "questions_answers": raw_json(result["questions_answers"])
+                })
+                return Response(content=body, media_type="application/json")
+
+            # Assessment is in progress - get from assessment_answers
+            cur.execute("""
+                SELECT question_id, answer_value
+                FROM assessment_answers
+                WHERE category = %s
+                  AND employee_id = %s;
+            """, (category, employee_id))
+            
+            answers_data = cur.fetchall()
+            
+            # Get all questions for this category from the question bank cache
+            band_questions = question_bank.get(band, cur)
+            all_questions = band_questions.questions_for_category(category) if band_questions else []
+            
+            # Create a map of question_id -> answer from assessment_answers
+            answers_map = {row["question_id"]: row["answer_value"] for row in answers_data}
+            # Autosaved answers that have not been written yet
+            answers_map.update(draft_buffer.pending_answers(employee_id, band, category))
+            
+            # Build question-answer pairs
+            questions_answers_list = [
+                {"question": question, "answer": answers_map.get(question_id, "")}
+                for question_id, question in all_questions
+            ]
 
         return {
             "employee_id": employee_id,
@@ -638,22 +826,6 @@ def get_category_info(category: str, employee_id: str, db_conn=Depends(get_db_co
         )
 
 
-def parse_score_range(range_str: str):
-    """Converts range text into numeric bounds."""
-    
-    text = range_str.lower().strip()
-
-    if "below" in text or text.startswith("<"):
-        num = int(re.findall(r"\d+", text)[0])
-        return 0, num - 1
-
-    nums = re.findall(r"\d+", text)
-    if len(nums) == 2:
-        return int(nums[0]), int(nums[1])
-    
-    raise ValueError(f"Invalid range format: {range_str}")
-
-
 @app.post("/assessment/score-evaluation")
 def evaluate_score(data: ScoreEvaluationRequest, db_conn=Depends(get_db_conn)):
     """
@@ -670,44 +842,330 @@ def evaluate_score(data: ScoreEvaluationRequest, db_conn=Depends(get_db_conn)):
             
             # Calculate score using the same logic as section/submit endpoint
             score = calculate_category_score(employee_id, band, category, cur)
-            
-            # Get interpretation rules
-            cur.execute("""
-                SELECT
-                    "Score Range",
-                    "Interpretations",
-                    "Focus Area"
-                FROM interpretations_and_focus_area
-                WHERE "Band"=%s AND "Category"=%s;
-            """, (band, category))
 
-            rules = cur.fetchall()
+        # Interpretation rules come from the in-process interval index (no query)
+        rule_index = score_rules.get()
 
-        if not rules:
+        if not rule_index.has_rules(band, category):
             raise HTTPException(
                 status_code=404,
                 detail="No score rules found for given band and category"
             )
 
         # Find matching score range
-        for rule in rules:
-            min_score, max_score = parse_score_range(rule["Score Range"])
-            if min_score <= score <= max_score:
-                return {
+        return build_score_evaluation(band, category, score, rule_index)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def build_score_evaluation(band: str, category: str, score: float, rule_index: ScoreRuleIndex) -> dict:
+    """
+    Match a category score against its interpretation rules.
+
+    Args:
+        band: Band name
+        category: Category/Competency name
+        score: Percentage score (0-100)
+        rule_index: Interpretation rules index from score_rules.get()
+
+    Returns:
+        dict: Score evaluation with the matching range, interpretation and focus area
+    """
+    rule = rule_index.match(band, category, score)
+    if rule is not None:
+        return {
+            "band": band,
+            "category": category,
+            "score": score,
+            "score_range": rule.score_range,
+            "interpretation": rule.interpretation,
+            "focus_area": rule.focus_area
+        }
+
+    return {
+        "band": band,
+        "category": category,
+        "score": score,
+        "message": "Score does not match any defined range"
+    }
+
+
+@app.post("/assessment/score-evaluation/batch")
+def evaluate_scores_batch(data: ScoreEvaluationBatchRequest, db_conn=Depends(get_db_conn)):
+    """
+    Evaluate every category of an employee's band in one call.
+    All category scores come from the running totals in assessment_category_scores
+    and are matched against the in-process interpretation rules index.
+
+    Args:
+        data.categories: Categories to evaluate; defaults to every category that
+                         has interpretation rules or answers for this band
+    """
+    band = data.band
+    employee_id = data.employee_id
+
+    try:
+        with db_conn as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            # Same scoring as calculate_category_score, one row per category
+            category_totals = {
+                row["category"]: row
+                for row in read_category_totals(employee_id, band, cur)
+            }
+
+        rule_index = score_rules.get()
+        categories = data.categories or list(dict.fromkeys(rule_index.categories(band) + list(category_totals)))
+
+        evaluations = []
+        for category in categories:
+            totals = category_totals.get(category)
+            score = score_percentage(totals["score_sum"], totals["answer_count"]) if totals else 0.0
+
+            if not rule_index.has_rules(band, category):
+                evaluations.append({
                     "band": band,
                     "category": category,
                     "score": score,
-                    "score_range": rule["Score Range"],
-                    "interpretation": rule["Interpretations"].strip('"'),
-                    "focus_area": rule["Focus Area"].strip('"')
-                }
+                    "message": "No score rules found for given band and category"
+                })
+                continue
+
+            evaluations.append(build_score_evaluation(band, category, score, rule_index))
 
         return {
+            "employee_id": employee_id,
             "band": band,
-            "category": category,
-            "score": score,
-            "message": "Score does not match any defined range"
+            "evaluations": evaluations
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/analytics/scores/{dimension}")
+def get_score_analytics(
+    dimension: str,
+    band: Optional[str] = None,
+    value: Optional[str] = None,
+    db_conn=Depends(get_replica_conn)
+):
+    """
+    Average and distribution of total_score and per-category scores of completed assessments,
+    grouped by an organisation dimension. Reads the precomputed analytics aggregates.
+
+    Args:
+        dimension: department, reporting_manager, current_account or band
+        band: Only include assessments of this band (e.g., "2A" or "band2A")
+        value: Only return this dimension value (e.g., one department)
+
+    Returns:
+        dict: Groups ordered by value; each distribution has one count per entry of "buckets"
+    """
+    if dimension not in DIMENSIONS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown dimension {dimension}; expected one of {', '.join(DIMENSIONS)}"
+        )
+    band = band_code(band) if band else None
+
+    try:
+        with db_conn as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            groups = read_score_analytics(dimension, cur, band=band, value=value)
+
+        return {
+            "dimension": dimension,
+            "band": band,
+            "buckets": BUCKET_LABELS,
+            "groups": groups
+        }
+
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/export/assessment-results")
+def export_assessment_results(
+    format: str = "csv",
+    include_answers: bool = False,
+    band: Optional[str] = None,
+    completed_after: Optional[datetime] = None
+):
+    """
+    Stream every completed assessment with the employee's attributes for payroll and L&D systems.
+    Rows are flattened: one per category score, or one per answered question with include_answers.
+
+    Args:
+        format: csv or ndjson
+        include_answers: Also export each question and answer (one row per question)
+        band: Only export this band (e.g., "2A" or "band2A")
+        completed_after: Only export results completed after this time (ISO 8601), for incremental pulls
+
+    Returns:
+        StreamingResponse: Chunked CSV / NDJSON body
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown export format {format}; expected one of {', '.join(EXPORT_FORMATS)}"
+        )
+
+    chunks = stream_assessment_results(
+        format,
+        include_answers=include_answers,
+        band=band_code(band) if band else None,
+        completed_after=completed_after
+    )
+    # Run up to the first chunk here, so a busy pool or failing query still gets a proper status code
+    first_chunk = next(chunks)
+
+    return StreamingResponse(
+        itertools.chain([first_chunk], chunks),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="assessment-results.{format}"'}
+    )
+
+
+@app.post("/admin/analytics/rebuild")
+def rebuild_score_analytics(db_conn=Depends(get_db_conn)):
+    """
+    Recompute the analytics aggregates from assessment_results with the current
+    sails_employee_data, e.g. after employees moved department or manager.
+    """
+    try:
+        with db_conn as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            assessments = rebuild_analytics(cur)
+        return {"assessments": assessments}
+
+    except psycopg2.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+
+@app.get("/admin/drafts")
+def get_draft_stats():
+    return draft_buffer.stats()
+
+
+@app.post("/admin/drafts/flush")
+def flush_drafts():
+    return {"written": draft_buffer.flush(), **draft_buffer.stats()}
+
+
+@app.get("/admin/idempotency")
+def get_idempotency_stats():
+    return idempotency_store.stats()
+
+
+@app.get("/admin/admission")
+async def get_admission_stats():
+    """Return this worker's admission slots, queue length and recent request duration."""
+    return admission_controller.stats()
+
+
+@app.get("/admin/db-pool")
+def get_db_pool_stats():
+    """Return connection pool size, utilisation, waiters and timeout counters, and replica routing."""
+    return {**pool_stats(), "read_your_writes": recent_writers.stats()}
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Request latency, database and pool metrics in Prometheus text format."""
+    return Response(
+        content=render_metrics(pool_stats()),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/admin/db-profile")
+def get_db_profile():
+    """
+    Recent request profiles (queries grouped by normalized SQL) and slow queries with their plans.
+    Empty unless the server runs with DB_PROFILE=true.
+    """
+    return recent_profiles()
+
+
+@app.get("/admin/score-rules")
+def get_score_rules_index():
+    """Return the fingerprint and size of the loaded interpretation rules index."""
+    return score_rules.get().stats()
+
+
+@app.post("/admin/score-rules/reload")
+def reload_score_rules():
+    """
+    Rebuild the interpretation rules index from interpretations_and_focus_area.
+    Invalid rules (overlapping or gapped ranges) are rejected and the previous index is kept.
+    """
+    try:
+        return score_rules.reload().stats()
+    except ScoreRuleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/admin/reference-data")
+def get_reference_data_stats():
+    return reference_data_stats()
+
+
+@app.post("/admin/reference-data/reload")
+def reload_reference_data_snapshot(table: Optional[str] = None):
+    """
+    Reload the snapshot of one table (question_bank, interpretations_and_focus_area,
+    sails_employee_data) or of all of them. In snapshot mode every worker is told by NOTIFY.
+    """
+    if table is not None and table not in RELOADERS:
+        raise HTTPException(status_code=404, detail=f"Unknown reference table: {table}")
+
+    if employee_directory.loaded:
+        tables = [table] if table else list(RELOADERS)
+        with get_db_conn() as conn:
+            cur = conn.cursor()
+            for name in tables:
+                cur.execute("SELECT pg_notify(%s, %s);", (REFERENCE_DATA_CHANNEL, name))
+        return {"notified": tables}
+
+    try:
+        reloaded = reload_reference_data(table)
+    except ScoreRuleError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid interpretation rules: {e}")
+    return {"reloaded": reloaded, **reference_data_stats()}
+
+
+@app.get("/admin/question-bank")
+def get_question_bank_cache():
+    """Return the question bank cache version and the bands currently loaded."""
+    return {**question_bank.stats(), "response_cache": response_cache.stats()}
+
+
+@app.post("/admin/question-bank/reload")
+def reload_question_bank(band: Optional[str] = None):
+    """
+    Reload the question bank cache from the question_bank table.
+    Call this after the question bank is reloaded with seed_loader.py.
+
+    Args:
+        band: Band to reload (e.g., "2A" or "band2A"); every cached band if omitted
+    """
+    reloaded = question_bank.reload(band)
+    return {"reloaded": reloaded, **question_bank.stats()}
+
+
+@app.delete("/admin/question-bank")
+def invalidate_question_bank(band: Optional[str] = None):
+    """
+    Drop cached bands so the next request reads them again from Postgres.
+
+    Args:
+        band: Band to invalidate; the whole cache if omitted
+    """
+    question_bank.invalidate(band)
+    return question_bank.stats()
@@ -0,0 +1,282 @@
+import time
+import threading
+import contextvars
+
+
+# Prometheus' default latency buckets (seconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+# Endpoint label for requests that matched no route (keeps label cardinality bounded)
+UNMATCHED_ENDPOINT = "unmatched"
+
+
+class RequestStats:
+    """Database work done while serving one request."""
+
+    __slots__ = ("queries", "db_seconds", "pool_wait_seconds", "connection_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.connection_seconds = 0.0
+
+
+# Stats of the request being served; None outside of a request (startup, CLI scripts)
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+def record_query(seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += seconds
+
+
+def record_pool_wait(seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait_seconds += seconds
+
+
+def record_connection_held(seconds: float) -> None:
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.connection_seconds += seconds
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, labels: tuple = (), value: float = 0) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> list:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}   # labels -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="' + _format_value(bound) + '"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency.", ("method", "endpoint")
+)
+REQUESTS = Counter(
+    "http_requests_total", "Requests served.", ("method", "endpoint", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests being served."
+)
+REQUEST_QUERIES = Histogram(
+    "db_queries_per_request", "Database queries issued per request.", ("method", "endpoint"),
+    buckets=QUERY_COUNT_BUCKETS
+)
+QUERIES = Counter(
+    "db_queries_total", "Database queries issued.", ("method", "endpoint")
+)
+QUERY_SECONDS = Counter(
+    "db_query_seconds_total", "Time spent executing database queries.", ("method", "endpoint")
+)
+POOL_WAIT = Histogram(
+    "db_pool_wait_seconds", "Time a request waited for a pool connection.", ("method", "endpoint")
+)
+CONNECTION_HELD = Histogram(
+    "db_connection_held_seconds", "Time a request held pool connections.", ("method", "endpoint")
+)
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Time an admitted request waited in the admission queue.", ("class",)
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests turned away with a 503 by admission control.", ("class", "reason")
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Requests waiting in the admission queue.", ("class",)
+)
+ADMISSION_ACTIVE = Gauge(
+    "admission_active", "Requests admitted and being served.", ("class",)
+)
+
+REQUEST_METRICS = (
+    REQUEST_DURATION, REQUESTS, REQUESTS_IN_FLIGHT, REQUEST_QUERIES,
+    QUERIES, QUERY_SECONDS, POOL_WAIT, CONNECTION_HELD,
+    ADMISSION_WAIT, ADMISSION_REJECTED, ADMISSION_QUEUED, ADMISSION_ACTIVE
+)
+
+
+def server_timing(stats: RequestStats) -> str:
+    """Server-Timing header value with the request's database work (milliseconds)."""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+        f"pool-wait;dur={stats.pool_wait_seconds * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and the database work of every request per endpoint
+    (route path template, e.g. /assessment/history/{employee_id}).
+    Adds a Server-Timing header with the request's query count, DB time and pool wait.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        method = scope["method"]
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            REQUESTS_IN_FLIGHT.inc(amount=-1)
+
+            # The endpoint is only known once the router has matched the request
+            route = scope.get("route")
+            labels = (method, getattr(route, "path", None) or UNMATCHED_ENDPOINT)
+            REQUEST_DURATION.observe(labels, elapsed)
+            REQUESTS.inc(labels + (str(status),))
+            REQUEST_QUERIES.observe(labels, stats.queries)
+            QUERIES.inc(labels, stats.queries)
+            QUERY_SECONDS.inc(labels, stats.db_seconds)
+            POOL_WAIT.observe(labels, stats.pool_wait_seconds)
+            CONNECTION_HELD.observe(labels, stats.connection_seconds)
+
+
+def render_metrics(pool_stats: dict) -> str:
+    """All metrics in Prometheus text format, including pool utilisation from database.pool_stats()."""
+    lines = []
+    for metric in REQUEST_METRICS:
+        lines.extend(metric.render())
+
+    pool_gauges = {
+        "db_pool_max_size": ("Maximum pool connections.", "max_size"),
+        "db_pool_size": ("Open pool connections.", "size"),
+        "db_pool_in_use": ("Pool connections checked out.", "in_use"),
+        "db_pool_idle": ("Idle pool connections.", "idle"),
+        "db_pool_waiting": ("Requests waiting for a pool connection.", "waiting"),
+    }
+    pool_counters = {
+        "db_pool_checkouts_total": ("Connections handed out by the pool.", "checkouts"),
+        "db_pool_timeouts_total": ("Requests that gave up waiting for a connection.", "timeouts"),
+    }
+
+    pools = {}
+    for pool_name in ("sync", "replica"):
+        if pool_stats.get(pool_name):
+            pools[pool_name] = pool_stats[pool_name]
+    for pool_name in ("async", "async_replica"):
+        async_stats = pool_stats.get(pool_name)
+        if not async_stats:
+            continue
+        # psycopg_pool's get_stats() names
+        pools[pool_name] = {
+            "max_size": async_stats.get("pool_max", 0),
+            "size": async_stats.get("pool_size", 0),
+            "idle": async_stats.get("pool_available", 0),
+            "in_use": async_stats.get("pool_size", 0) - async_stats.get("pool_available", 0),
+            "waiting": async_stats.get("requests_waiting", 0),
+            "checkouts": async_stats.get("requests_num", 0),
+            "timeouts": async_stats.get("requests_errors", 0),
+        }
+
+    for kind, definitions in (("gauge", pool_gauges), ("counter", pool_counters)):
+        for name, (documentation, key) in definitions.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for pool_name, values in pools.items():
+                lines.append(f'{name}{{pool="{pool_name}"}} {values.get(key, 0)}')
+
+    return "\n".join(lines) + "\n"
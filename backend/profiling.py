@@ -0,0 +1,178 @@
+import os
+import re
+import time
+import threading
+import contextvars
+from collections import deque
+
+
+def _env_flag(name: str, default: str = "false") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+# Opt-in query profiling (never enable in production: slow queries are executed a second time)
+DB_PROFILE = _env_flag("DB_PROFILE")
+DB_PROFILE_SLOW_MS = float(os.getenv("DB_PROFILE_SLOW_MS", "100"))          # log queries slower than this
+DB_PROFILE_REPEAT_THRESHOLD = int(os.getenv("DB_PROFILE_REPEAT_THRESHOLD", "5"))  # warn above K runs per request
+DB_PROFILE_EXPLAIN_ANALYZE = _env_flag("DB_PROFILE_EXPLAIN_ANALYZE", "true")  # EXPLAIN ANALYZE vs plain EXPLAIN
+DB_PROFILE_HISTORY = int(os.getenv("DB_PROFILE_HISTORY", "50"))             # reports kept for /admin/db-profile
+
+# Only plain DML is explained; EXPLAIN rejects utility statements (SET, LOCK, DDL)
+EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH|INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%(?:\(\w+\))?s|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    Statement shape without literals or parameters, so repeated executions group together:
+    "SELECT * FROM t WHERE id = 42 AND x IN (1, 2)" -> "SELECT * FROM t WHERE id = ? AND x IN (?)"
+    """
+    query = _STRING_LITERAL.sub("?", query)
+    query = _PLACEHOLDER.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _VALUE_LIST.sub("(?)", query)
+    query = _REPEATED_LISTS.sub("(?)", query)
+    return _WHITESPACE.sub(" ", query).strip().rstrip(";")
+
+
+def explain_statement(query: str) -> str:
+    options = "ANALYZE, BUFFERS" if DB_PROFILE_EXPLAIN_ANALYZE else "COSTS"
+    return f"EXPLAIN ({options}) {query.strip().rstrip(';')}"
+
+
+def is_slow(seconds: float) -> bool:
+    return seconds * 1000 >= DB_PROFILE_SLOW_MS
+
+
+def is_explainable(query: str) -> bool:
+    return bool(EXPLAINABLE.match(query))
+
+
+class RequestProfile:
+    """Queries of one request, grouped by normalized SQL."""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.endpoint = path
+        self.statements = {}   # normalized SQL -> {"count", "seconds"}
+        self._lock = threading.Lock()
+
+    def add(self, statement: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.statements.setdefault(statement, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+
+    def repeated(self, threshold: int) -> list:
+        """Statements run more than `threshold` times, most frequent first."""
+        with self._lock:
+            return sorted(
+                ((statement, entry) for statement, entry in self.statements.items() if entry["count"] > threshold),
+                key=lambda item: -item[1]["count"]
+            )
+
+    def report(self) -> dict:
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda item: -item[1]["seconds"])
+            return {
+                "method": self.method,
+                "path": self.path,
+                "endpoint": self.endpoint,
+                "queries": sum(entry["count"] for _, entry in statements),
+                "db_ms": round(sum(entry["seconds"] for _, entry in statements) * 1000, 2),
+                "statements": [
+                    {"sql": statement, "count": entry["count"], "ms": round(entry["seconds"] * 1000, 2)}
+                    for statement, entry in statements
+                ]
+            }
+
+
+# Profile of the request being served; None outside of a request or when profiling is off
+_request_profile = contextvars.ContextVar("request_profile", default=None)
+
+_history_lock = threading.Lock()
+_recent_requests = deque(maxlen=DB_PROFILE_HISTORY)
+_slow_queries = deque(maxlen=DB_PROFILE_HISTORY)
+
+
+def record_statement(query: str, seconds: float) -> None:
+    """Add an executed query to the current request's profile."""
+    profile = _request_profile.get()
+    if profile is not None:
+        profile.add(normalize_sql(query), seconds)
+
+
+def log_slow_query(query: str, params, seconds: float, plan: str) -> None:
+    """Print a query over DB_PROFILE_SLOW_MS with its parameters and plan."""
+    profile = _request_profile.get()
+    where = f" during {profile.method} {profile.path}" if profile is not None else ""
+    print(
+        f"[db-profile] Slow query ({seconds * 1000:.1f} ms){where}:\n"
+        f"{query.strip()}\n"
+        f"params: {params!r}\n"
+        f"{plan}"
+    )
+    with _history_lock:
+        _slow_queries.append({
+            "sql": normalize_sql(query),
+            "params": repr(params),
+            "ms": round(seconds * 1000, 2),
+            "request": f"{profile.method} {profile.path}" if profile is not None else None,
+            "plan": plan,
+            "at": time.time()
+        })
+
+
+def finish_request(profile: RequestProfile) -> None:
+    """Warn about statements repeated more than DB_PROFILE_REPEAT_THRESHOLD times (N+1 queries)."""
+    for statement, entry in profile.repeated(DB_PROFILE_REPEAT_THRESHOLD):
+        print(
+            f"[db-profile] {profile.method} {profile.endpoint} ran the same statement "
+            f"{entry['count']} times ({entry['seconds'] * 1000:.1f} ms): {statement}"
+        )
+    with _history_lock:
+        _recent_requests.append(profile.report())
+
+
+def recent_profiles() -> dict:
+    """Recent request profiles and slow queries, newest first."""
+    with _history_lock:
+        return {
+            "enabled": DB_PROFILE,
+            "slow_ms": DB_PROFILE_SLOW_MS,
+            "repeat_threshold": DB_PROFILE_REPEAT_THRESHOLD,
+            "requests": list(reversed(_recent_requests)),
+            "slow_queries": list(reversed(_slow_queries))
+        }
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that groups each request's queries by normalized SQL (DB_PROFILE=true only).
+    Statements run more than DB_PROFILE_REPEAT_THRESHOLD times in one request are reported.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _request_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_profile.reset(token)
+            route = scope.get("route")
+            profile.endpoint = getattr(route, "path", None) or scope["path"]
+            finish_request(profile)
@@ -0,0 +1,210 @@
+import threading
+import time
+from psycopg2.extras import RealDictCursor
+from database import get_db_conn, fetch_all
+
+
+# Each competency has 25 questions (5 competencies = 125 questions per band)
+QUESTIONS_PER_COMPETENCY = 25
+
+# Active questions of one band in CSV order, with the column names of the old band tables
+BAND_QUESTIONS_QUERY = """
+    SELECT
+        'Band ' || band AS "Band",
+        competency AS "Competency",
+        sub_section AS "Sub_Section",
+        question AS "Question",
+        question_id
+    FROM question_bank
+    WHERE band = %s AND active
+    ORDER BY position, question_id;
+"""
+
+
+# Active questions of every band, for preloading the whole bank in one query
+ALL_BANDS_QUESTIONS_QUERY = """
+    SELECT
+        band,
+        'Band ' || band AS "Band",
+        competency AS "Competency",
+        sub_section AS "Sub_Section",
+        question AS "Question",
+        question_id
+    FROM question_bank
+    WHERE active
+    ORDER BY band, position, question_id;
+"""
+
+
+def band_code(band: str) -> str:
+    """Band format: "band2A" and "2A" both refer to band "2A" in question_bank"""
+    return band[len('band'):] if band.startswith('band') else band
+
+
+class BandQuestions:
+    """
+    Immutable snapshot of one band's active questions in question_bank.
+    Built once by QuestionBankCache and shared by all requests.
+    """
+
+    def __init__(self, band: str, rows: list, version: int):
+        self.band = band
+        self.version = version
+        self.loaded_at = time.time()
+
+        # Same shape as the old /bands/{band}/random-questions rows, plus question_id
+        self.questions = [dict(row) for row in rows]
+
+        self.sub_sections = list(dict.fromkeys(row["Sub_Section"] for row in rows))
+        self.competencies = list(dict.fromkeys(row["Competency"] for row in rows))
+        self.expected_questions = len(self.competencies) * QUESTIONS_PER_COMPETENCY
+
+        # Answers are stored by question_id; clients may still identify questions by text
+        self.question_ids = {row["Question"]: row["question_id"] for row in rows}
+        self.question_texts = {row["question_id"]: row["Question"] for row in rows}
+
+        # (question_id, question) pairs matching a Sub_Section or Competency, ordered by question text
+        self.questions_by_category = {}
+        for row in sorted(rows, key=lambda r: r["Question"]):
+            for key in {row["Sub_Section"], row["Competency"]}:
+                self.questions_by_category.setdefault(key, []).append(
+                    (row["question_id"], row["Question"])
+                )
+
+    def questions_for_category(self, category: str) -> list:
+        return self.questions_by_category.get(category, [])
+
+    def resolve(self, question_id: int = None, question: str = None):
+        """question_id of a question of this band given its id or its text, or None if unknown."""
+        if question_id is not None:
+            return question_id if question_id in self.question_texts else None
+        return self.question_ids.get(question)
+
+
+class QuestionBankCache:
+    """
+    Versioned in-process cache of question_bank, one entry per band.
+    Bands are loaded lazily on first use and kept until reload/invalidate.
+    Bands without active questions are never cached, so unknown band names cannot grow the cache.
+    Every load, reload or invalidation bumps the cache version.
+    Questions are fetched outside the lock; it only guards swapping entries and the version,
+    so async endpoints can take it on the event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bands = {}
+        self.version = 0
+
+    def get(self, band: str, cur=None) -> BandQuestions:
+        """
+        Return the cached questions for a band, loading them on a miss.
+        Returns None if the band has no active questions.
+
+        Args:
+            band: Band identifier (e.g., "2A" or "band2A")
+            cur: Optional cursor to load with; a pooled connection is used otherwise
+        """
+        band_name = band_code(band)
+        entry = self._bands.get(band_name)
+        if entry is not None:
+            return entry
+
+        # Two concurrent misses for the same band may both fetch it; the first one stored wins
+        rows = self._fetch(band_name, cur)
+        with self._lock:
+            entry = self._bands.get(band_name)
+            return entry if entry is not None else self._store(band_name, rows)
+
+    async def get_async(self, band: str) -> BandQuestions:
+        """
+        Async variant of get() for async endpoints.
+        A miss is loaded through database.fetch_all so the event loop is never blocked.
+        """
+        band_name = band_code(band)
+        entry = self._bands.get(band_name)
+        if entry is not None:
+            return entry
+
+        rows = await fetch_all(BAND_QUESTIONS_QUERY, (band_name,))
+        with self._lock:
+            entry = self._bands.get(band_name)
+            return entry if entry is not None else self._store(band_name, rows)
+
+    def reload(self, band: str = None) -> list:
+        """
+        Reload one band, or every cached band, from Postgres. Returns the reloaded bands;
+        bands that no longer have active questions are dropped.
+        """
+        bands = [band_code(band)] if band else list(self._bands)
+        for band_name in bands:
+            rows = self._fetch(band_name)
+            with self._lock:
+                self._store(band_name, rows)
+        return bands
+
+    def preload(self) -> list:
+        """
+        Load every band with active questions in one query, replacing the whole cache
+        (bands no longer in question_bank are dropped). Returns the loaded bands.
+        """
+        with get_db_conn() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(ALL_BANDS_QUESTIONS_QUERY)
+            rows_by_band = {}
+            for row in cur.fetchall():
+                rows_by_band.setdefault(row.pop("band"), []).append(row)
+
+        with self._lock:
+            for band_name in set(self._bands) - set(rows_by_band):
+                del self._bands[band_name]
+            for band_name, rows in rows_by_band.items():
+                self._store(band_name, rows)
+        return list(rows_by_band)
+
+    def invalidate(self, band: str = None) -> None:
+        """Drop one band, or the whole cache; the next request reloads it."""
+        with self._lock:
+            if band:
+                self._bands.pop(band_code(band), None)
+            else:
+                self._bands.clear()
+            self.version += 1
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "bands": {
+                name: {
+                    "version": entry.version,
+                    "loaded_at": entry.loaded_at,
+                    "total_questions": len(entry.questions),
+                    "competencies": len(entry.competencies),
+                    "expected_questions": entry.expected_questions
+                }
+                for name, entry in list(self._bands.items())
+            }
+        }
+
+    def _store(self, band_name: str, rows: list) -> BandQuestions:
+        # Caller must hold self._lock
+        if not rows:
+            # Unknown band, or all of its questions were deactivated
+            if self._bands.pop(band_name, None) is not None:
+                self.version += 1
+            return None
+        self.version += 1
+        entry = BandQuestions(band_name, rows, self.version)
+        self._bands[band_name] = entry
+        return entry
+
+    def _fetch(self, band_name: str, cur=None) -> list:
+        # Runs without self._lock; a pooled connection is used if no cursor is given
+        if cur is None:
+            with get_db_conn() as conn:
+                return self._fetch(band_name, conn.cursor(cursor_factory=RealDictCursor))
+        cur.execute(BAND_QUESTIONS_QUERY, (band_name,))
+        return cur.fetchall()
+
+
+question_bank = QuestionBankCache()
@@ -0,0 +1,143 @@
+import os
+import time
+import select
+import threading
+import psycopg2
+from database import POSTGRES_REPLICA_DSN, get_db_conn, get_replica_conn, connection_kwargs
+
+
+# How long (seconds) an employee's reads stay on the primary after one of their writes;
+# keep it above the replica's usual replay lag
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "10"))
+
+# Channel a write announces its employee on, so every worker (serve.py) routes their reads to the primary
+EMPLOYEE_WRITES_CHANNEL = "employee_writes"
+
+
+class RecentWriters:
+    """
+    Employees who wrote within the last `window_seconds`, whose reads must go to the primary
+    so they see their own writes even while the replica is behind.
+    """
+
+    def __init__(self, window_seconds: float = DB_READ_YOUR_WRITES_SECONDS):
+        self.window_seconds = window_seconds
+        self._until = {}          # employee_id -> monotonic time their reads may use the replica again
+        self._all_until = 0.0     # every read goes to the primary until then (missed notifications)
+        self._lock = threading.Lock()
+        self.marks = 0
+
+    def mark(self, employee_ids) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for employee_id in employee_ids:
+                self._until[employee_id] = now + self.window_seconds
+                self.marks += 1
+            # Forget expired marks once in a while
+            if len(self._until) > 1000 and self.marks % 1000 == 0:
+                self._until = {key: until for key, until in self._until.items() if until > now}
+
+    def mark_all(self) -> None:
+        with self._lock:
+            self._all_until = time.monotonic() + self.window_seconds
+
+    def recent(self, employee_id: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return now < self._all_until or self._until.get(employee_id, 0.0) > now
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "employees_on_primary": sum(1 for until in self._until.values() if until > now),
+                "all_on_primary": now < self._all_until,
+                "marks": self.marks
+            }
+
+
+recent_writers = RecentWriters()
+
+
+def record_writes(employee_ids, cur) -> None:
+    """
+    Keep these employees' reads on the primary for DB_READ_YOUR_WRITES_SECONDS, in every worker.
+    Call inside the writing transaction: the NOTIFY is only delivered when it commits.
+    No-op without a replica.
+    """
+    if not POSTGRES_REPLICA_DSN:
+        return
+    employee_ids = sorted(set(employee_ids))
+    if not employee_ids:
+        return
+    # Marked here too, before the response leaves this worker
+    recent_writers.mark(employee_ids)
+    cur.execute(
+        "SELECT pg_notify(%s, employee_id) FROM unnest(%s::text[]) AS employee_id;",
+        (EMPLOYEE_WRITES_CHANNEL, employee_ids)
+    )
+
+
+def get_employee_read_conn(employee_id: str):
+    """
+    FastAPI dependency for GET endpoints with an {employee_id} path parameter: a replica
+    connection, or a primary connection while the employee's own writes may not have
+    reached the replica yet.
+    """
+    return get_db_conn() if recent_writers.recent(employee_id) else get_replica_conn()
+
+
+class EmployeeWritesListener:
+    """
+    Background thread that LISTENs on EMPLOYEE_WRITES_CHANNEL and marks the announced employees
+    in recent_writers. Writes made by other workers and by the finalization worker are seen this way.
+    While the listener is disconnected, and for one window after, every read goes to the primary.
+    """
+
+    def __init__(self, retry_seconds: float = 5):
+        self.retry_seconds = retry_seconds
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            recent_writers.mark_all()
+            try:
+                conn = psycopg2.connect(**connection_kwargs())
+            except psycopg2.Error as e:
+                print(f"Employee writes listener cannot connect: {e}")
+                self._stopping.wait(self.retry_seconds)
+                continue
+            try:
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {EMPLOYEE_WRITES_CHANNEL};")
+                recent_writers.mark_all()
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1) == ([], [], []):
+                        continue
+                    conn.poll()
+                    recent_writers.mark([notify.payload for notify in conn.notifies])
+                    conn.notifies.clear()
+            except (psycopg2.Error, OSError) as e:
+                print(f"Employee writes listener lost its connection: {e}")
+                self._stopping.wait(self.retry_seconds)
+            finally:
+                conn.close()
+
+    def start(self) -> None:
+        if self._thread is not None or not POSTGRES_REPLICA_DSN:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="employee-writes-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+
+employee_writes_listener = EmployeeWritesListener()
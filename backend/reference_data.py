@@ -0,0 +1,182 @@
+import os
+import math
+import time
+import select
+import threading
+import psycopg2
+from database import get_db_conn, connection_kwargs
+from question_bank import question_bank
+from score_rules import score_rules
+
+
+# Keep the question banks, interpretation rules and employee directory in memory and reload
+# them on NOTIFY instead of querying or polling for changes (always on under serve.py)
+REFERENCE_SNAPSHOT = os.getenv("REFERENCE_SNAPSHOT", "false").strip().lower() in ("1", "true", "yes", "on")
+
+# Channel the schema.sql triggers and seed_loader.py announce changes on; the payload is the table name
+REFERENCE_DATA_CHANNEL = "reference_data_changed"
+
+
+class EmployeeSnapshot:
+    """
+    Immutable copy of sails_employee_data keyed by Employee_Number.
+    Rows are kept as tuples sharing one column list: far fewer objects than a dict per employee,
+    so a snapshot loaded before forking stays shared between the workers.
+    """
+
+    def __init__(self, columns: list, rows: list):
+        self.columns = tuple(columns)
+        self.loaded_at = time.time()
+        key = self.columns.index("Employee_Number")
+        self._rows = {row[key]: row for row in rows}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, employee_id: str):
+        """Employee row as returned by SELECT * FROM sails_employee_data, or None."""
+        row = self._rows.get(employee_id)
+        return dict(zip(self.columns, row)) if row is not None else None
+
+
+class EmployeeDirectory:
+    """Holds the current EmployeeSnapshot; a reload swaps in a new one."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.version = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def get(self, employee_id: str):
+        return self._snapshot.get(employee_id)
+
+    def load(self) -> EmployeeSnapshot:
+        with self._lock:
+            with get_db_conn() as conn:
+                # Plain cursor: tuples, not a dict per row
+                cur = conn.cursor()
+                cur.execute("SELECT * FROM sails_employee_data;")
+                columns = [column.name for column in cur.description]
+                snapshot = EmployeeSnapshot(columns, cur.fetchall())
+            self._snapshot = snapshot
+            self.version += 1
+            return snapshot
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self.version,
+            "employees": len(snapshot) if snapshot is not None else None,
+            "loaded_at": snapshot.loaded_at if snapshot is not None else None
+        }
+
+
+# Process-wide directory; only loaded in snapshot mode
+employee_directory = EmployeeDirectory()
+
+# What to reload when a table changes
+RELOADERS = {
+    "question_bank": question_bank.preload,
+    "interpretations_and_focus_area": score_rules.reload,
+    "sails_employee_data": employee_directory.load
+}
+
+
+def preload_reference_data() -> dict:
+    """Load every band's questions, the interpretation rules and the employee directory."""
+    started = time.perf_counter()
+    for reload in RELOADERS.values():
+        reload()
+    # Changes arrive by NOTIFY; no need to poll the rules table for a new fingerprint
+    score_rules.check_seconds = math.inf
+    return {"seconds": round(time.perf_counter() - started, 3), **reference_data_stats()}
+
+
+def reload_reference_data(table: str = None) -> list:
+    """Reload the snapshot of one table, or of all of them. Returns the reloaded tables."""
+    tables = [table] if table else list(RELOADERS)
+    for name in tables:
+        RELOADERS[name]()
+    return tables
+
+
+def reference_data_stats() -> dict:
+    return {
+        "snapshot": employee_directory.loaded,
+        "question_bank": question_bank.stats(),
+        "score_rules": score_rules.get().stats(),
+        "employee_directory": employee_directory.stats()
+    }
+
+
+class ReferenceDataListener:
+    """
+    Background thread that LISTENs on REFERENCE_DATA_CHANNEL and reloads the changed table.
+    Started in each worker after the fork: a connection cannot be shared between processes.
+    After a reconnect every table is reloaded, since notifications may have been missed.
+    """
+
+    def __init__(self, retry_seconds: float = 5):
+        self.retry_seconds = retry_seconds
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _reload(self, tables) -> None:
+        for table in tables:
+            try:
+                RELOADERS[table]()
+                print(f"Reloaded reference data of {table}")
+            except Exception as e:
+                # Keep serving the previous snapshot
+                print(f"Error reloading reference data of {table}: {e}")
+
+    def _run(self) -> None:
+        missed = False
+        while not self._stopping.is_set():
+            try:
+                conn = psycopg2.connect(**connection_kwargs())
+            except psycopg2.Error as e:
+                print(f"Reference data listener cannot connect: {e}")
+                missed = True
+                self._stopping.wait(self.retry_seconds)
+                continue
+            try:
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {REFERENCE_DATA_CHANNEL};")
+                if missed:
+                    self._reload(RELOADERS)
+                    missed = False
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1) == ([], [], []):
+                        continue
+                    conn.poll()
+                    changed = {notify.payload for notify in conn.notifies if notify.payload in RELOADERS}
+                    conn.notifies.clear()
+                    self._reload(sorted(changed))
+            except (psycopg2.Error, OSError) as e:
+                print(f"Reference data listener lost its connection: {e}")
+                missed = True
+                self._stopping.wait(self.retry_seconds)
+            finally:
+                conn.close()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="reference-data-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+
+reference_data_listener = ReferenceDataListener()
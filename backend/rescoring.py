@@ -0,0 +1,417 @@
+"""
+Bulk rescoring of stored assessment results after a scoring or interpretation rule change.
+
+total_score and category_scores are computed once, when an assessment is finalized, and kept
+in assessment_results. This job recomputes them for every stored result from its
+questions_answers document with the current scoring (answers.answer_points, percentage of
+MAX_SCORE_PER_QUESTION per answer) and reports how the scores and their interpretation
+ranges (interpretations_and_focus_area) change.
+
+Results are streamed through a server-side cursor in batches of RESCORING_BATCH_SIZE, with the
+answers of each result flattened to arrays in SQL. The scores of a batch are computed with
+NumPy (grouped sums per result and category) and matched against the interpretation ranges
+with one searchsorted per band and category. Changed results are written back with one
+UPDATE per batch; the analytics aggregates of the rescored latest results are updated in the
+same transaction, so readers see either the old or the new scores everywhere.
+Finalizations wait until the rescoring has committed.
+
+Usage (from backend/):
+    python rescoring.py --dry-run                       # report what would change
+    python rescoring.py --dry-run --diff changes.ndjson # ... and write every changed result
+    python rescoring.py                                 # rescore and save
+    python rescoring.py --band 2A --batch-size 5000
+"""
+import os
+import json
+import time
+import argparse
+from collections import Counter
+from itertools import chain
+import numpy as np
+from database import get_db_conn
+from answers import MAX_SCORE_PER_QUESTION
+from analytics import rebuild_score_distribution
+from question_bank import band_code
+from score_rules import score_rules, ScoreRuleIndex
+
+
+# Results per fetch and per UPDATE
+RESCORING_BATCH_SIZE = int(os.getenv("RESCORING_BATCH_SIZE", "1000"))
+
+# Scores closer than this are the same score (both are rounded to 2 decimals)
+SCORE_TOLERANCE = 1e-6
+
+# One row per stored result: the category and answer count of each section, and the answers
+# of all sections flattened in document order
+RESULTS_QUERY = """
+    SELECT
+        r.id,
+        r.employee_number,
+        r.agreed_band,
+        r.total_score,
+        CASE WHEN jsonb_typeof(r.category_scores) = 'string' AND r.category_scores #>> '{}' <> ''
+             THEN (r.category_scores #>> '{}')::jsonb
+             ELSE r.category_scores END AS category_scores,
+        a.section_categories,
+        a.section_sizes,
+        a.answer_values
+    FROM assessment_results r
+    CROSS JOIN LATERAL (
+        SELECT CASE WHEN jsonb_typeof(document) = 'array' THEN document ELSE '[]'::jsonb END AS sections
+        FROM (
+            SELECT CASE WHEN jsonb_typeof(r.questions_answers) = 'string' AND r.questions_answers #>> '{}' <> ''
+                        THEN (r.questions_answers #>> '{}')::jsonb
+                        ELSE r.questions_answers END AS document
+        ) stored
+    ) d
+    CROSS JOIN LATERAL (
+        SELECT
+            array_agg(COALESCE(section->>'category', '') ORDER BY position) AS section_categories,
+            array_agg(jsonb_array_length(section->'questions') ORDER BY position) AS section_sizes,
+            ARRAY(
+                SELECT answer->>'answer_value'
+                FROM jsonb_array_elements(d.sections) WITH ORDINALITY AS s(section, section_position)
+                CROSS JOIN LATERAL jsonb_array_elements(
+                    CASE WHEN jsonb_typeof(section->'questions') = 'array' THEN section->'questions' ELSE '[]'::jsonb END
+                ) WITH ORDINALITY AS q(answer, answer_position)
+                ORDER BY section_position, answer_position
+            ) AS answer_values
+        FROM jsonb_array_elements(d.sections) WITH ORDINALITY AS s(section, position)
+        WHERE jsonb_typeof(section->'questions') = 'array' AND jsonb_array_length(section->'questions') > 0
+    ) a
+    WHERE %(band)s::text IS NULL OR r.agreed_band = %(band)s
+    ORDER BY r.id;
+"""
+
+
+def answer_points_array(values: np.ndarray) -> np.ndarray:
+    """answers.answer_points over an array of answer texts: the number, or 0 when not a number."""
+    points = np.zeros(len(values), dtype=np.int64)
+    digits = np.char.isdigit(values)
+    points[digits] = values[digits].astype(np.int64)
+    return points
+
+
+def score_percentages(score_sums: np.ndarray, answer_counts: np.ndarray) -> list:
+    """
+    answers.score_percentage over arrays. The division is done in the same order, and the
+    rounding with Python's round(), so an unchanged score compares equal to the stored one.
+    """
+    max_scores = answer_counts * MAX_SCORE_PER_QUESTION
+    percentages = np.divide(score_sums, max_scores, out=np.zeros(len(score_sums)), where=max_scores > 0) * 100
+    return [round(value, 2) for value in percentages.tolist()]
+
+
+def match_ranges(rule_index: ScoreRuleIndex, bands: np.ndarray, categories: np.ndarray,
+                 scores: np.ndarray) -> np.ndarray:
+    """
+    ScoreRuleIndex.match over arrays: the score_range label matching each score, or None.
+    NaN scores (no score) match nothing.
+    """
+    labels = np.full(len(scores), None, dtype=object)
+    if not len(scores):
+        return labels
+    keys = np.char.add(np.char.add(bands.astype(str), "\x1f"), categories.astype(str))
+    unique_keys, key_index = np.unique(keys, return_inverse=True)
+    for position, key in enumerate(unique_keys.tolist()):
+        band, category = key.split("\x1f", 1)
+        intervals = rule_index.intervals(band, category)
+        if intervals is None:
+            continue
+        lower_bounds, rules = intervals
+        members = np.flatnonzero(key_index == position)
+        member_scores = scores[members]
+        positions = np.searchsorted(np.asarray(lower_bounds, dtype=float), member_scores, side="right") - 1
+        valid = (
+            ~np.isnan(member_scores)
+            & (positions >= 0)
+            & ~((positions == len(rules) - 1) & (member_scores > rules[-1].max_score))
+        )
+        range_labels = np.array([rule.score_range for rule in rules], dtype=object)
+        labels[members[valid]] = range_labels[positions[valid]]
+    return labels
+
+
+def _stored_scores(category_scores) -> dict:
+    if not isinstance(category_scores, list):
+        return {}
+    return {
+        entry["category"]: float(entry["score"])
+        for entry in category_scores
+        if isinstance(entry, dict) and entry.get("category") is not None and entry.get("score") is not None
+    }
+
+
+def _changed(old, new: float) -> bool:
+    return old is None or abs(old - new) > SCORE_TOLERANCE
+
+
+def rescore_batch(rows: list, rule_index: ScoreRuleIndex) -> list:
+    """
+    Recompute the scores of a batch of RESULTS_QUERY rows.
+
+    Returns:
+        list: One dict per result with answers: {"id", "employee_number", "band", "total_score",
+              "old_total_score", "category_scores" (as stored), "changes" (changed categories
+              with old/new score and range), "total_changed"}
+    """
+    rows = [row for row in rows if row[5]]
+    if not rows:
+        return []
+
+    # One entry per section, tagged with the position of its result
+    section_counts = np.fromiter((len(row[5]) for row in rows), dtype=np.int64, count=len(rows))
+    result_of_section = np.repeat(np.arange(len(rows)), section_counts)
+    section_sizes = np.fromiter(chain.from_iterable(row[6] for row in rows), dtype=np.int64,
+                                count=int(section_counts.sum()))
+    category_names, section_categories = np.unique(
+        np.array(list(chain.from_iterable(row[5] for row in rows)), dtype=str), return_inverse=True
+    )
+
+    # Points of every answer, summed per section
+    points = answer_points_array(
+        np.array([value or "" for value in chain.from_iterable(row[7] for row in rows)], dtype=str)
+    )
+    section_starts = np.concatenate(([0], np.cumsum(section_sizes)[:-1]))
+    section_sums = np.add.reduceat(points, section_starts)
+
+    # Sum and count per (result, category); a category split over several sections is added up
+    groups, group_of_section = np.unique(
+        result_of_section * len(category_names) + section_categories, return_inverse=True
+    )
+    group_sums = np.bincount(group_of_section, weights=section_sums)
+    group_counts = np.bincount(group_of_section, weights=section_sizes)
+    # Categories of a result keep the order they first appear in its document
+    first_section = np.full(len(groups), len(section_sizes), dtype=np.int64)
+    np.minimum.at(first_section, group_of_section, np.arange(len(section_sizes)))
+    group_results = groups // len(category_names)
+    order = np.lexsort((first_section, group_results))
+    group_results = group_results[order]
+    group_categories = category_names[groups[order] % len(category_names)]
+    group_scores = score_percentages(group_sums[order], group_counts[order])
+
+    total_scores = score_percentages(
+        np.bincount(result_of_section, weights=section_sums, minlength=len(rows)),
+        np.bincount(result_of_section, weights=section_sizes, minlength=len(rows))
+    )
+
+    # Stored score of every (result, category), NaN when the result had none
+    stored = [_stored_scores(row[4]) for row in rows]
+    group_category_list = group_categories.tolist()
+    group_result_list = group_results.tolist()
+    old_scores = np.array([
+        stored[result].get(category, np.nan) for result, category in zip(group_result_list, group_category_list)
+    ], dtype=float)
+    group_bands = np.array([rows[result][2] for result in group_result_list], dtype=str)
+    new_ranges = match_ranges(rule_index, group_bands, group_categories, np.asarray(group_scores, dtype=float))
+    old_ranges = match_ranges(rule_index, group_bands, group_categories, old_scores)
+
+    boundaries = np.searchsorted(group_results, np.arange(len(rows) + 1)).tolist()
+    rescored = []
+    for position, row in enumerate(rows):
+        start, end = boundaries[position], boundaries[position + 1]
+        category_scores = []
+        changes = []
+        for group in range(start, end):
+            category, score = group_category_list[group], group_scores[group]
+            category_scores.append({"category": category, "score": score})
+            old = stored[position].get(category)
+            if _changed(old, score) or old_ranges[group] != new_ranges[group]:
+                changes.append({
+                    "category": category,
+                    "old_score": old,
+                    "new_score": score,
+                    "old_range": old_ranges[group],
+                    "new_range": new_ranges[group]
+                })
+        # A category that no longer has answers
+        for category in sorted(stored[position].keys() - set(group_category_list[start:end])):
+            old = stored[position][category]
+            old_rule = rule_index.match(row[2], category, old)
+            changes.append({
+                "category": category,
+                "old_score": old,
+                "new_score": None,
+                "old_range": old_rule.score_range if old_rule else None,
+                "new_range": None
+            })
+        old_total = float(row[3]) if row[3] is not None else None
+        rescored.append({
+            "id": row[0],
+            "employee_number": row[1],
+            "band": row[2],
+            "total_score": total_scores[position],
+            "old_total_score": old_total,
+            "category_scores": category_scores,
+            "changes": changes,
+            "total_changed": _changed(old_total, total_scores[position])
+        })
+    return rescored
+
+
+def save_rescored(results: list, cur) -> None:
+    """Write new scores of changed results with one UPDATE."""
+    cur.execute("""
+        UPDATE assessment_results r
+        SET total_score = v.total_score, category_scores = v.category_scores::jsonb
+        FROM unnest(%s::int[], %s::float8[], %s::text[]) AS v(id, total_score, category_scores)
+        WHERE r.id = v.id;
+    """, (
+        [result["id"] for result in results],
+        [result["total_score"] for result in results],
+        [json.dumps(result["category_scores"]) for result in results]
+    ))
+
+
+def refresh_analytics_scores(result_ids: list, cur) -> int:
+    """
+    Copy the new scores of rescored results into the analytics aggregates, for the results
+    that are an employee's latest in their band, keeping the organisation data stored with them.
+
+    Returns:
+        int: Number of analytics facts updated
+    """
+    cur.execute("LOCK TABLE analytics_assessment_facts IN SHARE ROW EXCLUSIVE MODE;")
+    cur.execute("""
+        UPDATE analytics_assessment_facts f
+        SET total_score = latest.total_score,
+            category_scores = COALESCE((
+                SELECT jsonb_object_agg(s->>'category', (s->>'score')::float8)
+                FROM jsonb_array_elements(latest.category_scores) AS s
+                WHERE s->>'category' IS NOT NULL
+            ), '{}'::jsonb)
+        FROM (
+            SELECT DISTINCT ON (employee_number, agreed_band)
+                id, employee_number, agreed_band, total_score, category_scores
+            FROM assessment_results
+            ORDER BY employee_number, agreed_band, completed_at DESC
+        ) latest
+        WHERE latest.id = ANY(%s)
+          AND f.employee_number = latest.employee_number
+          AND f.band = latest.agreed_band
+          AND jsonb_typeof(latest.category_scores) = 'array';
+    """, (result_ids,))
+    updated = cur.rowcount
+    rebuild_score_distribution(cur)
+    return updated
+
+
+def rescore_results(band: str = None, batch_size: int = RESCORING_BATCH_SIZE,
+                    dry_run: bool = False, diff_file=None) -> dict:
+    """
+    Rescore every stored result (of one band) in one transaction.
+
+    Args:
+        band: Only rescore this band
+        batch_size: Results per fetch and per UPDATE
+        dry_run: Only report the changes; nothing is written
+        diff_file: Text file to write each changed result to, as one JSON line
+
+    Returns:
+        dict: Counts of scanned and changed results and scores, interpretation range moves and timings
+    """
+    started = time.perf_counter()
+    rule_index = score_rules.reload()
+    summary = {
+        "dry_run": dry_run,
+        "results": 0,
+        "rescored": 0,
+        "changed_results": 0,
+        "changed_totals": 0,
+        "changed_category_scores": 0,
+        "changed_ranges": 0,
+        "max_score_change": 0.0,
+        "analytics_updated": 0
+    }
+    range_moves = Counter()
+    changed_ids = []
+
+    with get_db_conn() as conn:
+        cur = conn.cursor()
+        if not dry_run:
+            # Finalizations wait for the rescoring instead of writing results in between
+            cur.execute("LOCK TABLE assessment_results IN SHARE ROW EXCLUSIVE MODE;")
+        # Named cursor: results stay on the server until fetched
+        results = conn.cursor(name="assessment_results_rescoring")
+        results.itersize = batch_size
+        results.execute(RESULTS_QUERY, {"band": band})
+        while True:
+            rows = results.fetchmany(batch_size)
+            if not rows:
+                break
+            summary["results"] += len(rows)
+            rescored = rescore_batch(rows, rule_index)
+            summary["rescored"] += len(rescored)
+
+            changed = [result for result in rescored if result["changes"] or result["total_changed"]]
+            for result in changed:
+                summary["changed_totals"] += result["total_changed"]
+                for change in result["changes"]:
+                    if change["old_score"] is None or change["new_score"] is None:
+                        summary["changed_category_scores"] += 1
+                    elif _changed(change["old_score"], change["new_score"]):
+                        summary["changed_category_scores"] += 1
+                        summary["max_score_change"] = max(
+                            summary["max_score_change"], round(abs(change["new_score"] - change["old_score"]), 2)
+                        )
+                    if change["old_range"] != change["new_range"]:
+                        summary["changed_ranges"] += 1
+                        range_moves[(result["band"], change["category"], change["old_range"], change["new_range"])] += 1
+                if diff_file is not None:
+                    diff_file.write(json.dumps({
+                        "id": result["id"],
+                        "employee_number": result["employee_number"],
+                        "band": result["band"],
+                        "total_score": {"old": result["old_total_score"], "new": result["total_score"]},
+                        "categories": result["changes"]
+                    }) + "\n")
+            summary["changed_results"] += len(changed)
+
+            if changed and not dry_run:
+                save_rescored(changed, cur)
+                changed_ids.extend(result["id"] for result in changed)
+        results.close()
+
+        if changed_ids:
+            summary["analytics_updated"] = refresh_analytics_scores(changed_ids, cur)
+        if dry_run:
+            conn.rollback()
+
+    summary["range_moves"] = [
+        {"band": band, "category": category, "from": old_range, "to": new_range, "results": count}
+        for (band, category, old_range, new_range), count in range_moves.most_common()
+    ]
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute stored assessment scores with the current scoring and rules.")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without saving them")
+    parser.add_argument("--diff", metavar="PATH", help="Write every changed result to this file (NDJSON)")
+    parser.add_argument("--band", help='Only rescore this band (e.g. "2A" or "band2A")')
+    parser.add_argument("--batch-size", type=int, default=RESCORING_BATCH_SIZE, help="Results per fetch and update")
+    args = parser.parse_args()
+
+    band = band_code(args.band) if args.band else None
+    if args.diff:
+        with open(args.diff, "w", encoding="utf-8") as diff_file:
+            summary = rescore_results(band, args.batch_size, args.dry_run, diff_file)
+    else:
+        summary = rescore_results(band, args.batch_size, args.dry_run)
+
+    action = "Would change" if args.dry_run else "Changed"
+    print(
+        f"Rescored {summary['rescored']} of {summary['results']} results in {summary['seconds']}s. "
+        f"{action} {summary['changed_results']} results: {summary['changed_totals']} total scores, "
+        f"{summary['changed_category_scores']} category scores (largest change {summary['max_score_change']}), "
+        f"{summary['changed_ranges']} interpretation ranges"
+    )
+    for move in summary["range_moves"][:20]:
+        print(f"  {move['band']} / {move['category']}: {move['from']} -> {move['to']} ({move['results']} results)")
+    if not args.dry_run:
+        print(f"Updated {summary['analytics_updated']} analytics facts")
+
+
+if __name__ == "__main__":
+    main()
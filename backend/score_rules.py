@@ -0,0 +1,211 @@
+import os
+import re
+import time
+import threading
+from bisect import bisect_right
+from psycopg2.extras import RealDictCursor
+from database import get_db_conn
+
+
+# How often (seconds) to check whether interpretations_and_focus_area changed
+SCORE_RULES_CHECK_SECONDS = float(os.getenv("SCORE_RULES_CHECK_SECONDS", "60"))
+
+
+class ScoreRuleError(ValueError):
+    """Raised when the interpretation rules cannot be turned into a valid index."""
+
+
+def parse_score_range(range_str: str):
+    """Converts range text into numeric bounds."""
+
+    if not range_str:
+        raise ValueError("Missing score range")
+
+    text = range_str.lower().strip()
+
+    if "below" in text or text.startswith("<"):
+        num = int(re.findall(r"\d+", text)[0])
+        return 0, num - 1
+
+    nums = re.findall(r"\d+", text)
+    if len(nums) == 2:
+        return int(nums[0]), int(nums[1])
+
+    raise ValueError(f"Invalid range format: {range_str}")
+
+
+class ScoreRule:
+    __slots__ = ("min_score", "max_score", "score_range", "interpretation", "focus_area")
+
+    def __init__(self, row: dict):
+        self.min_score, self.max_score = parse_score_range(row["Score Range"])
+        self.score_range = row["Score Range"]
+        self.interpretation = row["Interpretations"].strip('"') if row["Interpretations"] else ""
+        self.focus_area = row["Focus Area"].strip('"') if row["Focus Area"] else ""
+
+
+class ScoreRuleIndex:
+    """
+    Interpretation rules parsed once into a sorted interval list per (band, category).
+    Ranges of a (band, category) must be contiguous integer ranges ("50–74", "75–99", ...);
+    overlapping or gapped ranges are rejected when the index is built.
+    """
+
+    def __init__(self, rows: list, fingerprint: str = None):
+        self.fingerprint = fingerprint
+        self.loaded_at = time.time()
+
+        # Rows per band as returned by /assessment/score-ranges/{band}
+        self._ranges_by_band = {}
+        for row in sorted(rows, key=lambda r: (r["Category"] or "", r["Score Range"] or "")):
+            self._ranges_by_band.setdefault(row["Band"], []).append({
+                "category": row["Category"],
+                "score_range": row["Score Range"],
+                "interpretation": row["Interpretations"].strip('"') if row["Interpretations"] else "",
+                "focus_area": row["Focus Area"].strip('"') if row["Focus Area"] else ""
+            })
+
+        grouped = {}
+        for row in rows:
+            try:
+                rule = ScoreRule(row)
+            except (ValueError, IndexError):
+                raise ScoreRuleError(
+                    f"Invalid score range '{row['Score Range']}' for band {row['Band']}, {row['Category']}"
+                )
+            grouped.setdefault((row["Band"], row["Category"]), []).append(rule)
+
+        # (band, category) -> (sorted lower bounds, rules in the same order)
+        self._intervals = {}
+        self._categories_by_band = {}
+        for (band, category), rules in grouped.items():
+            rules.sort(key=lambda r: r.min_score)
+            for previous, current in zip(rules, rules[1:]):
+                if current.min_score <= previous.max_score:
+                    raise ScoreRuleError(
+                        f"Overlapping score ranges for band {band}, {category}: "
+                        f"'{previous.score_range}' and '{current.score_range}'"
+                    )
+                if current.min_score > previous.max_score + 1:
+                    raise ScoreRuleError(
+                        f"Gap between score ranges for band {band}, {category}: "
+                        f"'{previous.score_range}' and '{current.score_range}'"
+                    )
+            self._intervals[(band, category)] = ([r.min_score for r in rules], rules)
+            self._categories_by_band.setdefault(band, []).append(category)
+
+    def has_rules(self, band: str, category: str) -> bool:
+        return (band, category) in self._intervals
+
+    def categories(self, band: str) -> list:
+        """Categories that have interpretation rules for a band."""
+        return self._categories_by_band.get(band, [])
+
+    def ranges_for_band(self, band: str) -> list:
+        """All score ranges of a band, ordered by category and score range."""
+        return self._ranges_by_band.get(band, [])
+
+    def intervals(self, band: str, category: str):
+        """(sorted lower bounds, rules in the same order) of a (band, category), or None; for bulk matching."""
+        return self._intervals.get((band, category))
+
+    def match(self, band: str, category: str, score: float):
+        """
+        Return the ScoreRule whose range contains the score, or None.
+        Ranges are contiguous, so a fractional score (e.g. 99.5) belongs to the
+        range it falls in before the next lower bound.
+        """
+        intervals = self._intervals.get((band, category))
+        if intervals is None:
+            return None
+
+        lower_bounds, rules = intervals
+        position = bisect_right(lower_bounds, score) - 1
+        if position < 0:
+            return None
+        if position == len(rules) - 1 and score > rules[position].max_score:
+            return None
+        return rules[position]
+
+    def stats(self) -> dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "loaded_at": self.loaded_at,
+            "categories": len(self._intervals),
+            "rules": sum(len(rules) for _, rules in self._intervals.values())
+        }
+
+
+class ScoreRules:
+    """
+    Holds the current ScoreRuleIndex.
+    At most every SCORE_RULES_CHECK_SECONDS a cheap fingerprint of the rules table is
+    compared with the loaded one; the index is rebuilt only when the table changed.
+    """
+
+    def __init__(self, check_seconds: float = SCORE_RULES_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self._index = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> ScoreRuleIndex:
+        index = self._index
+        if index is not None and time.monotonic() - self._checked_at < self.check_seconds:
+            return index
+
+        # Only one request refreshes; the others keep using the current index
+        if index is not None and not self._lock.acquire(blocking=False):
+            return index
+        if index is None:
+            self._lock.acquire()
+
+        try:
+            if self._index is None or time.monotonic() - self._checked_at >= self.check_seconds:
+                self._refresh()
+            return self._index
+        finally:
+            self._lock.release()
+
+    def reload(self) -> ScoreRuleIndex:
+        """Rebuild the index now. Raises ScoreRuleError and keeps the old index if the rules are invalid."""
+        with self._lock:
+            self._refresh(force=True)
+            return self._index
+
+    def _refresh(self, force: bool = False):
+        with get_db_conn() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+
+            cur.execute("""
+                SELECT md5(COALESCE(string_agg(t::text, E'\\n' ORDER BY t::text), '')) AS fingerprint
+                FROM interpretations_and_focus_area t;
+            """)
+            fingerprint = cur.fetchone()["fingerprint"]
+
+            if not force and self._index is not None and self._index.fingerprint == fingerprint:
+                self._checked_at = time.monotonic()
+                return
+
+            cur.execute("""
+                SELECT
+                    "Band",
+                    "Category",
+                    "Score Range",
+                    "Interpretations",
+                    "Focus Area"
+                FROM interpretations_and_focus_area;
+            """)
+            rows = cur.fetchall()
+
+        try:
+            self._index = ScoreRuleIndex(rows, fingerprint)
+        except ScoreRuleError as e:
+            if self._index is None or force:
+                raise
+            # Keep serving the last valid rules
+            print(f"Invalid interpretation rules, keeping previous index: {e}")
+        self._checked_at = time.monotonic()
+
+
+score_rules = ScoreRules()
@@ -0,0 +1,336 @@
+"""
+Bulk loader for the reference data in PostgresDataIngestion/seeds (replaces `dbt seed`).
+
+Each CSV is cleaned while it is read (BOM, surrounding whitespace, quoted-quote text)
+and streamed through COPY FROM STDIN into a staging table; files are loaded in parallel.
+Once every file has loaded, all staging tables are swapped into place in one transaction,
+so the application never reads a half-loaded or partially refreshed set of tables.
+The band question files (band1.csv ... band6B.csv) are merged into the question_bank table
+in that same transaction instead of being swapped in as tables of their own.
+
+Usage (from backend/):
+    python seed_loader.py                       # load every seed file
+    python seed_loader.py sails_employee_data   # load selected tables only
+    python seed_loader.py --workers 8 --seeds-dir /path/to/seeds
+"""
+import os
+import re
+import csv
+import io
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from psycopg2 import sql
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+DEFAULT_SEEDS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "PostgresDataIngestion", "seeds"
+)
+SEED_LOADER_WORKERS = int(os.getenv("SEED_LOADER_WORKERS", "4"))
+# Longest time the swap waits for running queries to release the tables
+SEED_LOADER_LOCK_TIMEOUT_MS = int(os.getenv("SEED_LOADER_LOCK_TIMEOUT_MS", "5000"))
+
+STAGING_SUFFIX = "__staging"
+OLD_SUFFIX = "__old"
+
+# Free text stored as """text"" " in the CSVs; the surrounding quotes are removed on load
+QUOTED_TEXT_COLUMNS = {"Question", "Interpretations", "Focus Area"}
+
+# band2A.csv holds the questions of band "2A" in question_bank
+BAND_FILE_PATTERN = re.compile(r"^band(\w+)$")
+
+# Keys and indexes of swapped-in tables (as in database/schema.sql), built on the staging
+# table before the swap: {table: [(name, definition)]}
+TABLE_INDEXES = {
+    "sails_employee_data": [
+        ("sails_employee_data_pkey",
+         'ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY ("Employee_Number");'),
+        ("idx_sails_employee_data_reporting_manager",
+         'CREATE INDEX {name} ON {table} ("Reporting_Manager");'),
+    ]
+}
+
+# Tables the backend keeps an in-memory snapshot of (backend/reference_data.py): swapped-in copies
+# get the change-notification trigger from schema.sql, and every loaded table is announced
+REFERENCE_DATA_CHANNEL = "reference_data_changed"
+REFERENCE_TABLES = {"question_bank", "interpretations_and_focus_area", "sails_employee_data"}
+
+
+def connect():
+    """Direct connection with the backend's settings (no statement timeout for bulk loads)."""
+    return psycopg2.connect(
+        user=os.getenv("POSTGRES_USER"),
+        password=os.getenv("POSTGRES_PASSWORD"),
+        host=os.getenv("POSTGRES_SERVER"),
+        port=os.getenv("POSTGRES_PORT"),
+        dbname=os.getenv("POSTGRES_DB")
+    )
+
+
+def clean_value(column: str, value: str):
+    """Trim a CSV field; empty fields become NULL as they did with dbt seeds."""
+    value = value.strip()
+    if column in QUOTED_TEXT_COLUMNS:
+        value = value.strip('"').strip()
+    return value or None
+
+
+class CleanedCSV:
+    """
+    File-like object for copy_expert(): reads a seed CSV row by row and yields it back
+    as clean CSV, so a file is never held in memory as a whole.
+    """
+
+    def __init__(self, path: str, with_position: bool = False):
+        # utf-8-sig drops the byte order mark the seed files start with
+        self._file = open(path, encoding="utf-8-sig", newline="")
+        self._reader = csv.reader(self._file)
+        header = next(self._reader)
+        # Trailing empty header cells (stray commas) are not columns
+        self.positions = [i for i, name in enumerate(header) if name.strip()]
+        self.columns = [header[i].strip() for i in self.positions]
+        # Optionally number the rows, keeping the file order after the load
+        self.with_position = with_position
+        if with_position:
+            self.columns.append("position")
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = b""
+        self.rows = 0
+
+    def _next_chunk(self, batch_rows: int = 500) -> bytes:
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        for row in self._reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            row = row + [""] * (len(self.positions) - len(row))
+            values = [clean_value(column, row[i]) for column, i in zip(self.columns, self.positions)]
+            self.rows += 1
+            if self.with_position:
+                values.append(self.rows)
+            self._writer.writerow(values)
+            if self.rows % batch_rows == 0:
+                break
+        return self._buffer.getvalue().encode("utf-8")
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._pending) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._pending += chunk
+        if size < 0:
+            data, self._pending = self._pending, b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def seed_tables(seeds_dir: str) -> dict:
+    """Seed CSVs by table name (file name without .csv), as dbt names the seed tables."""
+    return {
+        name[:-4]: os.path.join(seeds_dir, name)
+        for name in sorted(os.listdir(seeds_dir))
+        if name.endswith(".csv")
+    }
+
+
+def question_bank_band(table: str):
+    """Band code for a band question file ("band2A" -> "2A"), None for other seed files."""
+    match = BAND_FILE_PATTERN.match(table)
+    return match.group(1) if match else None
+
+
+def load_staging(table: str, path: str) -> dict:
+    """
+    Stream one CSV into a fresh "<table>__staging" table and commit it.
+
+    Returns:
+        dict: {"table", "rows", "seconds"}
+    """
+    started = time.monotonic()
+    staging = sql.Identifier(table + STAGING_SUFFIX)
+    source = CleanedCSV(path, with_position=question_bank_band(table) is not None)
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(staging))
+            # All columns are TEXT, like the existing seed tables the API reads as text
+            cur.execute(sql.SQL("CREATE TABLE {} ({});").format(
+                staging,
+                sql.SQL(", ").join(
+                    sql.SQL("{} TEXT").format(sql.Identifier(column)) for column in source.columns
+                )
+            ))
+            cur.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+                    staging,
+                    sql.SQL(", ").join(sql.Identifier(column) for column in source.columns)
+                ),
+                source
+            )
+            # Duplicate or missing keys fail the load here, before anything is swapped
+            for name, definition in TABLE_INDEXES.get(table, []):
+                cur.execute(sql.SQL(definition).format(
+                    table=staging, name=sql.Identifier(name + STAGING_SUFFIX)
+                ))
+        conn.commit()
+    finally:
+        source.close()
+        conn.close()
+
+    return {"table": table, "rows": source.rows, "seconds": round(time.monotonic() - started, 3)}
+
+
+def merge_question_bank(table: str, band: str, cur) -> None:
+    """
+    Merge a band's staged questions into question_bank.
+    Existing questions keep their question_id (answers reference it); questions
+    no longer in the file are marked inactive rather than deleted.
+    """
+    staging = sql.Identifier(table + STAGING_SUFFIX)
+    cur.execute(sql.SQL("""
+        INSERT INTO question_bank (band, competency, sub_section, question_no, question, position, active)
+        SELECT DISTINCT ON ("Question")
+            %(band)s, "Competency", "Sub_Section", "Q.No", "Question", position::int, TRUE
+        FROM {staging}
+        WHERE "Question" IS NOT NULL
+        ORDER BY "Question", position::int
+        ON CONFLICT (band, question) DO UPDATE SET
+            competency = EXCLUDED.competency,
+            sub_section = EXCLUDED.sub_section,
+            question_no = EXCLUDED.question_no,
+            position = EXCLUDED.position,
+            active = TRUE;
+    """).format(staging=staging), {"band": band})
+    cur.execute(sql.SQL("""
+        UPDATE question_bank q
+        SET active = FALSE
+        WHERE q.band = %(band)s
+          AND q.active
+          AND NOT EXISTS (SELECT 1 FROM {staging} s WHERE s."Question" = q.question);
+    """).format(staging=staging), {"band": band})
+    cur.execute(sql.SQL("DROP TABLE {};").format(staging))
+
+
+def create_change_trigger(table: str, cur) -> None:
+    """Add the reference data change trigger to a swapped-in table (if schema.sql created its function)."""
+    cur.execute("SELECT to_regproc('notify_reference_data_changed') IS NOT NULL;")
+    if not cur.fetchone()[0]:
+        return
+    cur.execute(sql.SQL("""
+        CREATE TRIGGER reference_data_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {}
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data_changed();
+    """).format(sql.Identifier(table)))
+
+
+def swap_tables(tables: list) -> None:
+    """
+    Replace every table with its staging table in a single transaction
+    (band question files are merged into question_bank instead).
+    Readers see either all old or all new data.
+    """
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL lock_timeout = %s;", (f"{SEED_LOADER_LOCK_TIMEOUT_MS}ms",))
+            for table in tables:
+                band = question_bank_band(table)
+                if band is not None:
+                    merge_question_bank(table, band, cur)
+                    continue
+
+                old = sql.Identifier(table + OLD_SUFFIX)
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(old))
+                cur.execute(sql.SQL("ALTER TABLE IF EXISTS {} RENAME TO {};").format(
+                    sql.Identifier(table), old
+                ))
+                cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {};").format(
+                    sql.Identifier(table + STAGING_SUFFIX), sql.Identifier(table)
+                ))
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(old))
+                for name, _ in TABLE_INDEXES.get(table, []):
+                    cur.execute(sql.SQL("ALTER INDEX {} RENAME TO {};").format(
+                        sql.Identifier(name + STAGING_SUFFIX), sql.Identifier(name)
+                    ))
+                if table in REFERENCE_TABLES:
+                    create_change_trigger(table, cur)
+
+            # Delivered on commit; backends serving a snapshot reload the changed tables
+            changed = {"question_bank" if question_bank_band(table) is not None else table for table in tables}
+            for table in sorted(changed & REFERENCE_TABLES):
+                cur.execute("SELECT pg_notify(%s, %s);", (REFERENCE_DATA_CHANNEL, table))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def drop_staging(tables: list) -> None:
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            for table in tables:
+                cur.execute(sql.SQL("DROP TABLE IF EXISTS {};").format(
+                    sql.Identifier(table + STAGING_SUFFIX)
+                ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_seeds(seeds_dir: str = DEFAULT_SEEDS_DIR, tables: list = None,
+               workers: int = SEED_LOADER_WORKERS) -> list:
+    """
+    Load seed CSVs into staging tables in parallel, then swap them all into place.
+    Nothing is swapped if any file fails to load.
+
+    Args:
+        seeds_dir: Directory with the seed CSVs
+        tables: Table names to load; every CSV in seeds_dir if omitted
+        workers: Number of files loaded at the same time
+
+    Returns:
+        list: Per-table results from load_staging()
+    """
+    available = seed_tables(seeds_dir)
+    tables = tables or list(available)
+    unknown = [table for table in tables if table not in available]
+    if unknown:
+        raise ValueError(f"No seed file for: {', '.join(unknown)}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda t: load_staging(t, available[t]), tables))
+        swap_tables(tables)
+    except Exception:
+        drop_staging(tables)
+        raise
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the seed CSVs with COPY (replaces dbt seed).")
+    parser.add_argument("tables", nargs="*", help="Tables to load (default: every CSV in the seeds directory)")
+    parser.add_argument("--seeds-dir", default=DEFAULT_SEEDS_DIR, help="Directory with the seed CSVs")
+    parser.add_argument("--workers", type=int, default=SEED_LOADER_WORKERS, help="Files loaded in parallel")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    results = load_seeds(args.seeds_dir, args.tables, args.workers)
+    for result in results:
+        print(f"{result['table']}: {result['rows']} rows in {result['seconds']}s")
+    print(f"Loaded {len(results)} tables in {time.monotonic() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Prefork server: loads the reference data once, then forks the uvicorn workers.
+
+The question banks, interpretation rules and employee directory are loaded into memory in
+the parent process before forking, so every worker starts with the same snapshot and shares
+its memory pages copy-on-write instead of loading (and querying) its own copy.
+Each worker then LISTENs for reference_data_changed and reloads a table when it changes
+(see reference_data.py). Workers that exit unexpectedly are replaced.
+
+Usage (from backend/):
+    python serve.py                          # one worker per CPU on port 8000
+    python serve.py --workers 8 --port 8000
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import argparse
+import uvicorn
+from database import pool, replica_pool
+from reference_data import preload_reference_data
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, args) -> None:
+    """Body of a forked worker: serve the app on the shared listening socket."""
+    # The parent's signal handlers only forward signals; uvicorn installs its own
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    config = uvicorn.Config(app, log_level=args.log_level, timeout_keep_alive=args.keep_alive)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from forked workers sharing one reference data snapshot.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to bind")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen backlog")
+    parser.add_argument("--keep-alive", type=int, default=5, help="Seconds to keep idle HTTP connections open")
+    parser.add_argument("--log-level", default="info", help="uvicorn log level")
+    args = parser.parse_args()
+
+    snapshot = preload_reference_data()
+    print(
+        f"Loaded reference data in {snapshot['seconds']}s: "
+        f"{len(snapshot['question_bank']['bands'])} bands, "
+        f"{snapshot['score_rules']['rules']} interpretation rules, "
+        f"{snapshot['employee_directory']['employees']} employees"
+    )
+
+    from main import app
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+
+    # Connections must not be shared between processes: each worker opens its own
+    pool.closeall()
+    if replica_pool is not None:
+        replica_pool.closeall()
+    # Keep the garbage collector from writing to the snapshot's pages in the workers
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(app, sock, args)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+
+    def forward(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+
+    for _ in range(args.workers):
+        spawn()
+    print(f"Serving on http://{args.host}:{args.port} with {args.workers} workers")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}, starting a new one")
+        # A worker that dies right after starting would otherwise be restarted in a tight loop
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        spawn()
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
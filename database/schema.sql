@@ -5,7 +5,7 @@
 -- =====================================================
 
 CREATE TABLE IF NOT EXISTS sails_employee_data (
-    "Employee_Number" TEXT,
+    "Employee_Number" TEXT PRIMARY KEY,
     "Employee_Name" TEXT,
     "Agreed_Band" TEXT,
     "Managers_Manager" TEXT,
@@ -16,8 +16,95 @@ CREATE TABLE IF NOT EXISTS sails_employee_data (
     "Current_Designation" TEXT
 );
 
+-- Key tables created without one (dbt seed, older schema). Rows without an Employee_Number
+-- or repeating one (all but the last loaded) are moved to sails_employee_data_rejected.
+-- backend/seed_loader.py recreates the key and the index below on every reload.
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'sails_employee_data'::regclass AND contype = 'p'
+    ) THEN
+        CREATE TABLE IF NOT EXISTS sails_employee_data_rejected AS
+        SELECT * FROM sails_employee_data WITH NO DATA;
+
+        WITH ranked AS (
+            SELECT ctid, "Employee_Number",
+                   row_number() OVER (PARTITION BY "Employee_Number" ORDER BY ctid DESC) AS rn
+            FROM sails_employee_data
+        ),
+        rejected AS (
+            DELETE FROM sails_employee_data e
+            USING ranked r
+            WHERE e.ctid = r.ctid AND (r."Employee_Number" IS NULL OR r.rn > 1)
+            RETURNING e.*
+        )
+        INSERT INTO sails_employee_data_rejected SELECT * FROM rejected;
+
+        ALTER TABLE sails_employee_data
+        ADD CONSTRAINT sails_employee_data_pkey PRIMARY KEY ("Employee_Number");
+    END IF;
+END $$;
+
+-- Team lookups (/managers/{id}/team); Reporting_Manager holds the manager's name
+CREATE INDEX IF NOT EXISTS idx_sails_employee_data_reporting_manager
+ON sails_employee_data("Reporting_Manager");
+
 -- =====================================================
--- 2. Assessment Tables
+-- 2. Question Bank
+-- =====================================================
+-- Questions of every band in one table (replaces the per-band "bandX" tables).
+-- Loaded from PostgresDataIngestion/seeds/band*.csv by backend/seed_loader.py.
+-- question_id stays stable across reloads: questions are matched on (band, question),
+-- and questions removed from a CSV are only marked inactive because answers reference them.
+
+CREATE TABLE IF NOT EXISTS question_bank (
+    question_id SERIAL PRIMARY KEY,
+    band TEXT NOT NULL,                   -- "2A", as in assessment_answers.band
+    competency TEXT NOT NULL,
+    sub_section TEXT NOT NULL,
+    question_no TEXT,
+    question TEXT NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,  -- row order within the band's CSV
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    UNIQUE (band, question)
+);
+
+CREATE INDEX IF NOT EXISTS idx_question_bank_band_competency_sub_section
+ON question_bank(band, competency, sub_section);
+
+-- Move questions from the legacy band seed tables, then drop those tables.
+-- dbt seeded them case-sensitive ("band2A"); the original schema.sql created them unquoted,
+-- which Postgres folds to lowercase (band2a). Both spellings are migrated.
+DO $$
+DECLARE
+    band_code TEXT;
+    legacy_table TEXT;
+BEGIN
+    FOREACH band_code IN ARRAY ARRAY['1', '1A', '1B', '2A', '2B', '3A', '3B', '4A', '4B', '5A', '5B', '6A', '6B'] LOOP
+        FOREACH legacy_table IN ARRAY ARRAY['band' || band_code, lower('band' || band_code)] LOOP
+            IF to_regclass(format('%I', legacy_table)) IS NOT NULL THEN
+                EXECUTE format($sql$
+                    INSERT INTO question_bank (band, competency, sub_section, question_no, question, position)
+                    SELECT %L, "Competency", "Sub_Section", "Q.No"::text, question, position
+                    FROM (
+                        SELECT
+                            *,
+                            btrim(btrim("Question", E' \t\r\n'), '"') AS question,
+                            row_number() OVER (ORDER BY ctid) AS position
+                        FROM %I
+                        WHERE "Question" IS NOT NULL
+                    ) legacy
+                    ON CONFLICT (band, question) DO NOTHING;
+                $sql$, band_code, legacy_table);
+                EXECUTE format('DROP TABLE %I;', legacy_table);
+            END IF;
+        END LOOP;
+    END LOOP;
+END $$;
+
+-- =====================================================
+-- 3. Assessment Tables
 -- =====================================================
 
 CREATE TABLE IF NOT EXISTS assessment_answers (
@@ -25,7 +112,7 @@ CREATE TABLE IF NOT EXISTS assessment_answers (
     employee_id TEXT NOT NULL,
     band TEXT NOT NULL,
     category TEXT NOT NULL,
-    question TEXT NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES question_bank(question_id),
     answer_value TEXT,
     updated_at TIMESTAMP DEFAULT NOW()
 );
@@ -37,6 +124,94 @@ ON assessment_answers(employee_id, band);
 CREATE INDEX IF NOT EXISTS idx_assessment_answers_category 
 ON assessment_answers(category, employee_id);
 
+-- Upgrade answers keyed by question text to question_bank ids.
+-- Run after the question bank has been loaded (legacy band tables are moved above).
+-- Answers whose text matches no question of their band are moved to
+-- assessment_answers_unmapped; their running totals are rebuilt by the backfill below.
+DO $$
+DECLARE
+    unmapped INTEGER;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'assessment_answers' AND column_name = 'question'
+    ) THEN
+        ALTER TABLE assessment_answers
+        ADD COLUMN IF NOT EXISTS question_id INTEGER REFERENCES question_bank(question_id);
+
+        UPDATE assessment_answers a
+        SET question_id = q.question_id
+        FROM question_bank q
+        WHERE a.question_id IS NULL
+          AND q.band = a.band
+          AND q.question = a.question;
+
+        CREATE TABLE IF NOT EXISTS assessment_answers_unmapped AS
+        SELECT * FROM assessment_answers WITH NO DATA;
+
+        INSERT INTO assessment_answers_unmapped
+        SELECT * FROM assessment_answers WHERE question_id IS NULL;
+        GET DIAGNOSTICS unmapped = ROW_COUNT;
+
+        IF unmapped > 0 THEN
+            -- Drop the totals of the affected assessments; the backfill below recomputes them
+            -- from the remaining answers. On databases older than the totals table it does not
+            -- exist yet and the backfill creates every row.
+            IF to_regclass('assessment_category_scores') IS NOT NULL THEN
+                DELETE FROM assessment_category_scores s
+                USING assessment_answers_unmapped u
+                WHERE s.employee_id = u.employee_id AND s.band = u.band;
+            END IF;
+
+            DELETE FROM assessment_answers WHERE question_id IS NULL;
+            RAISE NOTICE '% answers did not match question_bank and were moved to assessment_answers_unmapped', unmapped;
+        END IF;
+
+        ALTER TABLE assessment_answers ALTER COLUMN question_id SET NOT NULL;
+        ALTER TABLE assessment_answers DROP COLUMN question;
+    END IF;
+END $$;
+
+-- One answer per employee, band and question.
+-- Required by the bulk upsert (INSERT ... ON CONFLICT) in /assessment/section/submit.
+-- Remove duplicates left by the old select-then-insert path, keeping the latest row.
+DELETE FROM assessment_answers a
+USING assessment_answers b
+WHERE a.employee_id = b.employee_id
+  AND a.band = b.band
+  AND a.question_id = b.question_id
+  AND a.id < b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_assessment_answers_employee_band_question_id
+ON assessment_answers(employee_id, band, question_id);
+
+-- Running score totals per employee, band and category for in-progress assessments.
+-- Updated in the same transaction as assessment_answers by /assessment/section/submit,
+-- so submit and score evaluation read one row per category instead of every answer.
+CREATE TABLE IF NOT EXISTS assessment_category_scores (
+    employee_id TEXT NOT NULL,
+    band TEXT NOT NULL,
+    category TEXT NOT NULL,
+    score_sum INTEGER NOT NULL DEFAULT 0,
+    answer_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (employee_id, band, category)
+);
+
+-- Backfill totals for assessments that were in progress before the table existed, and for
+-- those whose totals were dropped when unmapped answers were moved out (see above).
+-- Runs after the rekey, so only answers left in assessment_answers are counted.
+INSERT INTO assessment_category_scores (employee_id, band, category, score_sum, answer_count)
+SELECT
+    employee_id,
+    band,
+    category,
+    SUM(CASE WHEN answer_value ~ '^[0-9]+$' THEN answer_value::int ELSE 0 END),
+    COUNT(*)
+FROM assessment_answers
+GROUP BY employee_id, band, category
+ON CONFLICT (employee_id, band, category) DO NOTHING;
+
 CREATE TABLE IF NOT EXISTS assessment_results (
     id SERIAL PRIMARY KEY,
     employee_number TEXT NOT NULL,
@@ -55,138 +230,182 @@ CREATE INDEX IF NOT EXISTS idx_assessment_results_completed_at
 ON assessment_results(completed_at);
 
 -- =====================================================
--- 3. Band Question Tables
+-- 4. Interpretations and Focus Area Table
 -- =====================================================
--- These tables store questions for each band level
--- Each table has the same structure: Band, Competency, Sub_Section, Question
-
--- BAND1
-CREATE TABLE IF NOT EXISTS band1 (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
-
--- BAND1A
-CREATE TABLE IF NOT EXISTS band1A (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
-
--- BAND1B
-CREATE TABLE IF NOT EXISTS band1B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
 
--- BAND2A
-CREATE TABLE IF NOT EXISTS band2A (
+CREATE TABLE IF NOT EXISTS interpretations_and_focus_area
+(
     "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
+    "Category" TEXT,
+    "Score Range" TEXT,
+    "Interpretations" TEXT,
+    "Focus Area" TEXT
 );
 
--- BAND2B
-CREATE TABLE IF NOT EXISTS band2B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
+-- =====================================================
+-- 5. Analytics Aggregates
+-- =====================================================
+-- Score averages and distributions by Department, Reporting_Manager, Current_Account and band
+-- for the /analytics endpoints. Both tables are updated in the finalization transaction when an
+-- assessment completes (backend/analytics.py); POST /admin/analytics/rebuild recomputes them.
 
--- BAND3A
-CREATE TABLE IF NOT EXISTS band3A (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
+-- Latest result per employee and band, with the organisation data it was aggregated under
+CREATE TABLE IF NOT EXISTS analytics_assessment_facts (
+    employee_number TEXT NOT NULL,
+    band TEXT NOT NULL,
+    department TEXT NOT NULL DEFAULT '',
+    reporting_manager TEXT NOT NULL DEFAULT '',
+    current_account TEXT NOT NULL DEFAULT '',
+    total_score DOUBLE PRECISION,
+    category_scores JSONB NOT NULL DEFAULT '{}'::jsonb,   -- {category: score}
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (employee_number, band)
 );
 
--- BAND3B
-CREATE TABLE IF NOT EXISTS band3B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
+-- Assessment count and score sum per dimension value, band, category and 10-point score bucket.
+-- category '' holds the overall total_score.
+CREATE TABLE IF NOT EXISTS analytics_score_distribution (
+    dimension TEXT NOT NULL,          -- department | reporting_manager | current_account | band
+    dimension_value TEXT NOT NULL,
+    band TEXT NOT NULL,
+    category TEXT NOT NULL,
+    bucket SMALLINT NOT NULL,         -- 0 = 0-10 ... 9 = 90-100
+    assessments INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (dimension, dimension_value, band, category, bucket)
 );
 
--- BAND4A
-CREATE TABLE IF NOT EXISTS band4A (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" TEXT,
-    "Question" TEXT
-);
+-- Backfill facts for assessments completed before the tables existed
+INSERT INTO analytics_assessment_facts
+(employee_number, band, department, reporting_manager, current_account, total_score, category_scores)
+SELECT
+    r.employee_number,
+    r.agreed_band,
+    COALESCE(e."Department", ''),
+    COALESCE(e."Reporting_Manager", ''),
+    COALESCE(e."Current_Account", ''),
+    r.total_score,
+    COALESCE((
+        SELECT jsonb_object_agg(s->>'category', (s->>'score')::float8)
+        FROM jsonb_array_elements(r.category_scores) AS s
+        WHERE s->>'category' IS NOT NULL
+    ), '{}'::jsonb)
+FROM (
+    SELECT DISTINCT ON (employee_number, agreed_band)
+        employee_number,
+        agreed_band,
+        total_score,
+        CASE WHEN jsonb_typeof(category_scores) = 'string' AND category_scores #>> '{}' <> ''
+             THEN (category_scores #>> '{}')::jsonb
+             ELSE category_scores END AS category_scores
+    FROM assessment_results
+    ORDER BY employee_number, agreed_band, completed_at DESC
+) r
+LEFT JOIN LATERAL (
+    SELECT "Department", "Reporting_Manager", "Current_Account"
+    FROM sails_employee_data
+    WHERE "Employee_Number" = r.employee_number
+    LIMIT 1
+) e ON TRUE
+WHERE jsonb_typeof(r.category_scores) = 'array'
+ON CONFLICT (employee_number, band) DO NOTHING;
 
--- BAND4B
-CREATE TABLE IF NOT EXISTS band4B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
+-- Recompute the distribution from the facts
+DELETE FROM analytics_score_distribution;
+INSERT INTO analytics_score_distribution
+(dimension, dimension_value, band, category, bucket, assessments, score_sum)
+SELECT
+    d.dimension,
+    d.dimension_value,
+    f.band,
+    s.category,
+    LEAST(GREATEST(FLOOR(s.score / 10), 0), 9)::int,
+    COUNT(*),
+    SUM(s.score)
+FROM analytics_assessment_facts f
+CROSS JOIN LATERAL (VALUES
+    ('department', f.department),
+    ('reporting_manager', f.reporting_manager),
+    ('current_account', f.current_account),
+    ('band', f.band)
+) AS d(dimension, dimension_value)
+CROSS JOIN LATERAL (
+    SELECT '' AS category, f.total_score AS score
+    UNION ALL
+    SELECT key, value::float8 FROM jsonb_each_text(f.category_scores)
+) AS s
+WHERE s.score IS NOT NULL
+GROUP BY 1, 2, 3, 4, 5;
 
--- BAND5A
-CREATE TABLE IF NOT EXISTS band5A (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
+-- =====================================================
+-- 6. Assessment Finalization Jobs
+-- =====================================================
+-- Completed assessments waiting to be moved from assessment_answers to assessment_results.
+-- /assessment/section/submit queues the job in its own transaction; the finalization worker
+-- (backend/finalization.py) runs it. One row per employee and band: a re-completed
+-- assessment queues the same job again.
+CREATE TABLE IF NOT EXISTS assessment_finalization_jobs (
+    employee_id TEXT NOT NULL,
+    band TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'done', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    requested_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    run_after TIMESTAMP NOT NULL DEFAULT NOW(),    -- retries are delayed with backoff
+    finished_at TIMESTAMP,
+    result_id INTEGER,                             -- assessment_results.id once done
+    last_error TEXT,
+    PRIMARY KEY (employee_id, band)
 );
 
--- BAND5B
-CREATE TABLE IF NOT EXISTS band5B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" INTEGER,
-    "Question" TEXT
-);
+CREATE INDEX IF NOT EXISTS idx_assessment_finalization_jobs_pending
+ON assessment_finalization_jobs(run_after)
+WHERE status = 'pending';
 
--- BAND6A
-CREATE TABLE IF NOT EXISTS band6A (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" TEXT,
-    "Question" TEXT,
-    "f" INTEGER
-);
+-- =====================================================
+-- 7. Reference Data Change Notifications
+-- =====================================================
+-- Backends serving from an in-memory snapshot of the reference data (backend/reference_data.py)
+-- LISTEN on reference_data_changed and reload the table named in the payload.
+-- seed_loader.py recreates the trigger on the tables it swaps in.
+CREATE OR REPLACE FUNCTION notify_reference_data_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('reference_data_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
 
--- BAND6B
-CREATE TABLE IF NOT EXISTS band6B (
-    "Band" TEXT,
-    "Competency" TEXT,
-    "Sub_Section" TEXT,
-    "Q.No" TEXT,
-    "Question" TEXT
-);
+DO $$
+DECLARE
+    reference_table TEXT;
+BEGIN
+    FOREACH reference_table IN ARRAY ARRAY['question_bank', 'interpretations_and_focus_area', 'sails_employee_data']
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS reference_data_changed ON %I;', reference_table);
+        EXECUTE format(
+            'CREATE TRIGGER reference_data_changed
+             AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+             FOR EACH STATEMENT EXECUTE FUNCTION notify_reference_data_changed();',
+            reference_table
+        );
+    END LOOP;
+END $$;
 
 -- =====================================================
--- 4. Interpretations and Focus Area Table
+-- 8. Idempotency Keys
 -- =====================================================
-
-CREATE TABLE IF NOT EXISTS interpretations_and_focus_area
-(
-    "Band" TEXT,
-    "Category" TEXT,
-    "Score Range" TEXT,
-    "Interpretations" TEXT,
-    "Focus Area" TEXT
+-- Responses of requests sent with an Idempotency-Key header (backend/idempotency.py).
+-- A key is claimed and its response stored in the request's own transaction; retries with the
+-- same key get the stored response until expires_at. Expired keys are reused and purged in batches.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    endpoint TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    request_hash TEXT NOT NULL,          -- sha256 of the request body
+    status_code INTEGER,
+    response TEXT,                       -- response body as sent
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (endpoint, idempotency_key)
 );
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at
+ON idempotency_keys(expires_at);
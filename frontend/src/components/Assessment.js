@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import { Modal, Form, Button, ProgressBar, Alert, Spinner } from 'react-bootstrap';
 import { CheckCircle2 } from 'lucide-react';
 import axios from 'axios';
@@ -52,6 +52,8 @@ const Assessment = ({ show, onHide, categoryIndex: initialCategoryIndex = 0, que
   const [isReviewMode, setIsReviewMode] = useState(false);
   const [categoryQuestions, setCategoryQuestions] = useState([]);
   const [questionsData, setQuestionsData] = useState(initialQuestionsData);
+  // Idempotency-Key of the section submit being attempted; retries reuse it
+  const submitKeyRef = useRef(null);
 
   // Check if category is completed and synced with API
   const isCategoryCompleted = useCallback((categoryIndex) => {
@@ -399,6 +401,23 @@ const Assessment = ({ show, onHide, categoryIndex: initialCategoryIndex = 0, que
       }
     }));
     setSubmitError(null);
+    // Changed answers make a new submission
+    submitKeyRef.current = null;
+
+    // Autosave on the server; the section submit remains the authoritative save
+    if (initialEmployeeData && currentBand) {
+      const categoryName = CATEGORIES[currentCategoryIndex];
+      const questionText = categoryQuestions[questionIndex] || questionsData[categoryName]?.[questionIndex];
+      if (questionText) {
+        axios.post('http://localhost:8000/assessment/draft', {
+          employee_id: initialEmployeeData.Employee_Number,
+          band: currentBand,
+          category: categoryName,
+          question: questionText,
+          answer_value: value
+        }).catch(() => {});
+      }
+    }
   };
 
   const getAnsweredCount = () => {
@@ -416,6 +435,22 @@ const Assessment = ({ show, onHide, categoryIndex: initialCategoryIndex = 0, que
     return getAnsweredCount() === QUESTIONS_PER_CATEGORY;
   };
 
+  // The final submit only queues the assessment's finalization; poll until the result is stored
+  const waitForFinalization = async (statusUrl, attempts = 30) => {
+    for (let i = 0; i < attempts; i++) {
+      try {
+        const status = await axios.get(`http://localhost:8000${statusUrl}`);
+        if (status.data.status !== 'pending') {
+          return status.data;
+        }
+      } catch (error) {
+        console.error('Error checking assessment finalization:', error);
+      }
+      await new Promise(resolve => setTimeout(resolve, 1000));
+    }
+    return null;
+  };
+
   // Submit category answers to API
   const submitCategoryToAPI = async () => {
     if (!user || !currentBand) {
@@ -462,22 +497,38 @@ const Assessment = ({ show, onHide, categoryIndex: initialCategoryIndex = 0, que
 
       console.log('Submitting payload:', JSON.stringify(payload, null, 2));
 
+      if (!submitKeyRef.current) {
+        submitKeyRef.current = window.crypto?.randomUUID
+          ? window.crypto.randomUUID()
+          : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      }
+
       const response = await axios.post(
         'http://localhost:8000/assessment/section/submit',
         payload,
         {
           headers: {
             'Content-Type': 'application/json',
-            Accept: 'application/json'
+            Accept: 'application/json',
+            // A retry after a lost response is answered with the first response, not saved again
+            'Idempotency-Key': submitKeyRef.current
           }
         }
       );
+      submitKeyRef.current = null;
 
       // Check if submission was successful
       if (!response.data || !response.data.message) {
         throw new Error('Invalid response from server');
       }
 
+      // Wait for the completed assessment to be finalized, so the dashboard shows its result
+      let finalResult = null;
+      if (response.data.is_completed && response.data.finalization) {
+        const finalization = await waitForFinalization(response.data.finalization.status_url);
+        finalResult = finalization?.result || null;
+      }
+
       // Mark category as completed and API synced
       const completedCategories = localStorage.getItem('completedCategories') || '{}';
       const completedMap = JSON.parse(completedCategories);
@@ -499,8 +550,8 @@ const Assessment = ({ show, onHide, categoryIndex: initialCategoryIndex = 0, que
         lastCategoryCompleted: currentCategoryIndex,
         lastCategoryCompletedAt: new Date().toISOString(),
         completedAt: isAssessmentCompleted ? new Date().toISOString() : null,
-        totalScore: response.data.total_score || null,
-        categoryScores: response.data.category_scores || null
+        totalScore: finalResult?.total_score ?? response.data.total_score ?? null,
+        categoryScores: finalResult?.category_scores || response.data.category_scores || null
       };
       localStorage.setItem('assessmentData', JSON.stringify(assessmentData));
 
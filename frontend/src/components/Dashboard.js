@@ -270,7 +270,7 @@ const Dashboard = () => {
       });
   };
 
-  // Fetch score evaluations for all categories in an assessment
+  // Fetch score evaluations for all categories in an assessment (one batch request)
   const fetchScoreEvaluations = async (assessmentIndex, assessment) => {
     if (!employeeData) return;
 
@@ -280,64 +280,64 @@ const Dashboard = () => {
       return;
     }
 
-    // Fetch evaluation for each category
-    const evaluationPromises = assessment.category_scores.map(async (categoryScore) => {
-      const categoryName = typeof categoryScore === 'object'
-        ? categoryScore.category
-        : categoryScore;
-      const evaluationKey = `${assessmentIndex}-${categoryName}`;
+    // Only request categories that are not loaded yet
+    const categoryNames = assessment.category_scores
+      .map((categoryScore) => (typeof categoryScore === 'object' ? categoryScore.category : categoryScore))
+      .filter((categoryName) => !scoreEvaluations[`${assessmentIndex}-${categoryName}`]);
 
-      // Skip if already loaded
-      if (scoreEvaluations[evaluationKey]) {
-        return;
-      }
+    if (categoryNames.length === 0) {
+      return;
+    }
 
-      // Set loading state
-      setLoadingEvaluations(prev => ({
-        ...prev,
-        [evaluationKey]: true
-      }));
+    const evaluationKeys = categoryNames.map((categoryName) => `${assessmentIndex}-${categoryName}`);
 
-      try {
-        const response = await axios.post(
-          'http://localhost:8000/assessment/score-evaluation',
-          {
-            band: assessment.band,
-            category: categoryName,
-            employee_id: employeeId
-          },
-          {
-            headers: {
-              'Content-Type': 'application/json',
-              Accept: 'application/json'
-            }
+    // Set loading state
+    setLoadingEvaluations(prev => {
+      const newState = { ...prev };
+      evaluationKeys.forEach((key) => { newState[key] = true; });
+      return newState;
+    });
+
+    try {
+      const response = await axios.post(
+        'http://localhost:8000/assessment/score-evaluation/batch',
+        {
+          band: assessment.band,
+          employee_id: employeeId,
+          categories: categoryNames
+        },
+        {
+          headers: {
+            'Content-Type': 'application/json',
+            Accept: 'application/json'
           }
-        );
+        }
+      );
 
-        // Store evaluation
-        setScoreEvaluations(prev => ({
-          ...prev,
-          [evaluationKey]: response.data
-        }));
-      } catch (error) {
-        console.error(`Error fetching evaluation for ${categoryName}:`, error);
-        // Store error state (optional - you can show error message if needed)
-        setScoreEvaluations(prev => ({
-          ...prev,
-          [evaluationKey]: { error: 'Failed to load evaluation' }
-        }));
-      } finally {
-        // Clear loading state
-        setLoadingEvaluations(prev => {
-          const newState = { ...prev };
-          delete newState[evaluationKey];
-          return newState;
+      // Store evaluations
+      setScoreEvaluations(prev => {
+        const newState = { ...prev };
+        response.data.evaluations.forEach((evaluation) => {
+          newState[`${assessmentIndex}-${evaluation.category}`] = evaluation;
         });
-      }
-    });
-
-    // Wait for all evaluations to complete
-    await Promise.all(evaluationPromises);
+        return newState;
+      });
+    } catch (error) {
+      console.error('Error fetching score evaluations:', error);
+      // Store error state (optional - you can show error message if needed)
+      setScoreEvaluations(prev => {
+        const newState = { ...prev };
+        evaluationKeys.forEach((key) => { newState[key] = { error: 'Failed to load evaluation' }; });
+        return newState;
+      });
+    } finally {
+      // Clear loading state
+      setLoadingEvaluations(prev => {
+        const newState = { ...prev };
+        evaluationKeys.forEach((key) => { delete newState[key]; });
+        return newState;
+      });
+    }
   };
 
   // Fetch score ranges table for a band